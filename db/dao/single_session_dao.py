@@ -1,10 +1,18 @@
 __author__ = 'Bohdan Mushkevych'
 
+from pymongo import ASCENDING
+
 from db.model.raw_data import *
 from db.model.single_session import SingleSession
 from synergy.db.dao.base_dao import BaseDao
+from synergy.db.manager import index_registry
 from constants import COLLECTION_SINGLE_SESSION
 
+# supports find_by_session_id
+index_registry.register_index(COLLECTION_SINGLE_SESSION, [(DOMAIN_NAME, ASCENDING), (SESSION_ID, ASCENDING)])
+index_registry.register_query_shape(COLLECTION_SINGLE_SESSION, 'find_by_session_id',
+                                    {DOMAIN_NAME: 'DOMAIN_NAME', SESSION_ID: 'SESSION_ID'})
+
 
 class SingleSessionDao(BaseDao):
     """ Thread-safe Data Access Object for single_session table/collection """
@@ -17,5 +25,4 @@ class SingleSessionDao(BaseDao):
 
     def find_by_session_id(self, domain_name, session_id):
         query = {DOMAIN_NAME: domain_name, SESSION_ID: session_id}
-        sessions = self.run_query(query)
-        return sessions[0]
+        return next(self.iter_query(query, batch_size=1))
@@ -1,11 +1,11 @@
 __author__ = 'Bohdan Mushkevych'
 
 from bson import ObjectId
-from threading import RLock
 
 from db.model.raw_data import *
 from db.model.site_statistics import SiteStatistics
 from synergy.db.manager import ds_manager
+from synergy.db.dao.base_dao import build_db_lock
 from synergy.system.decorator import thread_safe
 
 
@@ -14,7 +14,7 @@ class SiteDao(object):
     def __init__(self, logger):
         super(SiteDao, self).__init__()
         self.logger = logger
-        self.lock = RLock()
+        self.lock = build_db_lock()
         self.ds = ds_manager.ds_factory(logger)
 
     @thread_safe
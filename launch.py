@@ -54,6 +54,10 @@ def init_parser():
                           help='updates managed_process table with context.process_context records')
     db_group.add_argument('--reset', action='store_true',
                           help='drops the *scheduler* database, resets schema, updates managed_process table')
+    db_group.add_argument('--indexes', action='store_true',
+                          help='creates missing indexes declared by the DAOs; existing indexes are left intact')
+    db_group.add_argument('--explain', action='store_true',
+                          help='reports queries declared by the DAOs that are served by the collection scan')
 
     super_parser = subparsers.add_parser('super', help='super a process by name')
     super_parser.set_defaults(func=supervisor_command)
@@ -178,6 +182,12 @@ def db_command(parser_args):
     if parser_args.update:
         db_manager.update_db()
 
+    if parser_args.indexes:
+        db_manager.ensure_indexes()
+
+    if parser_args.explain:
+        db_manager.explain_indexes()
+
 
 def supervisor_command(parser_args):
     """ Supervisor-related commands """
@@ -0,0 +1,106 @@
+"""
+Benchmark of the DAO throughput under concurrent access: locking DAOs vs lock-free DAOs (settings.db_lock_free).
+
+A single UnitOfWorkDao instance is shared by all the threads, as the GC, MX and the listeners share it in
+the Synergy Scheduler. Each thread performs get_one + update cycles against a stand-in of the mongod:
+a collection of the memory Data Source that holds every call for the duration of a network round trip
+and admits no more than <db_pool_size> concurrent calls, as the MongoClient connection pool does.
+
+Usage:
+    python -m scripts.benchmark_dao_concurrency [round_trip_ms] [cycles_per_thread]
+"""
+
+import sys
+import time
+from threading import Thread, BoundedSemaphore
+
+import mock
+
+from settings import enable_test_mode
+enable_test_mode()
+
+from synergy.conf import settings
+from synergy.db.dao.unit_of_work_dao import UnitOfWorkDao
+from synergy.db.manager.ds_manager import MemoryManager
+from synergy.db.model import unit_of_work
+from synergy.db.model.unit_of_work import UnitOfWork
+from synergy.scheduler.scheduler_constants import COLLECTION_UNIT_OF_WORK
+from synergy.system.system_logger import get_logger
+from constants import PROCESS_SITE_HOURLY
+from tests.ut_context import PROCESS_UNIT_TEST
+
+THREAD_COUNTS = [1, 2, 4, 8, 16, 32]
+
+
+class StandInCollection(object):
+    """ unit_of_work collection of the MemoryManager, whose every call takes <round_trip> seconds
+        and occupies a connection of the pool """
+
+    def __init__(self, round_trip, pool_size):
+        self.round_trip = round_trip
+        self.pool = BoundedSemaphore(pool_size)
+        self.collection = MemoryManager(get_logger(PROCESS_UNIT_TEST)).connection(COLLECTION_UNIT_OF_WORK)
+
+    def __getattr__(self, name):
+        method = getattr(self.collection, name)
+
+        def _call(*args, **kwargs):
+            with self.pool:
+                time.sleep(self.round_trip)
+            return method(*args, **kwargs)
+        return _call
+
+
+def _create_uows(collection, number_of_uows):
+    uow_ids = []
+    for i in range(number_of_uows):
+        uow = UnitOfWork()
+        uow.process_name = PROCESS_SITE_HOURLY
+        uow.start_id = str(i)
+        uow.end_id = str(i)
+        uow.state = unit_of_work.STATE_REQUESTED
+        uow.unit_of_work_type = unit_of_work.TYPE_MANAGED
+        uow_ids.append(collection.collection.insert_one(uow.document).inserted_id)
+    return uow_ids
+
+
+def _measure(collection, db_lock_free, number_of_threads, cycles_per_thread):
+    """ :return: number of DAO calls per second """
+    with mock.patch.dict(settings.settings, {'db_lock_free': db_lock_free}), \
+            mock.patch('synergy.db.manager.ds_manager.ds_factory') as ds_factory:
+        ds_factory.return_value.connection.return_value = collection
+        uow_dao = UnitOfWorkDao(get_logger(PROCESS_UNIT_TEST))
+
+    def cycle(uow_id):
+        for _ in range(cycles_per_thread):
+            uow = uow_dao.get_one(uow_id)
+            uow.state = unit_of_work.STATE_IN_PROGRESS
+            uow_dao.update(uow)
+
+    uow_ids = _create_uows(collection, number_of_threads)
+    threads = [Thread(target=cycle, args=(uow_id,)) for uow_id in uow_ids]
+    started_at = time.time()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return 2 * number_of_threads * cycles_per_thread / (time.time() - started_at)
+
+
+def run(round_trip_ms, cycles_per_thread):
+    pool_size = settings.settings['db_pool_size']
+    print('round trip {0} ms; pool size {1}; {2} get_one + update cycles per thread'
+          .format(round_trip_ms, pool_size, cycles_per_thread))
+    print('{0:>8} | {1:>14} | {2:>14} | {3:>8}'.format('threads', 'locking', 'lock-free', 'speedup'))
+    for number_of_threads in THREAD_COUNTS:
+        locking = _measure(StandInCollection(round_trip_ms / 1000.0, pool_size),
+                           False, number_of_threads, cycles_per_thread)
+        lock_free = _measure(StandInCollection(round_trip_ms / 1000.0, pool_size),
+                             True, number_of_threads, cycles_per_thread)
+        print('{0:>8} | {1:>8.0f} ops/s | {2:>8.0f} ops/s | {3:>7.1f}x'
+              .format(number_of_threads, locking, lock_free, lock_free / locking))
+
+
+if __name__ == '__main__':
+    run(float(sys.argv[1]) if len(sys.argv) > 1 else 1.0,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 50)
@@ -0,0 +1,155 @@
+"""
+Benchmark of the scheduler tick latency on the sqlite and memory Data Sources vs the mongo_db Data Source.
+The memory Data Source has no I/O, hence its latency is the CPU cost of the DAOs and the pymongo API emulation.
+
+A tick replays the DB calls of a single Synergy Scheduler step for one hourly job: the GC incremental scan,
+job creation, UOW insert, job and UOW state transitions with the event log entries.
+All Data Sources are preloaded with <number_of_records> jobs and UOWs and have the indexes of the index_registry.
+The mongo_db Data Source is skipped if the MongoDB from settings.mongodb_host_list is not reachable.
+
+Usage:
+    python -m scripts.benchmark_sqlite_tick [number_of_records] [number_of_ticks]
+"""
+
+import os
+import sys
+import time
+import shutil
+import tempfile
+from datetime import datetime
+
+import mock
+from pymongo import MongoClient
+from pymongo.errors import ConnectionFailure
+
+from settings import enable_test_mode
+enable_test_mode()
+
+from synergy.conf import settings
+from synergy.db.manager import ds_manager, index_registry
+from synergy.db.dao.job_dao import JobDao
+from synergy.db.dao.unit_of_work_dao import UnitOfWorkDao
+from synergy.db.model import job, unit_of_work
+from synergy.db.model.job import Job
+from synergy.db.model.unit_of_work import UnitOfWork
+from synergy.system import time_helper
+from synergy.system.time_qualifier import QUALIFIER_HOURLY
+from synergy.system.system_logger import get_logger
+from constants import PROCESS_SITE_HOURLY
+from tests.ut_context import PROCESS_UNIT_TEST
+
+START_TIMEPERIOD = '2010010100'
+
+
+def _create_uow(timeperiod, state):
+    uow = UnitOfWork()
+    uow.process_name = PROCESS_SITE_HOURLY
+    uow.timeperiod = timeperiod
+    uow.start_timeperiod = timeperiod
+    uow.end_timeperiod = timeperiod
+    uow.start_id = '0'
+    uow.end_id = '1'
+    uow.state = state
+    uow.unit_of_work_type = unit_of_work.TYPE_MANAGED
+    uow.number_of_retries = 0
+    return uow
+
+
+def _tick(job_dao, uow_dao, timeperiod, scan_watermark):
+    list(uow_dao.iter_updated_since(scan_watermark))
+
+    job_record = Job(process_name=PROCESS_SITE_HOURLY, timeperiod=timeperiod, state=job.STATE_EMBRYO)
+    job_dao.update(job_record)
+
+    uow = _create_uow(timeperiod, unit_of_work.STATE_REQUESTED)
+    uow.db_id = uow_dao.insert(uow)
+    job_record.state = job.STATE_IN_PROGRESS
+    job_record.related_unit_of_work = uow.db_id
+    job_record.add_log_entry([str(datetime.utcnow()), 'transferred to STATE_IN_PROGRESS'])
+    job_dao.update(job_record)
+
+    uow = uow_dao.get_one(uow.db_id)
+    uow.state = unit_of_work.STATE_PROCESSED
+    uow_dao.update(uow)
+    job_record.state = job.STATE_PROCESSED
+    job_record.add_log_entry([str(datetime.utcnow()), 'transferred to STATE_PROCESSED'])
+    job_dao.update(job_record)
+
+
+def _measure(ds, number_of_records, number_of_ticks):
+    """ :return: list of tick latencies in milliseconds """
+    logger = get_logger(PROCESS_UNIT_TEST)
+    ds.drop_database()
+    index_registry.ensure_indexes(ds, logger)
+
+    with mock.patch('synergy.db.manager.ds_manager.ds_factory') as ds_factory:
+        ds_factory.return_value = ds
+        job_dao = JobDao(logger)
+        uow_dao = UnitOfWorkDao(logger)
+
+    timeperiod = START_TIMEPERIOD
+    job_records = []
+    for _ in range(number_of_records):
+        uow_dao.insert(_create_uow(timeperiod, unit_of_work.STATE_PROCESSED))
+        job_records.append(Job(process_name=PROCESS_SITE_HOURLY, timeperiod=timeperiod, state=job.STATE_PROCESSED))
+        timeperiod = time_helper.increment_timeperiod(QUALIFIER_HOURLY, timeperiod)
+    job_dao.insert_many(job_records)
+
+    latencies = []
+    scan_watermark = datetime.utcnow()
+    for _ in range(number_of_ticks):
+        started_at = time.time()
+        _tick(job_dao, uow_dao, timeperiod, scan_watermark)
+        latencies.append((time.time() - started_at) * 1000)
+        # the GC scans the UOWs updated since its previous run
+        scan_watermark = datetime.utcnow()
+        timeperiod = time_helper.increment_timeperiod(QUALIFIER_HOURLY, timeperiod)
+
+    ds.drop_database()
+    return latencies
+
+
+def _is_mongo_alive():
+    try:
+        client = MongoClient(settings.settings['mongodb_host_list'], connectTimeoutMS=2000)
+        client.admin.command('ping')
+        client.close()
+        return True
+    except ConnectionFailure:
+        return False
+
+
+def _report(ds_type, latencies):
+    latencies = sorted(latencies)
+    print('{0:>10} | {1:>8.2f} ms | {2:>8.2f} ms | {3:>8.2f} ms'
+          .format(ds_type, sum(latencies) / len(latencies),
+                  latencies[len(latencies) // 2], latencies[int(len(latencies) * 0.95)]))
+
+
+def run(number_of_records, number_of_ticks):
+    logger = get_logger(PROCESS_UNIT_TEST)
+    print('{0} preloaded jobs and UOWs; {1} ticks'.format(number_of_records, number_of_ticks))
+    print('{0:>10} | {1:>11} | {2:>11} | {3:>11}'.format('ds_type', 'mean', 'p50', 'p95'))
+
+    folder = tempfile.mkdtemp()
+    try:
+        with mock.patch.dict(settings.settings, {'sqlite_file': os.path.join(folder, 'benchmark.db')}):
+            sqlite_ds = ds_manager.SqliteManager(logger)
+            _report('sqlite', _measure(sqlite_ds, number_of_records, number_of_ticks))
+    finally:
+        shutil.rmtree(folder)
+
+    _report('memory', _measure(ds_manager.MemoryManager(logger), number_of_records, number_of_ticks))
+
+    if not _is_mongo_alive():
+        print('{0:>10} | MongoDB at {1} is not reachable'.format('mongo_db', settings.settings['mongodb_host_list']))
+        return
+
+    with mock.patch.dict(settings.settings, {'mongo_db_name': settings.settings['mongo_db_name'] + '_benchmark'}):
+        mongo_ds = ds_manager.MongoDbManager(logger)
+        _report('mongo_db', _measure(mongo_ds, number_of_records, number_of_ticks))
+
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 5000,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 500)
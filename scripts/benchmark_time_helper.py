@@ -0,0 +1,66 @@
+"""
+Microbenchmark of the timeperiod arithmetic: time_helper.increment_timeperiod and time_helper.cast_to_time_qualifier.
+
+Compares the integer-based fast path of the timeperiod_arithmetic with the former datetime-based
+computation (datetime.strptime/strftime) for every time qualifier, on timeperiods spread over decades.
+
+Usage:
+    python -m scripts.benchmark_time_helper [number_of_calls]
+"""
+
+import sys
+import random
+import timeit
+from datetime import datetime, timedelta
+
+from synergy.system import time_helper
+from synergy.system.time_qualifier import QUALIFIER_HOURLY, QUALIFIER_DAILY, QUALIFIER_MONTHLY, QUALIFIER_YEARLY
+
+QUALIFIERS = [QUALIFIER_HOURLY, QUALIFIER_DAILY, QUALIFIER_MONTHLY, QUALIFIER_YEARLY]
+
+
+def _timeperiods(time_qualifier, number_of_timeperiods):
+    rnd = random.Random(number_of_timeperiods)
+    start = datetime(1970, 1, 1)
+    span_in_hours = (datetime(2040, 1, 1) - start).days * 24
+    return [time_helper.datetime_to_synergy(time_qualifier, start + timedelta(hours=rnd.randrange(span_in_hours)))
+            for _ in range(number_of_timeperiods)]
+
+
+def _per_call(function, arguments):
+    """ :return: average duration of a single call in microseconds """
+    def run():
+        for args in arguments:
+            function(*args)
+    return 1e6 * min(timeit.repeat(run, number=1, repeat=7)) / len(arguments)
+
+
+def run(number_of_calls):
+    print('{0:>10} | {1:>9} | {2:>14} | {3:>14} | {4:>8}'.format('qualifier', 'function', 'datetime', 'arithmetic',
+                                                                  'speedup'))
+    for time_qualifier in QUALIFIERS:
+        timeperiods = _timeperiods(time_qualifier, number_of_calls)
+        deltas = [1, -1, 3, -7] * number_of_calls
+        fixtures = [
+            ('increment',
+             [(time_qualifier, timeperiod, delta) for timeperiod, delta in zip(timeperiods, deltas)],
+             time_helper._increment_timeperiod_by_datetime,
+             time_helper.increment_timeperiod),
+            ('cast',
+             [(QUALIFIER_HOURLY, timeperiod) for timeperiod in timeperiods],
+             time_helper._cast_to_time_qualifier_by_datetime,
+             time_helper.cast_to_time_qualifier),
+        ]
+
+        for name, arguments, datetime_function, fast_function in fixtures:
+            for args in arguments:
+                assert datetime_function(*args) == fast_function(*args), args
+
+            slow = _per_call(datetime_function, arguments)
+            fast = _per_call(fast_function, arguments)
+            print('{0:>10} | {1:>9} | {2:>11.3f} us | {3:>11.3f} us | {4:>7.1f}x'
+                  .format(time_qualifier, name, slow, fast, slow / fast))
+
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
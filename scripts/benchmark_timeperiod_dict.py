@@ -0,0 +1,52 @@
+"""
+Microbenchmark of the TimeperiodDict timeperiod translation.
+
+Compares the lookup in the precomputed stem tables with the former tokenizing translation,
+that computed the grouped stem on every call, for hourly, daily and monthly groupings.
+
+Usage:
+    python -m scripts.benchmark_timeperiod_dict [number_of_calls]
+"""
+
+import sys
+import timeit
+
+from synergy.system import time_helper
+from synergy.system.timeperiod_dict import TimeperiodDict
+from synergy.system.time_qualifier import QUALIFIER_HOURLY, QUALIFIER_DAILY, QUALIFIER_MONTHLY
+
+FIXTURES = [
+    (QUALIFIER_HOURLY, 3, '2010010100', '2011123123'),
+    (QUALIFIER_HOURLY, 8, '2010010100', '2011123123'),
+    (QUALIFIER_DAILY, 7, '2000010100', '2019123100'),
+    (QUALIFIER_MONTHLY, 3, '1900010000', '2099120000'),
+]
+
+
+def _per_call(function, timeperiods, number_of_calls):
+    """ :return: average duration of a single call in microseconds """
+    arguments = [timeperiods[i % len(timeperiods)] for i in range(number_of_calls)]
+
+    def run():
+        for timeperiod in arguments:
+            function(timeperiod)
+    return 1e6 * min(timeit.repeat(run, number=1, repeat=5)) / number_of_calls
+
+
+def run(number_of_calls):
+    print('{0:>10} | {1:>8} | {2:>14} | {3:>14} | {4:>8}'
+          .format('qualifier', 'grouping', 'tokenizing', 'stem table', 'speedup'))
+    for time_qualifier, time_grouping, start_timeperiod, end_timeperiod in FIXTURES:
+        timeperiods = time_helper.timeperiod_range(time_qualifier, start_timeperiod, end_timeperiod)
+        d = TimeperiodDict(time_qualifier, time_grouping)
+        for timeperiod in timeperiods:
+            assert d._translate_timeperiod(timeperiod) == d._translate_timeperiod_by_tokens(timeperiod)
+
+        slow = _per_call(d._translate_timeperiod_by_tokens, timeperiods, number_of_calls)
+        fast = _per_call(d._translate_timeperiod, timeperiods, number_of_calls)
+        print('{0:>10} | {1:>8} | {2:>11.3f} us | {3:>11.3f} us | {4:>7.1f}x'
+              .format(time_qualifier, time_grouping, slow, fast, slow / fast))
+
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 50000)
@@ -0,0 +1,100 @@
+"""
+Microbenchmark of the Timetable lookups: process name -> tree and tree -> dependant trees.
+
+Compares the indexed Timetable.get_tree and Timetable._find_dependant_trees with the former
+linear scans over all trees, for a growing number of synthetic single-process trees.
+Every tree depends on its predecessor.
+
+Usage:
+    python -m scripts.benchmark_timetable_lookup [number_of_lookups]
+"""
+
+import sys
+import timeit
+from threading import RLock
+
+from synergy.conf import context
+from synergy.system.time_qualifier import QUALIFIER_HOURLY
+from synergy.db.model.managed_process_entry import managed_context_entry
+from synergy.db.model.timetable_tree_entry import timetable_tree_entry
+from synergy.scheduler.timetable import Timetable
+
+TREE_COUNTS = [10, 50, 100, 250, 500]
+
+
+def _legacy_get_tree(timetable, process_name):
+    for tree_name, tree in timetable.trees.items():
+        if process_name in tree:
+            return tree
+
+
+def _legacy_find_dependant_trees(timetable, tree_obj):
+    dependant_trees = []
+    for tree_name, tree in timetable.trees.items():
+        if tree_obj in tree.dependent_on:
+            dependant_trees.append(tree)
+    return dependant_trees
+
+
+def _build_timetable(number_of_trees):
+    """ :return: tuple (Timetable, list of process names) for synthetic trees
+        NOTICE: the Timetable is constructed without the DB: its trees are neither loaded nor built """
+    process_names = []
+    timetable_context = dict()
+    for i in range(number_of_trees):
+        process_name = 'BenchmarkProcess{0}'.format(i)
+        tree_name = 'benchmark_tree_{0}'.format(i)
+        context.process_context[process_name] = managed_context_entry(process_name=process_name,
+                                                                      classname='',
+                                                                      token=process_name,
+                                                                      time_qualifier=QUALIFIER_HOURLY)
+        dependent_on = ['benchmark_tree_{0}'.format(i - 1)] if i > 0 else []
+        timetable_context[tree_name] = timetable_tree_entry(tree_name=tree_name,
+                                                            enclosed_processes=[process_name],
+                                                            dependent_on=dependent_on,
+                                                            mx_name=tree_name,
+                                                            mx_page='benchmark')
+        process_names.append(process_name)
+
+    original_timetable_context = context.timetable_context
+    context.timetable_context = timetable_context
+    try:
+        timetable = Timetable.__new__(Timetable)
+        timetable.lock = RLock()
+        timetable.logger = None
+        timetable.trees = timetable._construct_trees_from_context()
+        timetable.process_trees = dict()
+        timetable._register_dependencies()
+    finally:
+        context.timetable_context = original_timetable_context
+    return timetable, process_names
+
+
+def _per_lookup(function, arguments, number_of_lookups):
+    """ :return: average duration of a single call in microseconds """
+    def run():
+        for i in range(number_of_lookups):
+            function(*arguments[i % len(arguments)])
+    return 1e6 * min(timeit.repeat(run, number=1, repeat=3)) / number_of_lookups
+
+
+def run(number_of_lookups):
+    print('{0:>6} | {1:>17} | {2:>17} | {3:>17} | {4:>17}'
+          .format('trees', 'scan get_tree', 'index get_tree', 'scan dependants', 'index dependants'))
+    for number_of_trees in TREE_COUNTS:
+        timetable, process_names = _build_timetable(number_of_trees)
+        by_process = [(timetable, name) for name in process_names]
+        by_tree = [(timetable, tree) for tree in timetable.trees.values()]
+
+        results = [
+            _per_lookup(_legacy_get_tree, by_process, number_of_lookups),
+            _per_lookup(lambda tt, name: tt.get_tree(name), by_process, number_of_lookups),
+            _per_lookup(_legacy_find_dependant_trees, by_tree, number_of_lookups),
+            _per_lookup(lambda tt, tree: tt._find_dependant_trees(tree), by_tree, number_of_lookups),
+        ]
+        print('{0:>6} | {1:>14.3f} us | {2:>14.3f} us | {3:>14.3f} us | {4:>14.3f} us'
+              .format(number_of_trees, *results))
+
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 10000)
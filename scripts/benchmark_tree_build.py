@@ -0,0 +1,75 @@
+"""
+Benchmark of the timeperiod range generation and of the MultiLevelTree.build_tree.
+
+Compares time_helper.timeperiod_range with the former chain of datetime-based increments,
+and the build_tree (bulk node insertion over the timeperiod_range) with a replica of the former build_tree loop,
+for several years of hourly timeperiods of a 4-level site tree.
+
+Usage:
+    python -m scripts.benchmark_tree_build [number_of_years]
+"""
+
+import sys
+import time
+
+from constants import PROCESS_SITE_HOURLY, PROCESS_SITE_DAILY, PROCESS_SITE_MONTHLY, PROCESS_SITE_YEARLY
+from synergy.system import time_helper
+from synergy.system.time_qualifier import QUALIFIER_HOURLY
+from synergy.scheduler.tree import MultiLevelTree
+
+START_TIMEPERIOD = '2000010100'
+
+
+def _legacy_range(time_qualifier, start_timeperiod, end_timeperiod):
+    timeperiods = []
+    timeperiod = start_timeperiod
+    while end_timeperiod >= timeperiod:
+        timeperiods.append(timeperiod)
+        timeperiod = time_helper._increment_timeperiod_by_datetime(time_qualifier, timeperiod, 1)
+    return timeperiods
+
+
+def _legacy_build_tree(tree, start_timeperiod, end_timeperiod):
+    timeperiod = start_timeperiod
+    while end_timeperiod >= timeperiod:
+        tree.get_node(PROCESS_SITE_HOURLY, timeperiod)
+        timeperiod = time_helper._increment_timeperiod_by_datetime(QUALIFIER_HOURLY, timeperiod, 1)
+
+
+def _build_tree(tree, start_timeperiod, end_timeperiod):
+    """ MultiLevelTree.build_tree with the given boundaries """
+    tree._get_nodes(QUALIFIER_HOURLY, time_helper.timeperiod_range(QUALIFIER_HOURLY, start_timeperiod, end_timeperiod))
+
+
+def _new_tree():
+    return MultiLevelTree(process_names=[PROCESS_SITE_YEARLY, PROCESS_SITE_MONTHLY,
+                                         PROCESS_SITE_DAILY, PROCESS_SITE_HOURLY], timetable=None)
+
+
+def _measure(function, *args):
+    """ :return: tuple (result, duration in milliseconds) """
+    started_at = time.time()
+    result = function(*args)
+    return result, 1e3 * (time.time() - started_at)
+
+
+def run(number_of_years):
+    end_timeperiod = time_helper.increment_timeperiod(QUALIFIER_HOURLY, START_TIMEPERIOD, 24 * 365 * number_of_years)
+
+    legacy_range, legacy_range_ms = _measure(_legacy_range, QUALIFIER_HOURLY, START_TIMEPERIOD, end_timeperiod)
+    timeperiods, range_ms = _measure(time_helper.timeperiod_range, QUALIFIER_HOURLY, START_TIMEPERIOD, end_timeperiod)
+    assert legacy_range == timeperiods
+
+    _, legacy_build_ms = _measure(_legacy_build_tree, _new_tree(), START_TIMEPERIOD, end_timeperiod)
+    _, build_ms = _measure(_build_tree, _new_tree(), START_TIMEPERIOD, end_timeperiod)
+
+    print('{0} years: {1} hourly timeperiods'.format(number_of_years, len(timeperiods)))
+    print('{0:>16} | {1:>12} | {2:>12} | {3:>8}'.format('', 'former', 'current', 'speedup'))
+    print('{0:>16} | {1:>9.1f} ms | {2:>9.1f} ms | {3:>7.1f}x'
+          .format('timeperiod range', legacy_range_ms, range_ms, legacy_range_ms / range_ms))
+    print('{0:>16} | {1:>9.1f} ms | {2:>9.1f} ms | {3:>7.1f}x'
+          .format('build_tree', legacy_build_ms, build_ms, legacy_build_ms / build_ms))
+
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 3)
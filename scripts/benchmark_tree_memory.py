@@ -0,0 +1,124 @@
+"""
+Memory benchmark of the Timetable tree: bytes per tree node with its job record.
+
+Compares the compact layout (slot-based TreeNode, shared field maps of the Job,
+interned strings and event logs left in the DB) with a replica of the former layout
+(per-instance __dict__ and children mapping, non-interned strings and in-memory event logs).
+Every layout is measured in a separate process as the growth of its resident set size.
+
+Usage:
+    python -m scripts.benchmark_tree_memory [number_of_nodes] [number_of_events_per_job]
+"""
+
+import gc
+import sys
+import multiprocessing
+
+import psutil
+from bson import ObjectId
+from odm.document import BaseDocument
+
+from constants import PROCESS_SITE_HOURLY
+from synergy.db.model import job
+from synergy.db.model.job import Job
+from synergy.system import time_helper
+from synergy.system.utils import intern_string
+from synergy.system.time_qualifier import QUALIFIER_HOURLY
+from synergy.system.immutable_dict import ImmutableDict
+from synergy.scheduler.tree import MultiLevelTree
+
+START_TIMEPERIOD = '2000010100'
+
+
+class _LegacyJob(Job):
+    """ Job that builds field maps per instance, as BaseDocument does """
+    @classmethod
+    def _get_fields(cls):
+        return BaseDocument._get_fields.__func__(cls)
+
+    @classmethod
+    def _get_attributes(cls):
+        return BaseDocument._get_attributes.__func__(cls)
+
+
+class _LegacyTreeNode(object):
+    """ replica of the TreeNode before __slots__ were introduced """
+    def __init__(self, tree, parent, process_name, timeperiod, job_record):
+        self.tree = tree
+        self.parent = parent
+        self.process_name = process_name
+        self.timeperiod = timeperiod
+        self.job_record = job_record
+        self.time_qualifier = QUALIFIER_HOURLY
+        self.children = ImmutableDict({})
+
+
+def _documents(number_of_nodes, number_of_events):
+    """ generator of job documents as they are returned by the DB driver: with distinct string instances """
+    timeperiod = START_TIMEPERIOD
+    for _ in range(number_of_nodes):
+        yield {
+            '_id': ObjectId(),
+            job.PROCESS_NAME: u''.join([PROCESS_SITE_HOURLY]),
+            job.TIMEPERIOD: u''.join([timeperiod]),
+            job.STATE: u''.join([job.STATE_PROCESSED]),
+            job.RELATED_UNIT_OF_WORK: ObjectId(),
+            job.NUMBER_OF_FAILURES: 0,
+            job.EVENT_LOG: [[u'2015-01-01 00:00:00', u'transferred from state_in_progress to state_processed']
+                            for _ in range(number_of_events)],
+        }
+        timeperiod = time_helper.increment_timeperiod(QUALIFIER_HOURLY, timeperiod)
+
+
+def _build_compact(number_of_nodes, number_of_events):
+    tree = MultiLevelTree(process_names=[PROCESS_SITE_HOURLY], timetable=None)
+    for document in _documents(number_of_nodes, number_of_events):
+        # event log is excluded by the JobDao.cursor_all projection
+        del document[job.EVENT_LOG]
+        for field_name in (job.PROCESS_NAME, job.TIMEPERIOD, job.STATE):
+            document[field_name] = intern_string(document[field_name])
+        tree.update_node(Job.from_json(document))
+    tree.dirty_nodes.clear()
+    return tree
+
+
+def _build_legacy(number_of_nodes, number_of_events):
+    children = dict()
+    for document in _documents(number_of_nodes, number_of_events):
+        job_record = _LegacyJob.from_json(document)
+        children[job_record.timeperiod] = _LegacyTreeNode(None, None, job_record.process_name,
+                                                          job_record.timeperiod, job_record)
+    return children
+
+
+def _measure(builder, number_of_nodes, number_of_events, queue):
+    process = psutil.Process()
+    gc.collect()
+    rss_before = process.memory_info().rss
+    holder = builder(number_of_nodes, number_of_events)
+    gc.collect()
+    rss_after = process.memory_info().rss
+    queue.put(rss_after - rss_before)
+    del holder
+
+
+def run(number_of_nodes, number_of_events):
+    results = dict()
+    for name, builder in [('legacy', _build_legacy), ('compact', _build_compact)]:
+        queue = multiprocessing.Queue()
+        worker = multiprocessing.Process(target=_measure, args=(builder, number_of_nodes, number_of_events, queue))
+        worker.start()
+        results[name] = queue.get()
+        worker.join()
+
+    print('nodes: {0}, events per job: {1}'.format(number_of_nodes, number_of_events))
+    for name in ['legacy', 'compact']:
+        print('{0:>8}: {1:>8.1f} MB total, {2:>6.0f} bytes/node'
+              .format(name, results[name] / 1024.0 / 1024.0, float(results[name]) / number_of_nodes))
+    print('  saving: {0:.1f}%'.format(100.0 * (results['legacy'] - results['compact']) / results['legacy']))
+
+
+if __name__ == '__main__':
+    nodes = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    events = int(sys.argv[2]) if len(sys.argv) > 2 else 16
+    run(nodes, events)
@@ -19,10 +19,12 @@ settings = dict(
     compute_gzip_md5=True,      # True, if AbstractFileCollector should compute MD5 for every file it processes
     bash_runnable_count=5,      # number of concurrently running shell scripts supported by BashDriver
 
-    ds_type='mongo_db',
+    ds_type='mongo_db',         # Data Source type: mongo_db, sqlite or memory
     mongo_db_name='scheduler',
+    sqlite_file='/mnt/tmp/synergy_scheduler.db',    # database file of the sqlite Data Source
     uow_log_ttl_days=365,       # number of days to keep entries in the uow_log collection/table
     batch_size=1024,            # illustration suite setting: number of DB documents to read in batch
+    db_index_modules=['db.dao.single_session_dao'],  # modules that declare indexes of the application collections
 
     debug=False,                # if True, logger.setLevel is set to DEBUG. Otherwise to INFO
 
@@ -49,6 +51,7 @@ testable_modules = [
 test_cases = [
     'tests.test_tree_node',
     'tests.test_multi_level_tree',
+    'tests.test_timetable',
     'tests.test_process_hierarchy',
     'tests.test_abstract_state_machine',
     'tests.test_state_machine_recomputing',
@@ -64,6 +67,13 @@ test_cases = [
     'tests.test_timeperiod_dict',
     'tests.test_process_starter',
     'tests.test_uow_log_handler',
+    'tests.test_base_dao',
+    'tests.test_tracked_document',
+    'tests.test_uow_cache',
+    'tests.test_index_registry',
+    'tests.test_sqlite_manager',
+    'tests.test_memory_manager',
+    'tests.test_memory_aggregators',
     'tests.test_site_hourly_aggregator',
     'tests.test_site_daily_aggregator',
     'tests.test_site_monthly_aggregator',
@@ -81,6 +91,7 @@ def enable_test_mode():
 
     test_settings = dict(
         mongo_db_name=settings['mongo_db_name'] + '_test',
+        sqlite_file=settings['sqlite_file'] + '_test',
         # mq_vhost='/unit_test',
         debug=True,
         under_test=True,
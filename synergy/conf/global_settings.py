@@ -10,9 +10,20 @@ settings = dict(
     gc_life_support_hours=48,    # number of hours from UOW creation time to keep UOW re-posting to MQ
     gc_resubmit_after_hours=1,   # number of hours, GC waits for the worker to pick up the UOW from MQ before re-posting
     gc_release_lag_minutes=15,   # number of minutes, GC keeps the UOW in the queue before posting it into MQ
+    gc_full_scan_interval=3600,  # number of seconds between GC full scans; runs in between scan only the updated UOWs
+    gc_heartbeat_timeout=120,    # number of seconds without a worker heartbeat, after which the UOW is re-posted
+    uow_heartbeat_interval=30,   # number of seconds between heartbeats of the worker processing a UOW
+
+    db_bulk_size=1024,           # maximum number of documents written to or requested from the DB in a single batch
+    db_lock_free=False,          # if True, DAOs do not serialize calls and rely on the thread-safe MongoClient pool
+    db_pool_size=100,            # maximum number of connections in the MongoClient pool
+    uow_cache_size=4096,         # maximum number of unit_of_work records cached by the scheduler process; 0 disables it
+    uow_cache_ttl=30,            # number of seconds a cached unit_of_work record is considered fresh
+    db_index_modules=[],         # application modules that declare indexes of their collections in the index_registry
 
     mx_host='0.0.0.0',           # management extension host (0.0.0.0 opens all interfaces)
     mx_port=5000,                # management extension port
     mx_children_limit=168,       # maximum number of children at any given level returned by MX
     perf_ticker_interval=60,     # seconds between performance ticker messages
+    timer_pool_size=8,           # number of threads dispatching call_backs of the RepeatTimer and EventClock
 )
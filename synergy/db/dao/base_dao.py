@@ -4,6 +4,7 @@ from bson import ObjectId
 from threading import RLock
 from six import string_types
 
+from synergy.conf import settings
 from synergy.db.manager import ds_manager
 from synergy.system.decorator import thread_safe
 
@@ -24,6 +25,54 @@ def build_db_query(fields_names, field_values):
     return query
 
 
+def iter_nonempty(iterable, error_message):
+    """ generator yields items of the iterable. replaces the cursor.count() check before the iteration,
+        which costs a separate round trip to the DB
+        :raise LookupError: with the <error_message> once the iterable is exhausted, if it yielded no items """
+    is_empty = True
+    for item in iterable:
+        is_empty = False
+        yield item
+
+    if is_empty:
+        raise LookupError(error_message)
+
+
+def iter_models(cursor, model_class, error_message):
+    """ :return: generator of the model_class instances, decoded from the cursor documents as they are fetched
+        :raise LookupError: with the <error_message> once the cursor is exhausted, if it yielded no documents """
+    return iter_nonempty((model_class.from_json(document) for document in cursor), error_message)
+
+
+def get_batch_size(batch_size=None):
+    """ :return: given batch_size or the settings.db_bulk_size if None """
+    return batch_size if batch_size else settings.settings['db_bulk_size']
+
+
+class NoLock(object):
+    """ lock of the lock-free DAO: calls are not serialized by the DAO instance,
+        and concurrent access to the DB is governed by the connection pool of the Data Source """
+
+    def acquire(self, blocking=True):
+        return True
+
+    def release(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        return False
+
+
+def build_db_lock():
+    """ method builds the lock for the DAO instance: RLock by default, or NoLock if settings.db_lock_free is set """
+    if settings.settings['db_lock_free']:
+        return NoLock()
+    return RLock()
+
+
 class BaseDao(object):
     """ Thread-safe base Data Access Object """
 
@@ -34,7 +83,7 @@ class BaseDao(object):
         self.primary_key = primary_key
         self.collection_name = collection_name
 
-        self.lock = RLock()
+        self.lock = build_db_lock()
         self.ds = ds_manager.ds_factory(logger)
 
     @thread_safe
@@ -49,15 +98,20 @@ class BaseDao(object):
         return self.model_klass.from_json(document)
 
     @thread_safe
-    def run_query(self, query):
-        """ method runs query on a specified collection and return a list of filtered Model records """
+    def iter_query(self, query, batch_size=None):
+        """ method runs query on a specified collection and returns a generator of filtered Model records.
+            documents are fetched from the DB in batches of <batch_size>, settings.db_bulk_size by default.
+            NOTICE: the DAO lock is not held while the records are iterated over
+            :raise LookupError: if the query matched no records """
         collection = self.ds.connection(self.collection_name)
+        cursor = collection.find(query).batch_size(get_batch_size(batch_size))
+        return iter_models(cursor, self.model_klass, 'Collection {0} has no {1} records'
+                           .format(self.collection_name, self.model_klass.__name__))
 
-        cursor = collection.find(query)
-        if cursor.count() == 0:
-            raise LookupError('Collection {0} has no {1} records'
-                              .format(self.collection_name, self.model_klass.__name__))
-        return [self.model_klass.from_json(entry) for entry in cursor]
+    @thread_safe
+    def run_query(self, query):
+        """ method runs query on a specified collection and return a list of filtered Model records """
+        return list(self.iter_query(query))
 
     @thread_safe
     def get_all(self):
@@ -1,11 +1,19 @@
 __author__ = 'Bohdan Mushkevych'
 
+from pymongo import ASCENDING
+
 from synergy.db.dao.base_dao import BaseDao
+from synergy.db.manager import index_registry
 from synergy.db.model.box_configuration import BoxConfiguration, BOX_ID, PROCESS_NAME
 from synergy.supervisor.supervisor_constants import COLLECTION_BOX_CONFIGURATION
 
 QUERY_PROCESSES_FOR_BOX_ID = lambda box_id: {BOX_ID: box_id}
 
+index_registry.register_index(COLLECTION_BOX_CONFIGURATION,
+                              [(BOX_ID, ASCENDING), (PROCESS_NAME, ASCENDING)], unique=True)
+index_registry.register_query_shape(COLLECTION_BOX_CONFIGURATION, 'processes_for_box_id',
+                                    QUERY_PROCESSES_FOR_BOX_ID('BOX_ID'))
+
 
 class BoxConfigurationDao(BaseDao):
     """ Thread-safe Data Access Object for box_configuration table/collection """
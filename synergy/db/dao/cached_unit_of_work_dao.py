@@ -0,0 +1,145 @@
+__author__ = 'Bohdan Mushkevych'
+
+import copy
+import time
+from threading import Lock
+from collections import OrderedDict
+
+from synergy.conf import settings
+from synergy.db.model.unit_of_work import UnitOfWork
+from synergy.db.dao.unit_of_work_dao import UnitOfWorkDao
+from synergy.system.decorator import singleton, thread_safe
+
+
+@singleton
+class UowCache(object):
+    """ Process-wide bounded cache of the unit_of_work documents, keyed by the UOW db_id.
+        Entries are evicted in the least-recently-used order once <uow_cache_size> is reached,
+        and are considered missing once they are older than <uow_cache_ttl> seconds,
+        which bounds the staleness of the records changed by the workers.
+        Every invalidation advances the cache version: a document read from the DB before the invalidation
+        of its UOW is not cached, as it might predate the write that caused the invalidation """
+
+    def __init__(self):
+        self.lock = Lock()
+        self.max_size = settings.settings['uow_cache_size']
+        self.ttl = settings.settings['uow_cache_ttl']
+
+        # format: {uow_id: (document, cached_at)} in the least-recently-used order
+        self.entries = OrderedDict()
+        # format: {uow_id: version of the latest invalidation}; bounded by the max_size
+        self.invalidations = OrderedDict()
+        # highest version among the invalidations dropped from the self.invalidations
+        self.forgotten_version = 0
+        self.version = 0
+
+        self.hits = 0
+        self.misses = 0
+
+    @thread_safe
+    def get(self, uow_id):
+        """ :return: copy of the cached document or None if the UOW is not cached or its entry has expired """
+        uow_id = str(uow_id)
+        entry = self.entries.get(uow_id)
+        if entry is None or time.time() - entry[1] > self.ttl:
+            self.entries.pop(uow_id, None)
+            self.misses += 1
+            return None
+
+        # move the entry to the most-recently-used end
+        del self.entries[uow_id]
+        self.entries[uow_id] = entry
+        self.hits += 1
+        return copy.deepcopy(entry[0])
+
+    @thread_safe
+    def put(self, uow_id, document, version):
+        """ :param version: cache version taken before the document was read from the DB """
+        uow_id = str(uow_id)
+        if self.max_size <= 0 \
+                or version < self.forgotten_version \
+                or version < self.invalidations.get(uow_id, 0):
+            # the UOW might have been written after the document was read
+            return
+
+        self.entries.pop(uow_id, None)
+        self.entries[uow_id] = (copy.deepcopy(document), time.time())
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+    @thread_safe
+    def invalidate(self, uow_id):
+        uow_id = str(uow_id)
+        self.version += 1
+        self.entries.pop(uow_id, None)
+        self.invalidations.pop(uow_id, None)
+        self.invalidations[uow_id] = self.version
+        while len(self.invalidations) > max(self.max_size, 1):
+            _, forgotten_version = self.invalidations.popitem(last=False)
+            self.forgotten_version = max(self.forgotten_version, forgotten_version)
+
+    @thread_safe
+    def clear(self):
+        self.version += 1
+        self.forgotten_version = self.version
+        self.entries.clear()
+        self.invalidations.clear()
+
+    @property
+    def stats(self):
+        """ :return: dict with the cache counters, presented by the MX """
+        with self.lock:
+            number_of_reads = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': float(self.hits) / number_of_reads if number_of_reads else 0.0,
+                'size': len(self.entries),
+                'max_size': self.max_size,
+                'ttl': self.ttl,
+            }
+
+
+class CachedUnitOfWorkDao(UnitOfWorkDao):
+    """ Data Access Object for the Synergy Scheduler process: reads unit_of_work records by their db_id
+        thru the process-wide UowCache, and invalidates the cached records on every write.
+        Workers change unit_of_work records in their own processes: these changes become visible
+        either once the cached entry expires, or once the UOW is invalidated by its status message """
+
+    def __init__(self, logger):
+        super(CachedUnitOfWorkDao, self).__init__(logger)
+        self.cache = UowCache()
+
+    def get_one(self, key):
+        document = self.cache.get(key)
+        if document is not None:
+            return UnitOfWork.from_json(document)
+
+        version = self.cache.version
+        uow = super(CachedUnitOfWorkDao, self).get_one(key)
+        self.cache.put(key, uow.document, version)
+        return uow
+
+    def invalidate(self, uow_id):
+        """ method drops the cached record of the UOW, changed outside of the scheduler process """
+        self.cache.invalidate(uow_id)
+
+    def update(self, instance):
+        try:
+            return super(CachedUnitOfWorkDao, self).update(instance)
+        finally:
+            if instance.db_id:
+                self.cache.invalidate(instance.db_id)
+
+    def update_many(self, instances, field_names):
+        try:
+            super(CachedUnitOfWorkDao, self).update_many(instances, field_names)
+        finally:
+            for instance in instances:
+                self.cache.invalidate(instance.db_id)
+
+    def remove(self, uow_id):
+        try:
+            super(CachedUnitOfWorkDao, self).remove(uow_id)
+        finally:
+            self.cache.invalidate(uow_id)
@@ -1,9 +1,15 @@
 __author__ = 'Bohdan Mushkevych'
 
+from pymongo import ASCENDING
+
 from synergy.db.dao.base_dao import BaseDao
+from synergy.db.manager import index_registry
 from synergy.db.model.freerun_process_entry import FreerunProcessEntry, PROCESS_NAME, ENTRY_NAME
 from synergy.scheduler.scheduler_constants import COLLECTION_FREERUN_PROCESS
 
+index_registry.register_index(COLLECTION_FREERUN_PROCESS,
+                              [(PROCESS_NAME, ASCENDING), (ENTRY_NAME, ASCENDING)], unique=True)
+
 
 class FreerunProcessDao(BaseDao):
     """ Thread-safe Data Access Object for freerun_process table/collection """
@@ -1,16 +1,34 @@
 __author__ = 'Bohdan Mushkevych'
 
-from threading import RLock
-
 from bson import ObjectId
-from synergy.db.manager import ds_manager
+from pymongo import ASCENDING
+from pymongo.errors import BulkWriteError
+
+from synergy.db.manager import ds_manager, index_registry
+from synergy.db.dao.base_dao import build_db_lock, iter_nonempty, iter_models, get_batch_size
 from synergy.db.model import job
 from synergy.db.model.job import Job
 from synergy.system.decorator import thread_safe
 from synergy.system.time_qualifier import *
 from synergy.scheduler.scheduler_constants import COLLECTION_JOB_HOURLY, COLLECTION_JOB_DAILY, \
     COLLECTION_JOB_MONTHLY, COLLECTION_JOB_YEARLY
-from synergy.conf import context
+from synergy.conf import context, settings
+
+# MongoDB error code for the unique index violation
+DUPLICATE_KEY_ERROR_CODE = 11000
+
+# fields read from the DB when the timetable is loaded
+# NOTICE: event logs are excluded and are read on demand by get_event_log
+JOB_PROJECTION = [job.PROCESS_NAME, job.TIMEPERIOD, job.STATE, job.RELATED_UNIT_OF_WORK, job.NUMBER_OF_FAILURES]
+
+
+def decode_job(document, projection=None):
+    """ :return: Job decoded from the <document>, read from the DB with the <projection>.
+        the event log of the job record is marked as not loaded, unless the projection includes it """
+    job_record = Job.from_json(document)
+    if projection is not None and job.EVENT_LOG not in projection:
+        job_record.mark_event_log_loaded(False)
+    return job_record
 
 
 QUERY_GET_LIKE_TIMEPERIOD = lambda timeperiod, include_running, include_processed, include_noop, include_failed: {
@@ -23,6 +41,16 @@ QUERY_GET_LIKE_TIMEPERIOD = lambda timeperiod, include_running, include_processe
                         job.STATE_NOOP if include_noop else None]}
 }
 
+for _collection_name in [COLLECTION_JOB_HOURLY, COLLECTION_JOB_DAILY, COLLECTION_JOB_MONTHLY, COLLECTION_JOB_YEARLY]:
+    index_registry.register_index(_collection_name,
+                                  [(job.PROCESS_NAME, ASCENDING), (job.TIMEPERIOD, ASCENDING)], unique=True)
+    # supports QUERY_GET_LIKE_TIMEPERIOD and the timetable load: range match on the timeperiod,
+    # while the state is matched against the index keys without reading the documents
+    index_registry.register_index(_collection_name, [(job.TIMEPERIOD, ASCENDING), (job.STATE, ASCENDING)])
+    index_registry.register_query_shape(_collection_name, 'get_like_timeperiod',
+                                        QUERY_GET_LIKE_TIMEPERIOD('2000010100', True, True, True, True))
+    index_registry.register_query_shape(_collection_name, 'cursor_all', {job.TIMEPERIOD: {'$gte': '2000010100'}})
+
 
 class JobDao(object):
     """ Thread-safe Data Access Object from job_XXX collection
@@ -30,26 +58,30 @@ class JobDao(object):
     def __init__(self, logger):
         super(JobDao, self).__init__()
         self.logger = logger
-        self.lock = RLock()
+        self.lock = build_db_lock()
         self.ds = ds_manager.ds_factory(logger)
 
-    @thread_safe
-    def _get_job_collection(self, process_name):
+    def _get_job_collection_name(self, process_name):
         """jobs are stored in 4 collections: hourly, daily, monthly and yearly;
-        method looks for the proper job_collection base on process TIME_QUALIFIER"""
+        method looks for the proper job_collection name base on process TIME_QUALIFIER"""
         qualifier = context.process_context[process_name].time_qualifier
 
         if qualifier == QUALIFIER_HOURLY:
-            collection = self.ds.connection(COLLECTION_JOB_HOURLY)
+            collection_name = COLLECTION_JOB_HOURLY
         elif qualifier == QUALIFIER_DAILY:
-            collection = self.ds.connection(COLLECTION_JOB_DAILY)
+            collection_name = COLLECTION_JOB_DAILY
         elif qualifier == QUALIFIER_MONTHLY:
-            collection = self.ds.connection(COLLECTION_JOB_MONTHLY)
+            collection_name = COLLECTION_JOB_MONTHLY
         elif qualifier == QUALIFIER_YEARLY:
-            collection = self.ds.connection(COLLECTION_JOB_YEARLY)
+            collection_name = COLLECTION_JOB_YEARLY
         else:
             raise ValueError('Unknown time qualifier: {0} for {1}'.format(qualifier, process_name))
-        return collection
+        return collection_name
+
+    @thread_safe
+    def _get_job_collection(self, process_name):
+        """ :return: job collection that hosts job records of the given process """
+        return self.ds.connection(self._get_job_collection_name(process_name))
 
     @thread_safe
     def get_by_id(self, process_name, db_id):
@@ -74,31 +106,144 @@ class JobDao(object):
         return Job.from_json(document)
 
     @thread_safe
-    def get_all(self, collection_name, since=None):
-        """ method returns all job records from a particular collection that are older than <since> """
+    def get_event_log(self, process_name, timeperiod):
+        """ method reads event log of a single job record
+            :return: list of event log entries """
+        collection = self._get_job_collection(process_name)
+        document = collection.find_one({job.PROCESS_NAME: process_name, job.TIMEPERIOD: timeperiod},
+                                       [job.EVENT_LOG])
+
+        if document is None:
+            raise LookupError('MongoDB has no job record in collection {0} for {1}@{2}'
+                              .format(collection, process_name, timeperiod))
+        return document.get(job.EVENT_LOG, [])
+
+    def _find_all(self, collection_name, since, projection=None, batch_size=None):
+        """ :return: batched cursor over the job documents from a particular collection that are older than <since> """
         if since is None:
             query = {}
         else:
             query = {job.TIMEPERIOD: {'$gte': since}}
         collection = self.ds.connection(collection_name)
+        return collection.find(query, projection).batch_size(get_batch_size(batch_size))
 
-        cursor = collection.find(query)
-        if cursor.count() == 0:
-            raise LookupError('MongoDB has no job records in collection {0} since {1}'.format(collection_name, since))
-        return [Job.from_json(document) for document in cursor]
+    @thread_safe
+    def iter_all(self, collection_name, since=None, batch_size=None):
+        """ method returns a generator of job records from a particular collection that are older than <since>.
+            documents are fetched from the DB in batches of <batch_size>, settings.db_bulk_size by default
+            :raise LookupError: if the collection has no such job records """
+        cursor = self._find_all(collection_name, since, batch_size=batch_size)
+        return iter_models(cursor, Job, 'MongoDB has no job records in collection {0} since {1}'
+                           .format(collection_name, since))
 
     @thread_safe
-    def run_query(self, collection_name, query):
-        """ method runs query on a specified collection and return a list of filtered Job records """
-        cursor = self.ds.filter(collection_name, query)
-        return [Job.from_json(document) for document in cursor]
+    def get_all(self, collection_name, since=None):
+        """ method returns all job records from a particular collection that are older than <since> """
+        return list(self.iter_all(collection_name, since))
+
+    @thread_safe
+    def cursor_all(self, collection_name, since=None):
+        """ method returns a streaming cursor over raw job documents from a particular collection
+            that are older than <since>. documents are fetched from the DB in batches of db_bulk_size
+            and contain only the fields listed in JOB_PROJECTION """
+        return self._find_all(collection_name, since, projection=JOB_PROJECTION)
+
+    @thread_safe
+    def get_many(self, keys):
+        """ method finds job records for the given keys, issuing a single query per job collection
+            :param keys: list of tuples (process_name, timeperiod)
+            :return: list of found job records. keys that have no job record in the DB are omitted """
+        # format: {collection_name: ({process_name}, {timeperiod}, {(process_name, timeperiod)})}
+        per_collection = dict()
+        for process_name, timeperiod in keys:
+            collection_name = self._get_job_collection_name(process_name)
+            if collection_name not in per_collection:
+                per_collection[collection_name] = (set(), set(), set())
+            process_names, timeperiods, requested_keys = per_collection[collection_name]
+            process_names.add(process_name)
+            timeperiods.add(timeperiod)
+            requested_keys.add((process_name, timeperiod))
+
+        job_records = []
+        for collection_name, (process_names, timeperiods, requested_keys) in per_collection.items():
+            query = {job.PROCESS_NAME: {'$in': list(process_names)},
+                     job.TIMEPERIOD: {'$in': list(timeperiods)}}
+            for document in self.ds.filter(collection_name, query):
+                job_record = Job.from_json(document)
+                # the query covers cartesian product of process names and timeperiods
+                if job_record.key in requested_keys:
+                    job_records.append(job_record)
+        return job_records
+
+    @thread_safe
+    def insert_many(self, instances):
+        """ method inserts job records in batches of db_bulk_size.
+            job records that already exist in the DB (i.e. violate the unique index) are skipped
+            :return: list of inserted job records, with their db_id set """
+        # format: {collection_name: [Job]}
+        per_collection = dict()
+        for instance in instances:
+            assert isinstance(instance, Job)
+            collection_name = self._get_job_collection_name(instance.process_name)
+            per_collection.setdefault(collection_name, []).append(instance)
+
+        bulk_size = settings.settings['db_bulk_size']
+        inserted = []
+        for collection_name, job_records in per_collection.items():
+            collection = self.ds.connection(collection_name)
+            for i in range(0, len(job_records), bulk_size):
+                batch = job_records[i:i + bulk_size]
+                documents = [instance.document for instance in batch]
+                duplicates = set()
+                try:
+                    collection.insert_many(documents, ordered=False)
+                except BulkWriteError as e:
+                    for write_error in e.details['writeErrors']:
+                        if write_error['code'] != DUPLICATE_KEY_ERROR_CODE:
+                            raise
+                        duplicates.add(write_error['index'])
+                    self.logger.warning('Skipped {0} existing job records in collection {1}'
+                                        .format(len(duplicates), collection_name))
+
+                for index, (instance, document) in enumerate(zip(batch, documents)):
+                    if index in duplicates:
+                        continue
+                    instance.db_id = document['_id']
+                    instance.mark_clean()
+                    inserted.append(instance)
+        return inserted
+
+    @thread_safe
+    def iter_query(self, collection_name, query, projection=None, batch_size=None):
+        """ method runs query on a specified collection and returns a generator of filtered Job records.
+            documents are fetched from the DB in batches of <batch_size>, settings.db_bulk_size by default
+            :param projection: list of field names to read; None to read whole documents
+            :raise LookupError: if the query matched no job records """
+        cursor = self.ds.filter(collection_name, query, projection).batch_size(get_batch_size(batch_size))
+        return iter_nonempty((decode_job(document, projection) for document in cursor),
+                             'MongoDB has no job records in collection {0} matching {1}'.format(collection_name, query))
+
+    @thread_safe
+    def run_query(self, collection_name, query, projection=None):
+        """ method runs query on a specified collection and return a list of filtered Job records
+            :param projection: list of field names to read; None to read whole documents.
+            NOTICE: records read with a projection are partial and must not be written back to the DB """
+        try:
+            return list(self.iter_query(collection_name, query, projection))
+        except LookupError:
+            return []
 
     @thread_safe
     def update(self, instance):
         assert isinstance(instance, Job)
         collection = self._get_job_collection(instance.process_name)
-        document = instance.document
         if instance.db_id:
-            document['_id'] = ObjectId(instance.db_id)
-        instance.db_id = collection.save(document)
+            # only the fields modified since the job record was read are written
+            # and new event log entries are pushed, so that a not-loaded event log is preserved in the DB
+            update = instance.get_update()
+            if update:
+                collection.update_one({'_id': ObjectId(instance.db_id)}, update)
+        else:
+            instance.db_id = collection.save(instance.document)
+        instance.mark_clean()
         return instance.db_id
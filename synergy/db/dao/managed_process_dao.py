@@ -1,10 +1,15 @@
 __author__ = 'Bohdan Mushkevych'
 
+from pymongo import ASCENDING
+
 from synergy.db.dao.base_dao import BaseDao
+from synergy.db.manager import index_registry
 from synergy.db.model.managed_process_entry import ManagedProcessEntry, PROCESS_NAME
 from synergy.system.decorator import thread_safe
 from synergy.scheduler.scheduler_constants import COLLECTION_MANAGED_PROCESS
 
+index_registry.register_index(COLLECTION_MANAGED_PROCESS, [(PROCESS_NAME, ASCENDING)], unique=True)
+
 
 class ManagedProcessDao(BaseDao):
     """ Thread-safe Data Access Object for managed_process table/collection """
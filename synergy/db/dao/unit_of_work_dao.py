@@ -1,20 +1,21 @@
 __author__ = 'Bohdan Mushkevych'
 
-from threading import RLock
+from datetime import datetime
 
 from bson.objectid import ObjectId
-from pymongo import ASCENDING
+from pymongo import ASCENDING, UpdateOne
 from pymongo.errors import DuplicateKeyError as MongoDuplicateKeyError
 
 from synergy.system import time_helper
 from synergy.system.time_qualifier import *
 from synergy.system.decorator import thread_safe
 from synergy.scheduler.scheduler_constants import COLLECTION_UNIT_OF_WORK
-from synergy.conf import context
+from synergy.conf import context, settings
 from synergy.db.error import DuplicateKeyError
 from synergy.db.model import unit_of_work
 from synergy.db.model.unit_of_work import UnitOfWork
-from synergy.db.manager import ds_manager
+from synergy.db.manager import ds_manager, index_registry
+from synergy.db.dao.base_dao import build_db_lock, iter_models, iter_nonempty, get_batch_size
 
 QUERY_GET_FREERUN_SINCE = lambda timeperiod, include_running, include_processed, include_noop, include_failed: {
     unit_of_work.TIMEPERIOD: {'$gte': timeperiod},
@@ -27,6 +28,38 @@ QUERY_GET_FREERUN_SINCE = lambda timeperiod, include_running, include_processed,
                                  unit_of_work.STATE_NOOP if include_noop else None]}
 }
 
+index_registry.register_index(COLLECTION_UNIT_OF_WORK,
+                              [(unit_of_work.PROCESS_NAME, ASCENDING),
+                               (unit_of_work.TIMEPERIOD, ASCENDING),
+                               (unit_of_work.START_OBJ_ID, ASCENDING),
+                               (unit_of_work.END_OBJ_ID, ASCENDING)], unique=True)
+# supports incremental scans of the GarbageCollector
+index_registry.register_index(COLLECTION_UNIT_OF_WORK, [(unit_of_work.UPDATED_AT, ASCENDING)])
+# supports QUERY_GET_FREERUN_SINCE: equality match on the type, $in match on the state and range match on the timeperiod
+index_registry.register_index(COLLECTION_UNIT_OF_WORK,
+                              [(unit_of_work.UNIT_OF_WORK_TYPE, ASCENDING),
+                               (unit_of_work.STATE, ASCENDING),
+                               (unit_of_work.TIMEPERIOD, ASCENDING)])
+# supports get_reprocessing_candidates: equality match on the type, $in match on the state
+# and range match on the start_timeperiod, that is added to the query when <since> is given
+index_registry.register_index(COLLECTION_UNIT_OF_WORK,
+                              [(unit_of_work.UNIT_OF_WORK_TYPE, ASCENDING),
+                               (unit_of_work.STATE, ASCENDING),
+                               (unit_of_work.START_TIMEPERIOD, ASCENDING)])
+
+index_registry.register_query_shape(COLLECTION_UNIT_OF_WORK, 'get_reprocessing_candidates',
+                                    {unit_of_work.STATE: {'$in': [unit_of_work.STATE_IN_PROGRESS,
+                                                                  unit_of_work.STATE_INVALID,
+                                                                  unit_of_work.STATE_REQUESTED]},
+                                     unit_of_work.UNIT_OF_WORK_TYPE: unit_of_work.TYPE_MANAGED,
+                                     unit_of_work.START_TIMEPERIOD: {'$gte': '2000000000'}},
+                                    sort=[('_id', ASCENDING)])
+index_registry.register_query_shape(COLLECTION_UNIT_OF_WORK, 'get_updated_since',
+                                    {unit_of_work.UPDATED_AT: {'$gt': '2000-01-01 00:00:00'},
+                                     unit_of_work.UNIT_OF_WORK_TYPE: unit_of_work.TYPE_MANAGED})
+index_registry.register_query_shape(COLLECTION_UNIT_OF_WORK, 'get_freerun_since',
+                                    QUERY_GET_FREERUN_SINCE('2000010100', True, True, True, True))
+
 
 class UnitOfWorkDao(object):
     """ Thread-safe Data Access Object from units_of_work table/collection """
@@ -34,7 +67,7 @@ class UnitOfWorkDao(object):
     def __init__(self, logger):
         super(UnitOfWorkDao, self).__init__()
         self.logger = logger
-        self.lock = RLock()
+        self.lock = build_db_lock()
         self.ds = ds_manager.ds_factory(logger)
 
     @thread_safe
@@ -51,42 +84,87 @@ class UnitOfWorkDao(object):
         return UnitOfWork.from_json(document)
 
     @thread_safe
-    def get_reprocessing_candidates(self, since=None):
-        """ method queries Unit Of Work whose <start_timeperiod> is younger than <since>
-        and who could be candidates for re-processing """
+    def get_many(self, uow_ids):
+        """ method reads unit_of_work records with one $in query per batch of db_bulk_size
+            :return: list of UnitOfWork; ids that are not found in the DB are skipped """
         collection = self.ds.connection(COLLECTION_UNIT_OF_WORK)
+        bulk_size = settings.settings['db_bulk_size']
 
-        query = {unit_of_work.STATE: {'$in': [unit_of_work.STATE_IN_PROGRESS,
-                                              unit_of_work.STATE_INVALID,
-                                              unit_of_work.STATE_REQUESTED]},
-                 unit_of_work.UNIT_OF_WORK_TYPE: unit_of_work.TYPE_MANAGED}
+        uows = []
+        for i in range(0, len(uow_ids), bulk_size):
+            query = {'_id': {'$in': [ObjectId(uow_id) for uow_id in uow_ids[i:i + bulk_size]]}}
+            uows.extend(UnitOfWork.from_json(document) for document in collection.find(query))
+        return uows
 
-        if since is None:
-            cursor = collection.find(query).sort('_id', ASCENDING)
-            candidates = [UnitOfWork.from_json(document) for document in cursor]
-        else:
-            candidates = []
-            yearly_timeperiod = time_helper.cast_to_time_qualifier(QUALIFIER_YEARLY, since)
-            query[unit_of_work.START_TIMEPERIOD] = {'$gte': yearly_timeperiod}
+    def _iter_candidates(self, query, since, batch_size=None):
+        """ generator runs the query and yields UnitOfWork records, whose <start_timeperiod> is younger than <since>.
+        documents are filtered before being decoded """
+        collection = self.ds.connection(COLLECTION_UNIT_OF_WORK)
+        batch_size = get_batch_size(batch_size)
 
-            cursor = collection.find(query).sort('_id', ASCENDING)
+        if since is None:
+            cursor = collection.find(query).sort('_id', ASCENDING).batch_size(batch_size)
             for document in cursor:
-                uow = UnitOfWork.from_json(document)
-                if uow.process_name not in context.process_context:
+                yield UnitOfWork.from_json(document)
+            return
+
+        yearly_timeperiod = time_helper.cast_to_time_qualifier(QUALIFIER_YEARLY, since)
+        query[unit_of_work.START_TIMEPERIOD] = {'$gte': yearly_timeperiod}
+
+        # format: {process_name: <since> casted to the process time qualifier}
+        process_specific_since = dict()
+        cursor = collection.find(query).sort('_id', ASCENDING).batch_size(batch_size)
+        for document in cursor:
+            process_name = document[unit_of_work.PROCESS_NAME]
+            if process_name not in process_specific_since:
+                if process_name not in context.process_context:
                     # this is a decommissioned process
                     continue
 
-                time_qualifier = context.process_context[uow.process_name].time_qualifier
+                time_qualifier = context.process_context[process_name].time_qualifier
                 if time_qualifier == QUALIFIER_REAL_TIME:
                     time_qualifier = QUALIFIER_HOURLY
-                process_specific_since = time_helper.cast_to_time_qualifier(time_qualifier, since)
+                process_specific_since[process_name] = time_helper.cast_to_time_qualifier(time_qualifier, since)
+
+            if process_specific_since[process_name] <= document[unit_of_work.START_TIMEPERIOD]:
+                yield UnitOfWork.from_json(document)
+
+    @thread_safe
+    def iter_reprocessing_candidates(self, since=None, batch_size=None):
+        """ method returns a generator of Unit Of Work whose <start_timeperiod> is younger than <since>
+        and who could be candidates for re-processing. NOTICE: the DAO lock is not held while the records are iterated
+        :raise LookupError: if there are no candidates """
+        query = {unit_of_work.STATE: {'$in': [unit_of_work.STATE_IN_PROGRESS,
+                                              unit_of_work.STATE_INVALID,
+                                              unit_of_work.STATE_REQUESTED]},
+                 unit_of_work.UNIT_OF_WORK_TYPE: unit_of_work.TYPE_MANAGED}
 
-                if process_specific_since <= uow.start_timeperiod:
-                    candidates.append(uow)
+        return iter_nonempty(self._iter_candidates(query, since, batch_size),
+                             'MongoDB has no UOW reprocessing candidates')
 
-        if len(candidates) == 0:
-            raise LookupError('MongoDB has no UOW reprocessing candidates')
-        return candidates
+    @thread_safe
+    def get_reprocessing_candidates(self, since=None):
+        """ method queries Unit Of Work whose <start_timeperiod> is younger than <since>
+        and who could be candidates for re-processing """
+        return list(self.iter_reprocessing_candidates(since))
+
+    @thread_safe
+    def iter_updated_since(self, updated_at, since=None, batch_size=None):
+        """ method returns a generator of managed Unit Of Work that were inserted or updated after <updated_at>,
+        regardless of their state. NOTICE: the DAO lock is not held while the records are iterated
+        :param since: has the same meaning as in the get_reprocessing_candidates """
+        # updated_at is stored in the DateTimeField string format, which preserves the chronological order
+        query = {unit_of_work.UPDATED_AT: {'$gt': UnitOfWork.updated_at.to_json(updated_at)},
+                 unit_of_work.UNIT_OF_WORK_TYPE: unit_of_work.TYPE_MANAGED}
+        return self._iter_candidates(query, since, batch_size)
+
+    @thread_safe
+    def get_updated_since(self, updated_at, since=None):
+        """ method queries managed Unit Of Work that were inserted or updated after <updated_at>,
+        regardless of their state
+        :param since: has the same meaning as in the get_reprocessing_candidates
+        :return: list of UnitOfWork records; empty list if no UOW was updated """
+        return list(self.iter_updated_since(updated_at, since))
 
     @thread_safe
     def get_by_params(self, process_name, timeperiod, start_obj_id, end_obj_id):
@@ -107,20 +185,60 @@ class UnitOfWorkDao(object):
         """ method finds unit_of_work record and change its status"""
         assert isinstance(instance, UnitOfWork)
         collection = self.ds.connection(COLLECTION_UNIT_OF_WORK)
-        document = instance.document
+        instance.updated_at = datetime.utcnow()
         if instance.db_id:
-            document['_id'] = ObjectId(instance.db_id)
-        instance.db_id = collection.save(document)
+            # only the fields modified since the unit_of_work was read are written
+            collection.update_one({'_id': ObjectId(instance.db_id)}, instance.get_update())
+        else:
+            instance.db_id = collection.save(instance.document)
+        instance.mark_clean()
         return instance.db_id
 
+    @thread_safe
+    def update_many(self, instances, field_names):
+        """ method writes given fields of the unit_of_work records with one bulk_write per batch of db_bulk_size
+        :param field_names: list of the fields to $set; the updated_at is always written """
+        collection = self.ds.connection(COLLECTION_UNIT_OF_WORK)
+        bulk_size = settings.settings['db_bulk_size']
+        field_names = list(field_names) + [unit_of_work.UPDATED_AT]
+
+        utc_now = datetime.utcnow()
+        requests = []
+        for instance in instances:
+            assert isinstance(instance, UnitOfWork)
+            instance.updated_at = utc_now
+            document = instance.document
+            update = dict((field_name, document.get(field_name)) for field_name in field_names)
+            requests.append(UpdateOne({'_id': ObjectId(instance.db_id)}, {'$set': update}))
+
+        for i in range(0, len(requests), bulk_size):
+            collection.bulk_write(requests[i:i + bulk_size], ordered=False)
+
+        for instance in instances:
+            instance.mark_clean(field_names)
+
+    @thread_safe
+    def update_heartbeat(self, uow_id):
+        """ method stamps <heartbeat_at> and <updated_at> of the unit_of_work record, identified by its db_id.
+        NOTICE: no UnitOfWork instance is involved, hence the method is safe to call from a timer thread
+        while the worker thread is modifying its own UnitOfWork instance """
+        collection = self.ds.connection(COLLECTION_UNIT_OF_WORK)
+        utc_now = datetime.utcnow()
+        collection.update_one({'_id': ObjectId(uow_id)},
+                              {'$set': {unit_of_work.HEARTBEAT_AT: UnitOfWork.heartbeat_at.to_json(utc_now),
+                                        unit_of_work.UPDATED_AT: UnitOfWork.updated_at.to_json(utc_now)}})
+
     @thread_safe
     def insert(self, instance):
         """ inserts a unit of work into MongoDB.
         :raises DuplicateKeyError: if such record already exist """
         assert isinstance(instance, UnitOfWork)
         collection = self.ds.connection(COLLECTION_UNIT_OF_WORK)
+        instance.updated_at = datetime.utcnow()
         try:
-            return collection.insert_one(instance.document).inserted_id
+            uow_id = collection.insert_one(instance.document).inserted_id
+            instance.mark_clean()
+            return uow_id
         except MongoDuplicateKeyError as e:
             exc = DuplicateKeyError(instance.process_name,
                                     instance.start_timeperiod,
@@ -135,10 +253,23 @@ class UnitOfWorkDao(object):
         collection.delete_one({'_id': ObjectId(uow_id)})
 
     @thread_safe
-    def run_query(self, query):
-        """ method runs the query and returns a list of filtered UnitOfWork records """
-        cursor = self.ds.filter(COLLECTION_UNIT_OF_WORK, query)
-        return [UnitOfWork.from_json(document) for document in cursor]
+    def iter_query(self, query, projection=None, batch_size=None):
+        """ method runs the query and returns a generator of filtered UnitOfWork records.
+            documents are fetched from the DB in batches of <batch_size>, settings.db_bulk_size by default
+            :param projection: list of field names to read; None to read whole documents
+            :raise LookupError: if the query matched no UOW records """
+        cursor = self.ds.filter(COLLECTION_UNIT_OF_WORK, query, projection).batch_size(get_batch_size(batch_size))
+        return iter_models(cursor, UnitOfWork, 'MongoDB has no UOW records matching {0}'.format(query))
+
+    @thread_safe
+    def run_query(self, query, projection=None):
+        """ method runs the query and returns a list of filtered UnitOfWork records
+            :param projection: list of field names to read; None to read whole documents.
+            NOTICE: records read with a projection are partial and must not be written back to the DB """
+        try:
+            return list(self.iter_query(query, projection))
+        except LookupError:
+            return []
 
     def recover_from_duplicatekeyerror(self, e):
         """ method tries to recover from DuplicateKeyError """
@@ -1,9 +1,21 @@
 __author__ = 'Bohdan Mushkevych'
 
+from pymongo import ASCENDING
+
+from synergy.conf import settings
 from synergy.db.dao.base_dao import BaseDao
-from synergy.db.model.uow_log_entry import UowLogEntry, RELATED_UNIT_OF_WORK, LOG
+from synergy.db.manager import index_registry
+from synergy.db.model.uow_log_entry import UowLogEntry, RELATED_UNIT_OF_WORK, LOG, CREATED_AT
 from synergy.scheduler.scheduler_constants import COLLECTION_UOW_LOG
 
+index_registry.register_index(COLLECTION_UOW_LOG, [(RELATED_UNIT_OF_WORK, ASCENDING)], unique=True)
+
+# expireAfterSeconds: <int> Used to create an expiring (TTL) collection.
+# MongoDB will automatically delete documents from this collection after <int> seconds.
+# The indexed field must be a UTC datetime or the data will not expire.
+index_registry.register_index(COLLECTION_UOW_LOG, [(CREATED_AT, ASCENDING)],
+                              expireAfterSeconds=settings.settings['uow_log_ttl_days'] * 86400)
+
 
 class UowLogDao(BaseDao):
     """ Thread-safe Data Access Object for uow_log table/collection """
@@ -1,12 +1,12 @@
 __author__ = 'Bohdan Mushkevych'
 
-import pymongo
-from synergy.db.manager import ds_manager
-from synergy.db.model.freerun_process_entry import ENTRY_NAME
-from synergy.db.model.managed_process_entry import PROCESS_NAME, ManagedProcessEntry
-from synergy.db.model.unit_of_work import TIMEPERIOD, START_OBJ_ID, END_OBJ_ID
-from synergy.db.model.uow_log_entry import RELATED_UNIT_OF_WORK, CREATED_AT
+import importlib
 
+from synergy.db.manager import ds_manager, index_registry
+from synergy.db.model.managed_process_entry import ManagedProcessEntry
+
+# DAO modules declare the indexes of their collections in the index_registry when imported
+from synergy.db.dao import unit_of_work_dao, job_dao, freerun_process_dao, uow_log_dao, box_configuration_dao
 from synergy.db.dao.managed_process_dao import ManagedProcessDao
 
 from synergy.conf import context, settings
@@ -54,40 +54,49 @@ def update_db():
         logger.info('Updated DB with process entry {0} from the context.'.format(process_entry.key))
 
 
-def reset_db():
-    """ drops the *scheduler* database, resets schema """
+def _load_index_declarations():
+    """ imports application modules, listed in the settings.db_index_modules, that declare indexes of
+        the application collections. indexes of the Synergy collections are declared by the imported DAO modules """
+    for module_name in settings.settings['db_index_modules']:
+        importlib.import_module(module_name)
+
+
+def ensure_indexes():
+    """ creates the declared indexes that are missing in the DB; existing indexes are left intact """
     logger = get_logger(PROCESS_SCHEDULER)
-    logger.info('Starting *scheduler* DB reset')
+    _load_index_declarations()
 
     ds = ds_manager.ds_factory(logger)
-    ds._db_client.drop_database(settings.settings['mongo_db_name'])
-    logger.info('*scheduler* db has been dropped')
+    number_of_failures = index_registry.ensure_indexes(ds, logger)
+    if number_of_failures:
+        logger.error('Failed to ensure {0} index(es). Inspect the log for details.'.format(number_of_failures))
+    return number_of_failures
+
 
-    connection = ds.connection(COLLECTION_MANAGED_PROCESS)
-    connection.create_index([(PROCESS_NAME, pymongo.ASCENDING)], unique=True)
+def explain_indexes():
+    """ runs explain() for the declared query shapes and reports the ones served by the collection scan
+        :return: list of QueryShape served by the collection scan """
+    logger = get_logger(PROCESS_SCHEDULER)
+    _load_index_declarations()
 
-    connection = ds.connection(COLLECTION_FREERUN_PROCESS)
-    connection.create_index([(PROCESS_NAME, pymongo.ASCENDING), (ENTRY_NAME, pymongo.ASCENDING)], unique=True)
+    ds = ds_manager.ds_factory(logger)
+    report = index_registry.explain_query_shapes(ds, logger)
+    collection_scans = [shape for shape, _, is_collection_scan in report if is_collection_scan]
+    logger.info('Explained {0} query shape(s), {1} of them are served by the collection scan.'
+                .format(len(report), len(collection_scans)))
+    return collection_scans
 
-    connection = ds.connection(COLLECTION_UNIT_OF_WORK)
-    connection.create_index([(PROCESS_NAME, pymongo.ASCENDING),
-                             (TIMEPERIOD, pymongo.ASCENDING),
-                             (START_OBJ_ID, pymongo.ASCENDING),
-                             (END_OBJ_ID, pymongo.ASCENDING)], unique=True)
 
-    connection = ds.connection(COLLECTION_UOW_LOG)
-    connection.create_index([(RELATED_UNIT_OF_WORK, pymongo.ASCENDING)], unique=True)
+def reset_db():
+    """ drops the *scheduler* database, resets schema """
+    logger = get_logger(PROCESS_SCHEDULER)
+    logger.info('Starting *scheduler* DB reset')
 
-    # expireAfterSeconds: <int> Used to create an expiring (TTL) collection.
-    # MongoDB will automatically delete documents from this collection after <int> seconds.
-    # The indexed field must be a UTC datetime or the data will not expire.
-    ttl_seconds = settings.settings['uow_log_ttl_days'] * 86400     # number of seconds for TTL
-    connection.create_index(CREATED_AT, expireAfterSeconds=ttl_seconds)
+    ds = ds_manager.ds_factory(logger)
+    ds.drop_database()
+    logger.info('*scheduler* db has been dropped')
 
-    for collection_name in [COLLECTION_JOB_HOURLY, COLLECTION_JOB_DAILY,
-                            COLLECTION_JOB_MONTHLY, COLLECTION_JOB_YEARLY]:
-        connection = ds.connection(collection_name)
-        connection.create_index([(PROCESS_NAME, pymongo.ASCENDING), (TIMEPERIOD, pymongo.ASCENDING)], unique=True)
+    ensure_indexes()
     logger.info('*scheduler* db has been recreated')
 
 
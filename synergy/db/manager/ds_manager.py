@@ -1,9 +1,14 @@
 __author__ = 'Bohdan Mushkevych'
 
+from threading import Lock
+
 from pymongo import MongoClient, ASCENDING, DESCENDING
 from bson.objectid import ObjectId
 
 from synergy.conf import settings
+from synergy.db.manager import index_registry
+from synergy.db.manager.sqlite_collection import SqliteDatabase
+from synergy.db.manager.memory_collection import MemoryDatabase
 from synergy.db.model.unit_of_work import TIMEPERIOD
 from odm.document import BaseDocument
 
@@ -15,18 +20,25 @@ if 'ds_factory' not in globals():
     def factory():
         # the only way to implement nonlocal closure variables in Python 2.X
         instances = {}
+        # DAOs are created by concurrent threads: the Data Source must be instantiated only once
+        lock = Lock()
 
         def get_instance(logger):
             ds_type = settings.settings['ds_type']
 
-            if ds_type not in instances:
-                if ds_type == "mongo_db":
-                    instances[ds_type] = MongoDbManager(logger)
-                elif ds_type == "hbase":
-                    instances[ds_type] = HBaseManager(logger)
-                else:
-                    raise ValueError('Unsupported Data Source type: {0}'.format(ds_type))
-            return instances[ds_type]
+            with lock:
+                if ds_type not in instances:
+                    if ds_type == "mongo_db":
+                        instances[ds_type] = MongoDbManager(logger)
+                    elif ds_type == "sqlite":
+                        instances[ds_type] = SqliteManager(logger)
+                    elif ds_type == "memory":
+                        instances[ds_type] = MemoryManager(logger)
+                    elif ds_type == "hbase":
+                        instances[ds_type] = HBaseManager(logger)
+                    else:
+                        raise ValueError('Unsupported Data Source type: {0}'.format(ds_type))
+                return instances[ds_type]
 
         return get_instance
 
@@ -51,10 +63,15 @@ class BaseManager(object):
         """ :return: True if the database server is available. False otherwise """
         raise NotImplementedError('method is_alive must be implemented by {0}'.format(self.__class__.__name__))
 
+    def drop_database(self):
+        """ drops all tables/collections of the Data Source """
+        raise NotImplementedError('method drop_database must be implemented by {0}'.format(self.__class__.__name__))
+
     def get(self, table_name, primary_key):
         raise NotImplementedError('method get must be implemented by {0}'.format(self.__class__.__name__))
 
-    def filter(self, table_name, query):
+    def filter(self, table_name, query, projection=None):
+        """ :param projection: list of field names to read; None to read whole documents """
         raise NotImplementedError('method filter must be implemented by {0}'.format(self.__class__.__name__))
 
     def update(self, table_name, primary_key, instance):
@@ -89,31 +106,20 @@ class BaseManager(object):
         raise NotImplementedError('method cursor_batch must be implemented by {0}'.format(self.__class__.__name__))
 
 
-class MongoDbManager(BaseManager):
-    def __init__(self, logger):
-        super(MongoDbManager, self).__init__(logger)
-        self._db_client = MongoClient(settings.settings['mongodb_host_list'])
-        self._db = self._db_client[settings.settings['mongo_db_name']]
-
-    def __del__(self):
-        try:
-            self._db_client.close()
-        except AttributeError:
-            pass
-
-    def __str__(self):
-        return 'MongoDbManager: {0}@{1}'\
-               .format(settings.settings['mongodb_host_list'], settings.settings['mongo_db_name'])
+class DocumentDbManager(BaseManager):
+    """ Data Source whose database follows the pymongo Database API: MongoDB or its emulation.
+        CRUD and cursor methods are implemented on top of the collections of the <db> """
 
-    def is_alive(self):
-        return self._db_client.admin.command('ping')
+    def __init__(self, logger, db):
+        super(DocumentDbManager, self).__init__(logger)
+        self._db = db
 
     def connection(self, table_name):
         return self._db[table_name]
 
-    def filter(self, table_name, query):
+    def filter(self, table_name, query, projection=None):
         conn = self._db[table_name]
-        return conn.find(query)
+        return conn.find(query, projection)
 
     def delete(self, table_name, primary_key):
         assert isinstance(primary_key, dict)
@@ -145,19 +151,19 @@ class MongoDbManager(BaseManager):
         query = {TIMEPERIOD: {'$gte': timeperiod_low, '$lt': timeperiod_high}}
         conn = self._db[table_name]
         asc_search = conn.find(spec=query, fields='_id').sort('_id', ASCENDING).limit(1)
-        if asc_search.count() == 0:
-            raise LookupError('No records in timeperiod: [{0} : {1}) in collection {2}'
-                              .format(timeperiod_low, timeperiod_high, table_name))
-        return asc_search[0]['_id']
+        for document in asc_search:
+            return document['_id']
+        raise LookupError('No records in timeperiod: [{0} : {1}) in collection {2}'
+                          .format(timeperiod_low, timeperiod_high, table_name))
 
     def lowest_primary_key(self, table_name, timeperiod_low, timeperiod_high):
         query = {TIMEPERIOD: {'$gte': timeperiod_low, '$lt': timeperiod_high}}
         conn = self._db[table_name]
         dec_search = conn.find(spec=query, fields='_id').sort('_id', DESCENDING).limit(1)
-        if dec_search.count() == 0:
-            raise LookupError('No records in timeperiod: [{0} : {1}) in collection {2}'
-                              .format(timeperiod_low, timeperiod_high, table_name))
-        return dec_search[0]['_id']
+        for document in dec_search:
+            return document['_id']
+        raise LookupError('No records in timeperiod: [{0} : {1}) in collection {2}'
+                          .format(timeperiod_low, timeperiod_high, table_name))
 
     def cursor_fine(self,
                     table_name,
@@ -189,5 +195,74 @@ class MongoDbManager(BaseManager):
         return conn.find(queue).batch_size(batch_size)
 
 
+class MongoDbManager(DocumentDbManager):
+    def __init__(self, logger):
+        # MongoClient is thread-safe and shares its connection pool among all the DAOs of the process
+        self._db_client = MongoClient(settings.settings['mongodb_host_list'],
+                                      maxPoolSize=settings.settings['db_pool_size'])
+        super(MongoDbManager, self).__init__(logger, self._db_client[settings.settings['mongo_db_name']])
+
+    def __del__(self):
+        try:
+            self._db_client.close()
+        except AttributeError:
+            pass
+
+    def __str__(self):
+        return 'MongoDbManager: {0}@{1}'\
+               .format(settings.settings['mongodb_host_list'], settings.settings['mongo_db_name'])
+
+    def is_alive(self):
+        return self._db_client.admin.command('ping')
+
+    def drop_database(self):
+        self._db_client.drop_database(settings.settings['mongo_db_name'])
+
+
+class SqliteManager(DocumentDbManager):
+    """ embedded Data Source for small deployments: documents are stored as JSON in the <sqlite_file> database.
+        SqliteDatabase emulates the subset of the pymongo API used by the DAOs """
+
+    def __init__(self, logger):
+        super(SqliteManager, self).__init__(logger, SqliteDatabase(settings.settings['sqlite_file']))
+
+    def __del__(self):
+        try:
+            self._db.close()
+        except AttributeError:
+            pass
+
+    def __str__(self):
+        return 'SqliteManager: {0}'.format(settings.settings['sqlite_file'])
+
+    def is_alive(self):
+        return self._db.connection.execute('SELECT 1').fetchone() is not None
+
+    def drop_database(self):
+        self._db.drop_database()
+
+
+class MemoryManager(DocumentDbManager):
+    """ process-local Data Source for benchmarks and hermetic tests: documents are held in the MemoryDatabase,
+        that emulates the subset of the pymongo API used by the DAOs.
+        Collections are created with the indexes declared in the index_registry, so that unique keys are enforced """
+
+    def __init__(self, logger):
+        super(MemoryManager, self).__init__(logger, MemoryDatabase(on_create=self._create_indexes))
+
+    def __str__(self):
+        return 'MemoryManager'
+
+    def _create_indexes(self, collection):
+        for entry in index_registry.get_indexes([collection.name]):
+            collection.create_index(entry.keys, **entry.options)
+
+    def is_alive(self):
+        return True
+
+    def drop_database(self):
+        self._db.drop_database()
+
+
 class HBaseManager(BaseManager):
     pass
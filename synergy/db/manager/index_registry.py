@@ -0,0 +1,124 @@
+__author__ = 'Bohdan Mushkevych'
+
+from collections import OrderedDict
+from pymongo.errors import OperationFailure
+
+# explain() stages that read the whole collection
+COLLECTION_SCAN_STAGES = ['COLLSCAN', 'BasicCursor']
+
+# format: {(collection_name, keys): IndexEntry}
+_indexes = OrderedDict()
+
+# format: {(collection_name, shape_name): QueryShape}
+_query_shapes = OrderedDict()
+
+
+class IndexEntry(object):
+    """ declaration of an index: list of (field_name, direction) tuples and create_index options """
+    def __init__(self, collection_name, keys, **options):
+        self.collection_name = collection_name
+        self.keys = list(keys)
+        self.options = options
+
+    @property
+    def key(self):
+        return self.collection_name, tuple(self.keys)
+
+
+class QueryShape(object):
+    """ sample of a query, issued by the DAO against the collection, that is expected to be served by an index """
+    def __init__(self, collection_name, shape_name, query, sort=None):
+        self.collection_name = collection_name
+        self.shape_name = shape_name
+        self.query = query
+        self.sort = sort
+
+    @property
+    def key(self):
+        return self.collection_name, self.shape_name
+
+
+def register_index(collection_name, keys, **options):
+    """ declares an index; repeated declarations of the same keys replace the previous one """
+    entry = IndexEntry(collection_name, keys, **options)
+    _indexes[entry.key] = entry
+
+
+def register_query_shape(collection_name, shape_name, query, sort=None):
+    """ declares a query shape, verified by the explain_query_shapes """
+    shape = QueryShape(collection_name, shape_name, query, sort)
+    _query_shapes[shape.key] = shape
+
+
+def get_indexes(collection_names=None):
+    """ :return: list of IndexEntry declared for the given collections, or for all collections if None """
+    return [entry for entry in _indexes.values()
+            if collection_names is None or entry.collection_name in collection_names]
+
+
+def get_query_shapes(collection_names=None):
+    """ :return: list of QueryShape declared for the given collections, or for all collections if None """
+    return [shape for shape in _query_shapes.values()
+            if collection_names is None or shape.collection_name in collection_names]
+
+
+def ensure_indexes(ds, logger, collection_names=None):
+    """ creates declared indexes that are missing in the DB. create_index is a no-op for the existing indexes,
+        hence the function is safe to run at every start-up
+        :return: number of indexes that could not be created """
+    number_of_failures = 0
+    for entry in get_indexes(collection_names):
+        try:
+            connection = ds.connection(entry.collection_name)
+            index_name = connection.create_index(entry.keys, **entry.options)
+            logger.info('Ensured index {0} in {1}.'.format(index_name, entry.collection_name))
+        except OperationFailure as e:
+            # for instance: an index with the same keys but different options already exists
+            number_of_failures += 1
+            logger.error('Unable to ensure index {0} in {1}: {2}'.format(entry.keys, entry.collection_name, e))
+    return number_of_failures
+
+
+def _get_winning_stages(plan):
+    """ :return: list of stage names of the winning query plan, including nested input stages """
+    if 'cursor' in plan:
+        # explain() format of MongoDB 2.x
+        return [plan['cursor'].split(' ')[0]]
+
+    stages = []
+    nodes = [plan.get('queryPlanner', plan).get('winningPlan', dict())]
+    while nodes:
+        node = nodes.pop()
+        if 'stage' in node:
+            stages.append(node['stage'])
+        if 'inputStage' in node:
+            nodes.append(node['inputStage'])
+        nodes.extend(node.get('inputStages', []))
+    return stages
+
+
+def is_collection_scan(plan):
+    """ :return: True if the explain() output describes a query plan that reads the whole collection """
+    return any(stage in COLLECTION_SCAN_STAGES for stage in _get_winning_stages(plan))
+
+
+def explain_query_shapes(ds, logger, collection_names=None):
+    """ runs explain() for every declared query shape and logs the ones served by the collection scan
+        :return: list of tuples (QueryShape, list of winning plan stages, is_collection_scan) """
+    report = []
+    for shape in get_query_shapes(collection_names):
+        cursor = ds.connection(shape.collection_name).find(shape.query)
+        if shape.sort:
+            cursor = cursor.sort(shape.sort)
+        plan = cursor.explain()
+        stages = _get_winning_stages(plan)
+        collection_scan = is_collection_scan(plan)
+        report.append((shape, stages, collection_scan))
+
+        if collection_scan:
+            logger.warning('Query {0} in {1} is served by the collection scan: {2}'
+                           .format(shape.shape_name, shape.collection_name, ' <- '.join(stages)))
+        else:
+            logger.info('Query {0} in {1} is served by: {2}'
+                        .format(shape.shape_name, shape.collection_name, ' <- '.join(stages)))
+    return report
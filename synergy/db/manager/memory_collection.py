@@ -0,0 +1,327 @@
+__author__ = 'Bohdan Mushkevych'
+
+import copy
+import bisect
+from collections import OrderedDict
+from threading import RLock
+
+from bson.objectid import ObjectId
+from pymongo import DESCENDING
+from pymongo.errors import OperationFailure
+
+from synergy.db.manager.mongo_dialect import ID, MISSING, EmulatedCursor, EmulatedCollection, \
+    index_keys, index_name, get_value, compile_query, apply_projection, duplicate_key_error, \
+    expiration_time
+
+
+def _sort_key(value):
+    """ MongoDB orders missing fields and None before any other value """
+    if value is MISSING or value is None:
+        return 0, None
+    return 1, value
+
+
+class _Highest(object):
+    """ bound that is greater than any _id: used to bisect the (sort key, _id) entries by the sort key only """
+    def __lt__(self, other):
+        return False
+
+    def __gt__(self, other):
+        return other is not self
+
+    def __eq__(self, other):
+        return other is self
+
+    def __ne__(self, other):
+        return other is not self
+
+    __hash__ = object.__hash__
+
+
+HIGHEST = _Highest()
+
+# operators on the first key of an index that are served by the bisection of its ordered entries
+RANGE_OPERATORS = ('$eq', '$gt', '$gte', '$lt', '$lte')
+
+
+class MemoryIndex(object):
+    """ index of the MemoryCollection. Entries of every index are kept in the sorted list of
+        (sort key of the first field, _id) tuples, that serves equality and range queries on the first field.
+        Unique indexes also map the tuple of the key values to the document _id """
+
+    def __init__(self, name, keys, unique, expire_after_seconds):
+        self.name = name
+        self.keys = keys
+        self.unique = unique
+        self.expire_after_seconds = expire_after_seconds
+        self.entries = dict()
+        self.ordered = []
+
+    def key_of(self, document):
+        """ :return: tuple of the indexed values; MongoDB indexes missing fields as None """
+        values = []
+        for field_name, _ in self.keys:
+            value = get_value(document, field_name)
+            values.append(None if value is MISSING else value)
+        return tuple(values)
+
+    def _ordered_entry(self, document):
+        return _sort_key(get_value(document, self.keys[0][0])), document[ID]
+
+    def add(self, document):
+        if self.unique:
+            self.entries[self.key_of(document)] = document[ID]
+        if self.ordered is not None:
+            try:
+                bisect.insort(self.ordered, self._ordered_entry(document))
+            except TypeError:
+                # values of different types are not comparable in Python 3: queries fall back to the scan
+                self.ordered = None
+
+    def remove(self, document):
+        if self.unique:
+            self.entries.pop(self.key_of(document), None)
+        if self.ordered is not None:
+            entry = self._ordered_entry(document)
+            position = bisect.bisect_left(self.ordered, entry)
+            if position < len(self.ordered) and self.ordered[position] == entry:
+                del self.ordered[position]
+
+    def find_ids(self, query):
+        """ :return: list of _id of the candidate documents for the query, or None if the index does not serve it """
+        field_name = self.keys[0][0]
+        condition = query.get(field_name, MISSING)
+        if self.unique and len(query) >= len(self.keys):
+            key = []
+            for key_field_name, _ in self.keys:
+                value = query.get(key_field_name, MISSING)
+                if value is MISSING or isinstance(value, (dict, list)):
+                    break
+                key.append(value)
+            else:
+                db_id = self.entries.get(tuple(key))
+                return [] if db_id is None else [db_id]
+
+        if self.ordered is None or condition is MISSING or condition is None or isinstance(condition, list):
+            return None
+        if not isinstance(condition, dict):
+            condition = {'$eq': condition}
+        if not condition or any(operator not in RANGE_OPERATORS or operand is None
+                                for operator, operand in condition.items()):
+            return None
+
+        # range queries do not match missing fields and None, sorted first
+        lower = bisect.bisect_left(self.ordered, ((1,),))
+        upper = len(self.ordered)
+        try:
+            for operator, operand in condition.items():
+                if operator in ('$eq', '$gte'):
+                    lower = max(lower, bisect.bisect_left(self.ordered, ((1, operand),)))
+                if operator == '$gt':
+                    lower = max(lower, bisect.bisect_right(self.ordered, ((1, operand), HIGHEST)))
+                if operator in ('$eq', '$lte'):
+                    upper = min(upper, bisect.bisect_right(self.ordered, ((1, operand), HIGHEST)))
+                if operator == '$lt':
+                    upper = min(upper, bisect.bisect_left(self.ordered, ((1, operand),)))
+        except TypeError:
+            return None
+        return [db_id for _, db_id in self.ordered[lower:upper]]
+
+
+class MemoryCursor(EmulatedCursor):
+    """ the query is executed on the first iteration against a snapshot of the collection;
+        documents are deep-copied, so that the caller can not alter the stored ones """
+
+    def __init__(self, collection, query, projection=None):
+        super(MemoryCursor, self).__init__(collection, query, projection)
+        self._documents = None
+
+    def next(self):
+        if self._documents is None:
+            documents = self._collection.select(self._query)
+            for field_name, direction in reversed(self._sort):
+                documents.sort(key=lambda document: _sort_key(get_value(document, field_name)),
+                               reverse=direction == DESCENDING)
+            documents = documents[self._skip:]
+            if self._limit:
+                documents = documents[:self._limit]
+            documents.reverse()
+            self._documents = documents
+
+        if not self._documents:
+            raise StopIteration()
+        return apply_projection(copy.deepcopy(self._documents.pop()), self._projection)
+
+    def explain(self):
+        """ :return: query plan in the MongoDB 3.x explain() format: IXSCAN if the query or the sort
+            addresses the first key of an index, including the implicit index on the _id """
+        query = self._query if isinstance(self._query, dict) else {ID: self._query}
+        field_names = [field_name for field_name in query or dict() if not field_name.startswith('$')]
+        if not field_names and self._sort:
+            field_names = [self._sort[0][0]]
+
+        for index in self._collection.indexes.values():
+            if index.keys[0][0] in field_names:
+                return {'queryPlanner': {'winningPlan': {'stage': 'FETCH',
+                                                         'inputStage': {'stage': 'IXSCAN', 'indexName': index.name}}}}
+        if ID in field_names:
+            return {'queryPlanner': {'winningPlan': {'stage': 'IDHACK'}}}
+        return {'queryPlanner': {'winningPlan': {'stage': 'COLLSCAN'}}}
+
+
+class MemoryCollection(EmulatedCollection):
+    """ dictionary of documents that emulates the subset of the pymongo Collection API used by the DAOs.
+        Unique indexes are enforced. Queries are served by the first index that supports them, otherwise
+        the collection is scanned. NOTICE: writes are isolated by the database lock, but are not rolled back """
+
+    def __init__(self, database, name):
+        super(MemoryCollection, self).__init__(database, name)
+        self.documents = OrderedDict()
+        self.indexes = OrderedDict()
+
+    def transaction(self):
+        return self.database.lock
+
+    def select(self, query):
+        """ :return: list of the stored documents matching the query """
+        with self.database.lock:
+            if query is not None and not isinstance(query, dict):
+                query = {ID: query}
+
+            candidates = None
+            if query and ID in query and not isinstance(query[ID], dict):
+                candidates = [self.documents.get(query[ID])]
+            elif query:
+                for index in self.indexes.values():
+                    db_ids = index.find_ids(query)
+                    if db_ids is not None:
+                        candidates = [self.documents.get(db_id) for db_id in db_ids]
+                        break
+            if candidates is None:
+                candidates = self.documents.values()
+            predicate = compile_query(query)
+            return [document for document in candidates if document is not None and predicate(document)]
+
+    def _check_unique(self, document):
+        """ :raise DuplicateKeyError: if another document has the same values of a unique index keys """
+        for index in self.indexes.values():
+            if not index.unique:
+                continue
+            db_id = index.entries.get(index.key_of(document), document[ID])
+            if db_id != document[ID]:
+                raise duplicate_key_error('collection: {0} index: {1} dup key: {2}'
+                                          .format(self.name, index.name, index.key_of(document)))
+
+    def _add_to_indexes(self, document):
+        for index in self.indexes.values():
+            index.add(document)
+
+    def _remove_from_indexes(self, document):
+        for index in self.indexes.values():
+            index.remove(document)
+
+    def _insert(self, document):
+        if ID not in document:
+            document[ID] = ObjectId()
+        if document[ID] in self.documents:
+            raise duplicate_key_error('collection: {0} index: _id_ dup key: {1}'.format(self.name, document[ID]))
+        self._check_unique(document)
+
+        stored = copy.deepcopy(document)
+        self.documents[stored[ID]] = stored
+        self._add_to_indexes(stored)
+        return document[ID]
+
+    def _replace(self, document):
+        previous = self.documents.get(document[ID])
+        if previous is None:
+            return 0
+        self._check_unique(document)
+
+        stored = copy.deepcopy(document)
+        self._remove_from_indexes(previous)
+        self.documents[stored[ID]] = stored
+        self._add_to_indexes(stored)
+        return 1
+
+    def _delete(self, query, multi):
+        documents = self.select(query)
+        if not multi:
+            documents = documents[:1]
+        for document in documents:
+            self._remove_from_indexes(document)
+            del self.documents[document[ID]]
+        return {'n': len(documents)}
+
+    def find(self, filter=None, projection=None, spec=None, fields=None, **kwargs):
+        """ spec and fields are the legacy names of the filter and projection """
+        return MemoryCursor(self,
+                            filter if filter is not None else spec,
+                            projection if projection is not None else fields)
+
+    def create_index(self, keys, unique=False, expireAfterSeconds=None, name=None, **kwargs):
+        """ expireAfterSeconds registers a TTL index: documents whose field, in the DateTimeField string format,
+            is older than that are removed by the writes
+            :return: index name in the MongoDB notation """
+        keys = index_keys(keys)
+        if name is None:
+            name = index_name(keys)
+
+        with self.database.lock:
+            if name in self.indexes:
+                return name
+
+            index = MemoryIndex(name, keys, unique, expireAfterSeconds)
+            for document in self.documents.values():
+                if unique and index.key_of(document) in index.entries:
+                    raise OperationFailure('Unable to create unique index {0} in {1}: dup key {2}'
+                                           .format(name, self.name, index.key_of(document)))
+                index.add(document)
+            self.indexes[name] = index
+        return name
+
+    def drop(self):
+        self.database.drop_collection(self.name)
+
+    def _get_ttl_indexes(self):
+        return [(index.keys[0][0], index.expire_after_seconds) for index in self.indexes.values()
+                if index.expire_after_seconds is not None]
+
+    def _delete_expired(self, field_name, seconds):
+        self._delete({field_name: {'$lt': expiration_time(seconds)}}, multi=True)
+
+
+class MemoryDatabase(object):
+    """ process-local database in the pymongo Database notation. A single re-entrant lock serializes the writes
+        and the query snapshots of all its collections.
+        :param on_create: optional callable(collection), called for every new collection; e.g. to create indexes """
+
+    def __init__(self, on_create=None):
+        self.lock = RLock()
+        self.collections = OrderedDict()
+        self.on_create = on_create
+
+    def __getitem__(self, name):
+        with self.lock:
+            collection = self.collections.get(name)
+            if collection is None:
+                collection = MemoryCollection(self, name)
+                self.collections[name] = collection
+                if self.on_create is not None:
+                    self.on_create(collection)
+        return collection
+
+    def collection_names(self):
+        with self.lock:
+            return list(self.collections)
+
+    def drop_collection(self, name):
+        with self.lock:
+            self.collections.pop(name, None)
+
+    def drop_database(self):
+        with self.lock:
+            self.collections.clear()
+
+    def close(self):
+        pass
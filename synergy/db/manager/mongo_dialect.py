@@ -0,0 +1,402 @@
+__author__ = 'Bohdan Mushkevych'
+
+import copy
+import time
+from datetime import datetime, timedelta
+
+from six import string_types
+from pymongo import ASCENDING
+from pymongo.errors import DuplicateKeyError, BulkWriteError, OperationFailure
+from pymongo.operations import InsertOne, UpdateOne, UpdateMany, ReplaceOne, DeleteOne, DeleteMany
+from pymongo.results import InsertOneResult, InsertManyResult, UpdateResult, DeleteResult, BulkWriteResult
+
+# MongoDB error code for the unique index violation, expected by the DAOs
+DUPLICATE_KEY_ERROR_CODE = 11000
+
+ID = '_id'
+
+# marker of the field that is absent from the document
+MISSING = object()
+
+# number of seconds between the removals of the expired documents from a collection with a TTL index
+TTL_PURGE_INTERVAL = 60
+
+# format of the DateTimeField values, used to compare them with the TTL expiration time
+TTL_DT_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+def index_keys(key_or_list, direction=None):
+    """ :return: list of (field_name, direction) tuples in the pymongo sort and create_index notations """
+    if isinstance(key_or_list, string_types):
+        return [(key_or_list, direction if direction is not None else ASCENDING)]
+    return [(key, key_direction) for key, key_direction in key_or_list]
+
+
+def index_name(keys):
+    """ :return: index name in the MongoDB notation, for instance: process_name_1_timeperiod_1 """
+    return '_'.join('{0}_{1}'.format(field_name, direction) for field_name, direction in keys)
+
+
+def split_path(document, path, create=False):
+    """ :return: tuple (dict holding the last segment of the dotted path, last segment) or (None, segment) """
+    segments = path.split('.')
+    for segment in segments[:-1]:
+        if segment not in document and create:
+            document[segment] = dict()
+        document = document.get(segment)
+        if not isinstance(document, dict):
+            return None, segments[-1]
+    return document, segments[-1]
+
+
+def apply_update(document, update, is_upsert=False):
+    """ applies the MongoDB update to the document in place; document without operators replaces the content """
+    if not any(key.startswith('$') for key in update):
+        db_id = document.get(ID)
+        document.clear()
+        document.update(copy.deepcopy(update))
+        if db_id is not None:
+            document[ID] = db_id
+        return
+
+    for operator, fields in update.items():
+        if operator == '$setOnInsert' and not is_upsert:
+            continue
+        for path, value in fields.items():
+            container, field_name = split_path(document, path, create=operator != '$unset')
+            if operator in ('$set', '$setOnInsert'):
+                container[field_name] = copy.deepcopy(value)
+            elif operator == '$unset':
+                if container is not None:
+                    container.pop(field_name, None)
+            elif operator == '$inc':
+                container[field_name] = container.get(field_name, 0) + value
+            elif operator == '$push':
+                items = container.setdefault(field_name, [])
+                if isinstance(value, dict) and '$each' in value:
+                    position = value.get('$position')
+                    if position is None:
+                        items.extend(copy.deepcopy(value['$each']))
+                    else:
+                        items[position:position] = copy.deepcopy(value['$each'])
+                    if '$slice' in value:
+                        limit = value['$slice']
+                        container[field_name] = items[:limit] if limit >= 0 else items[limit:]
+                else:
+                    items.append(copy.deepcopy(value))
+            else:
+                raise OperationFailure('Update operator {0} is not supported'.format(operator))
+
+
+def apply_projection(document, projection):
+    """ :return: document with the fields selected by the projection: a list of field names or a dict """
+    if projection is None:
+        return document
+    if isinstance(projection, string_types):
+        projection = [projection]
+    if not isinstance(projection, dict):
+        projection = dict((field_name, 1) for field_name in projection)
+
+    included = [field_name.split('.')[0] for field_name, value in projection.items() if value and field_name != ID]
+    excluded = [field_name for field_name, value in projection.items() if not value]
+    if included:
+        document = dict((field_name, document[field_name]) for field_name in [ID] + included
+                        if field_name in document)
+    for field_name in excluded:
+        document.pop(field_name, None)
+    return document
+
+
+def get_value(document, path):
+    """ :return: value of the dotted path in the document or MISSING """
+    container, field_name = split_path(document, path)
+    if container is None:
+        return MISSING
+    return container.get(field_name, MISSING)
+
+
+def _compare(value, operator, operand):
+    try:
+        if operator == '$gt':
+            return value > operand
+        elif operator == '$gte':
+            return value >= operand
+        elif operator == '$lt':
+            return value < operand
+        else:
+            return value <= operand
+    except TypeError:
+        # MongoDB compares values of the same type only
+        return False
+
+
+def _is_equal(value, operand):
+    """ MongoDB matches missing fields with None, and array fields with any of their elements """
+    if value is MISSING:
+        return operand is None
+    if isinstance(value, list) and not isinstance(operand, list):
+        return operand in value
+    return value == operand
+
+
+QUERY_OPERATORS = ('$eq', '$ne', '$gt', '$gte', '$lt', '$lte', '$in', '$nin', '$exists')
+
+
+def _match_condition(value, operator, operand):
+    if operator == '$eq':
+        return _is_equal(value, operand)
+    elif operator == '$ne':
+        return not _is_equal(value, operand)
+    elif operator in ('$gt', '$gte', '$lt', '$lte'):
+        return value is not MISSING and value is not None and _compare(value, operator, operand)
+    elif operator == '$in':
+        return any(_is_equal(value, item) for item in operand)
+    elif operator == '$nin':
+        return not any(_is_equal(value, item) for item in operand)
+    elif operator == '$exists':
+        return (value is not MISSING) == bool(operand)
+
+
+def compile_query(query):
+    """ parses the subset of the MongoDB query language used by the DAOs once per query,
+        rather than once per scanned document
+        :return: predicate(document) that is True if the document matches the query """
+    if query is None:
+        return lambda document: True
+    if not isinstance(query, dict):
+        query = {ID: query}
+
+    predicates = []
+    for field_name, condition in query.items():
+        if field_name in ('$and', '$or'):
+            sub_predicates = [compile_query(sub_query) for sub_query in condition]
+            joint = all if field_name == '$and' else any
+            predicates.append(lambda document, sub_predicates=sub_predicates, joint=joint:
+                              joint(predicate(document) for predicate in sub_predicates))
+            continue
+
+        if isinstance(condition, dict) and condition and all(key.startswith('$') for key in condition):
+            operators = list(condition.items())
+        else:
+            operators = [('$eq', condition)]
+        for operator, _ in operators:
+            if operator not in QUERY_OPERATORS:
+                raise OperationFailure('Query operator {0} is not supported'.format(operator))
+
+        if '.' in field_name:
+            read = lambda document, field_name=field_name: get_value(document, field_name)
+        else:
+            read = lambda document, field_name=field_name: document.get(field_name, MISSING)
+        predicates.append(lambda document, read=read, operators=operators:
+                          all(_match_condition(read(document), operator, operand) for operator, operand in operators))
+
+    if len(predicates) == 1:
+        return predicates[0]
+    return lambda document: all(predicate(document) for predicate in predicates)
+
+
+def expiration_time(seconds):
+    """ :return: time, in the DateTimeField string format, before which documents of a TTL index are expired """
+    return (datetime.utcnow() - timedelta(seconds=seconds)).strftime(TTL_DT_FORMAT)
+
+
+def duplicate_key_error(e):
+    return DuplicateKeyError('E11000 duplicate key error: {0}'.format(e), DUPLICATE_KEY_ERROR_CODE)
+
+
+class EmulatedCursor(object):
+    """ lazy cursor in the pymongo notation: the query is executed on the first iteration """
+
+    def __init__(self, collection, query, projection=None):
+        self._collection = collection
+        self._query = query
+        self._projection = projection
+        self._sort = []
+        self._limit = 0
+        self._skip = 0
+        self._batch_size = 0
+
+    def sort(self, key_or_list, direction=None):
+        self._sort = index_keys(key_or_list, direction)
+        return self
+
+    def limit(self, limit):
+        self._limit = limit
+        return self
+
+    def skip(self, skip):
+        self._skip = skip
+        return self
+
+    def batch_size(self, batch_size):
+        self._batch_size = batch_size
+        return self
+
+    def __iter__(self):
+        return self
+
+    def next(self):
+        raise NotImplementedError('method next must be implemented by {0}'.format(self.__class__.__name__))
+
+    def __next__(self):
+        return self.next()
+
+    def explain(self):
+        """ :return: query plan in the MongoDB 3.x explain() format """
+        raise NotImplementedError('method explain must be implemented by {0}'.format(self.__class__.__name__))
+
+
+class EmulatedCollection(object):
+    """ subset of the pymongo Collection API used by the DAOs, implemented on top of the primitive operations
+        of the Data Source: find, _insert, _replace, _delete and the transaction """
+
+    def __init__(self, database, name):
+        self.database = database
+        self.name = name
+        self.ttl_purged_at = 0
+
+    def transaction(self):
+        """ :return: context manager that makes a series of the primitive operations atomic """
+        raise NotImplementedError('method transaction must be implemented by {0}'.format(self.__class__.__name__))
+
+    def find(self, filter=None, projection=None, spec=None, fields=None, **kwargs):
+        """ :return: EmulatedCursor. spec and fields are the legacy names of the filter and projection """
+        raise NotImplementedError('method find must be implemented by {0}'.format(self.__class__.__name__))
+
+    def _insert(self, document):
+        """ inserts the document and assigns its _id, if missing
+            :raise DuplicateKeyError: if the document violates a unique index
+            :return: _id of the document """
+        raise NotImplementedError('method _insert must be implemented by {0}'.format(self.__class__.__name__))
+
+    def _replace(self, document):
+        """ replaces the stored document with the same _id
+            :raise DuplicateKeyError: if the document violates a unique index
+            :return: number of replaced documents """
+        raise NotImplementedError('method _replace must be implemented by {0}'.format(self.__class__.__name__))
+
+    def _delete(self, query, multi):
+        """ :return: raw result in the MongoDB delete command format """
+        raise NotImplementedError('method _delete must be implemented by {0}'.format(self.__class__.__name__))
+
+    def _get_ttl_indexes(self):
+        """ :return: list of (field_name, expireAfterSeconds) tuples of the TTL indexes of the collection """
+        raise NotImplementedError('method _get_ttl_indexes must be implemented by {0}'
+                                  .format(self.__class__.__name__))
+
+    def _delete_expired(self, field_name, seconds):
+        """ removes documents whose <field_name>, in the DateTimeField string format, is older than <seconds> """
+        raise NotImplementedError('method _delete_expired must be implemented by {0}'
+                                  .format(self.__class__.__name__))
+
+    def _after_write(self):
+        """ hook called after every write operation: removes documents that expired according to the TTL indexes
+            of the collection, at most once per TTL_PURGE_INTERVAL seconds """
+        now = time.time()
+        if now - self.ttl_purged_at < TTL_PURGE_INTERVAL:
+            return
+        self.ttl_purged_at = now
+
+        for field_name, seconds in self._get_ttl_indexes():
+            with self.transaction():
+                self._delete_expired(field_name, seconds)
+
+    def _update(self, query, update, upsert, multi):
+        """ :return: raw result in the MongoDB update command format """
+        with self.transaction():
+            cursor = self.find(query)
+            if not multi:
+                cursor = cursor.limit(1)
+            documents = list(cursor)
+            for document in documents:
+                apply_update(document, update)
+                self._replace(document)
+
+            result = {'n': len(documents), 'nModified': len(documents)}
+            if not documents and upsert:
+                document = dict((field_name, value) for field_name, value in (query or dict()).items()
+                                if not field_name.startswith('$') and not isinstance(value, dict))
+                apply_update(document, update, is_upsert=True)
+                result['upserted'] = self._insert(document)
+                result['n'] = 1
+        self._after_write()
+        return result
+
+    def find_one(self, filter=None, *args, **kwargs):
+        for document in self.find(filter, *args, **kwargs).limit(1):
+            return document
+        return None
+
+    def insert_one(self, document):
+        with self.transaction():
+            inserted_id = self._insert(document)
+        self._after_write()
+        return InsertOneResult(inserted_id, True)
+
+    def insert_many(self, documents, ordered=True):
+        result = self.bulk_write([InsertOne(document) for document in documents], ordered=ordered)
+        return InsertManyResult([document[ID] for document in documents if ID in document], result.acknowledged)
+
+    def save(self, document):
+        """ legacy upsert by the _id """
+        with self.transaction():
+            if ID not in document or self._replace(document) == 0:
+                self._insert(document)
+        self._after_write()
+        return document[ID]
+
+    def update(self, spec, document, upsert=False, multi=False):
+        """ legacy update: applies the update operators or replaces the document """
+        return self._update(spec, document, upsert, multi)
+
+    def update_one(self, filter, update, upsert=False):
+        return UpdateResult(self._update(filter, update, upsert, multi=False), True)
+
+    def update_many(self, filter, update, upsert=False):
+        return UpdateResult(self._update(filter, update, upsert, multi=True), True)
+
+    def replace_one(self, filter, replacement, upsert=False):
+        return UpdateResult(self._update(filter, replacement, upsert, multi=False), True)
+
+    def delete_one(self, filter):
+        with self.transaction():
+            return DeleteResult(self._delete(filter, multi=False), True)
+
+    def delete_many(self, filter):
+        with self.transaction():
+            return DeleteResult(self._delete(filter, multi=True), True)
+
+    def bulk_write(self, requests, ordered=True):
+        """ executes the pymongo write operations in a single transaction
+            :raise BulkWriteError: if some operations violated unique indexes; the others are applied """
+        result = {'nInserted': 0, 'nUpserted': 0, 'nMatched': 0, 'nModified': 0, 'nRemoved': 0,
+                  'upserted': [], 'writeErrors': [], 'writeConcernErrors': []}
+        with self.transaction():
+            for index, request in enumerate(requests):
+                try:
+                    if isinstance(request, InsertOne):
+                        self._insert(request._doc)
+                        result['nInserted'] += 1
+                    elif isinstance(request, (UpdateOne, UpdateMany, ReplaceOne)):
+                        raw_result = self._update(request._filter, request._doc, request._upsert,
+                                                  multi=isinstance(request, UpdateMany))
+                        if 'upserted' in raw_result:
+                            result['nUpserted'] += 1
+                            result['upserted'].append({'index': index, ID: raw_result['upserted']})
+                        else:
+                            result['nMatched'] += raw_result['n']
+                            result['nModified'] += raw_result['nModified']
+                    elif isinstance(request, (DeleteOne, DeleteMany)):
+                        result['nRemoved'] += self._delete(request._filter, isinstance(request, DeleteMany))['n']
+                    else:
+                        raise OperationFailure('Operation {0} is not supported'.format(type(request).__name__))
+                except DuplicateKeyError as e:
+                    result['writeErrors'].append({'index': index, 'code': DUPLICATE_KEY_ERROR_CODE,
+                                                  'errmsg': str(e), 'op': request._doc})
+                    if ordered:
+                        break
+
+        self._after_write()
+        if result['writeErrors']:
+            raise BulkWriteError(result)
+        return BulkWriteResult(result, True)
@@ -0,0 +1,352 @@
+__author__ = 'Bohdan Mushkevych'
+
+import re
+import sqlite3
+from contextlib import contextmanager
+from threading import Lock, local
+
+from six import string_types, integer_types
+from bson import json_util
+from bson.objectid import ObjectId
+from pymongo import DESCENDING
+from pymongo.errors import OperationFailure
+
+from synergy.db.manager.mongo_dialect import ID, EmulatedCursor, EmulatedCollection, \
+    index_keys, index_name, apply_projection, duplicate_key_error, expiration_time
+
+# table and field names are inlined into the SQL statements, since SQLite matches
+# the expression indexes only against literal expressions. hence, names are validated
+NAME_PATTERN = re.compile(r'^[A-Za-z_][A-Za-z0-9_.]*$')
+
+# internal table that holds TTL indexes: MongoDB expireAfterSeconds counterpart
+TTL_TABLE = '_synergy_ttl'
+
+# number of rows fetched from SQLite at once, unless the cursor batch_size is given
+DEFAULT_BATCH_SIZE = 1024
+
+
+def _validate_name(name):
+    if not NAME_PATTERN.match(name):
+        raise OperationFailure('Name {0} is not supported by the SQLite Data Source'.format(name))
+    return name
+
+
+def _field_expression(field_name):
+    """ :return: SQL expression that reads the field from the JSON document; dotted names address nested fields """
+    if field_name == ID:
+        return ID
+    return "json_extract(document, '$.{0}')".format(_validate_name(field_name))
+
+
+def _encode_id(value):
+    """ _id is stored in its own column in the MongoDB Extended JSON format:
+        encoded ObjectIds retain their MongoDB order """
+    return json_util.dumps(value)
+
+
+def _encode_value(value):
+    """ :return: query operand in the form returned by the json_extract for the stored document field """
+    if isinstance(value, bool):
+        return int(value)
+    if value is None or isinstance(value, string_types + integer_types + (float,)):
+        return value
+    raise OperationFailure('SQLite Data Source supports only scalar query values; {0} was given'
+                           .format(type(value).__name__))
+
+
+def _build_condition(field_name, operator, operand):
+    """ :return: tuple (SQL condition, list of parameters) for a single query operator applied to the field """
+    expression = _field_expression(field_name)
+    encode = _encode_id if field_name == ID else _encode_value
+
+    if operator == '$eq':
+        if operand is None:
+            return '{0} IS NULL'.format(expression), []
+        return '{0} = ?'.format(expression), [encode(operand)]
+    elif operator == '$ne':
+        if operand is None:
+            return '{0} IS NOT NULL'.format(expression), []
+        # missing fields are not equal to any value
+        return '({0} IS NULL OR {0} != ?)'.format(expression), [encode(operand)]
+    elif operator in ('$gt', '$gte', '$lt', '$lte'):
+        sql_operator = {'$gt': '>', '$gte': '>=', '$lt': '<', '$lte': '<='}[operator]
+        return '{0} {1} ?'.format(expression, sql_operator), [encode(operand)]
+    elif operator in ('$in', '$nin'):
+        values = [encode(value) for value in operand if value is not None]
+        has_null = len(values) != len(operand)
+        conditions = []
+        if operator == '$in':
+            if values:
+                conditions.append('{0} IN ({1})'.format(expression, ', '.join(['?'] * len(values))))
+            if has_null:
+                # MongoDB matches missing fields with None
+                conditions.append('{0} IS NULL'.format(expression))
+            return '({0})'.format(' OR '.join(conditions) or '0'), values
+        else:
+            if values:
+                conditions.append('{0} NOT IN ({1})'.format(expression, ', '.join(['?'] * len(values))))
+            if has_null:
+                conditions.append('{0} IS NOT NULL'.format(expression))
+                return '({0})'.format(' AND '.join(conditions)), values
+            return '({0} IS NULL OR {1})'.format(expression, conditions[0]) if values else '1', values
+    elif operator == '$exists':
+        return '{0} IS {1}NULL'.format(expression, 'NOT ' if operand else ''), []
+    raise OperationFailure('Query operator {0} is not supported by the SQLite Data Source'.format(operator))
+
+
+def build_where(query):
+    """ translates the subset of the MongoDB query language used by the DAOs into the SQL WHERE clause
+        :return: tuple (SQL condition, list of parameters) """
+    if query is None:
+        query = dict()
+    elif not isinstance(query, dict):
+        query = {ID: query}
+
+    conditions = []
+    parameters = []
+    for field_name, condition in query.items():
+        if field_name in ('$and', '$or'):
+            sub_conditions = []
+            for sub_query in condition:
+                sql, sub_parameters = build_where(sub_query)
+                sub_conditions.append(sql)
+                parameters.extend(sub_parameters)
+            joint = ' AND ' if field_name == '$and' else ' OR '
+            conditions.append('({0})'.format(joint.join(sub_conditions) or '1'))
+            continue
+
+        if isinstance(condition, dict) and condition and all(key.startswith('$') for key in condition):
+            operators = condition.items()
+        else:
+            operators = [('$eq', condition)]
+
+        for operator, operand in operators:
+            sql, operand_parameters = _build_condition(field_name, operator, operand)
+            conditions.append(sql)
+            parameters.extend(operand_parameters)
+    return ' AND '.join(conditions) or '1', parameters
+
+
+class SqliteCursor(EmulatedCursor):
+    """ the SELECT statement is executed on the first iteration,
+        and rows are fetched from SQLite in batches of <batch_size> """
+
+    def __init__(self, collection, query, projection=None):
+        super(SqliteCursor, self).__init__(collection, query, projection)
+        self._rows = None
+        self._buffer = []
+
+    def _build_select(self, columns):
+        where, parameters = build_where(self._query)
+        sql = 'SELECT {0} FROM "{1}" WHERE {2}'.format(columns, self._collection.name, where)
+        if self._sort:
+            sql += ' ORDER BY ' + ', '.join('{0} {1}'.format(_field_expression(field_name),
+                                                             'DESC' if direction == DESCENDING else 'ASC')
+                                            for field_name, direction in self._sort)
+        if self._limit or self._skip:
+            sql += ' LIMIT {0:d} OFFSET {1:d}'.format(self._limit or -1, self._skip)
+        return sql, parameters
+
+    def next(self):
+        if self._rows is None:
+            sql, parameters = self._build_select('_id, document')
+            self._rows = self._collection.database.connection.execute(sql, parameters)
+
+        if not self._buffer:
+            self._buffer = self._rows.fetchmany(self._batch_size or DEFAULT_BATCH_SIZE)
+            self._buffer.reverse()
+            if not self._buffer:
+                raise StopIteration()
+        return apply_projection(self._collection.decode(self._buffer.pop()), self._projection)
+
+    def explain(self):
+        """ :return: query plan in the MongoDB 3.x explain() format, with the SQLite plan in the details """
+        sql, parameters = self._build_select('_id, document')
+        plan = self._collection.database.connection.execute('EXPLAIN QUERY PLAN ' + sql, parameters).fetchall()
+        details = [row[-1] for row in plan]
+        is_collection_scan = any(detail.startswith('SCAN') and 'USING' not in detail for detail in details)
+        return {'queryPlanner': {'winningPlan': {'stage': 'COLLSCAN' if is_collection_scan else 'IXSCAN',
+                                                 'details': details}}}
+
+
+class SqliteCollection(EmulatedCollection):
+    """ table of JSON documents that emulates the subset of the pymongo Collection API used by the DAOs.
+        NOTICE: query operands must be scalars, except for the _id. array fields are not matched per element """
+
+    def __init__(self, database, name):
+        super(SqliteCollection, self).__init__(database, _validate_name(name))
+
+    def transaction(self):
+        return self.database.transaction()
+
+    def create(self):
+        self.database.connection.execute('CREATE TABLE IF NOT EXISTS "{0}" '
+                                         '(_id TEXT PRIMARY KEY, document TEXT NOT NULL)'.format(self.name))
+
+    def decode(self, row):
+        document = json_util.loads(row[1])
+        document[ID] = json_util.loads(row[0])
+        return document
+
+    def _encode_document(self, document):
+        return json_util.dumps(dict((key, value) for key, value in document.items() if key != ID))
+
+    def _insert(self, document):
+        if ID not in document:
+            document[ID] = ObjectId()
+        try:
+            self.database.connection.execute('INSERT INTO "{0}" (_id, document) VALUES (?, ?)'.format(self.name),
+                                             (_encode_id(document[ID]), self._encode_document(document)))
+        except sqlite3.IntegrityError as e:
+            raise duplicate_key_error(e)
+        return document[ID]
+
+    def _replace(self, document):
+        try:
+            cursor = self.database.connection.execute('UPDATE "{0}" SET document = ? WHERE _id = ?'.format(self.name),
+                                                      (self._encode_document(document), _encode_id(document[ID])))
+        except sqlite3.IntegrityError as e:
+            raise duplicate_key_error(e)
+        return cursor.rowcount
+
+    def _delete(self, query, multi):
+        where, parameters = build_where(query)
+        limit = '' if multi else ' LIMIT 1'
+        cursor = self.database.connection.execute(
+            'DELETE FROM "{0}" WHERE _id IN (SELECT _id FROM "{0}" WHERE {1}{2})'.format(self.name, where, limit),
+            parameters)
+        return {'n': cursor.rowcount}
+
+    def find(self, filter=None, projection=None, spec=None, fields=None, **kwargs):
+        """ spec and fields are the legacy names of the filter and projection """
+        return SqliteCursor(self,
+                            filter if filter is not None else spec,
+                            projection if projection is not None else fields)
+
+    def create_index(self, keys, unique=False, expireAfterSeconds=None, name=None, **kwargs):
+        """ creates the expression index over the JSON fields. expireAfterSeconds registers a TTL index:
+            documents whose field, in the DateTimeField string format, is older than that are removed by the writes
+            :return: index name in the MongoDB notation """
+        keys = index_keys(keys)
+        if name is None:
+            name = index_name(keys)
+        expressions = ', '.join('{0} {1}'.format(_field_expression(field_name),
+                                                 'DESC' if direction == DESCENDING else 'ASC')
+                                for field_name, direction in keys)
+        sql = 'CREATE {0}INDEX IF NOT EXISTS "{1}__{2}" ON "{1}" ({3})'.format('UNIQUE ' if unique else '',
+                                                                             self.name,
+                                                                             _validate_name(name.replace('-', '_')),
+                                                                             expressions)
+        try:
+            with self.database.transaction():
+                self.database.connection.execute(sql)
+                if expireAfterSeconds is not None:
+                    self.database.connection.execute(
+                        'INSERT OR REPLACE INTO {0} (table_name, field_name, seconds) VALUES (?, ?, ?)'
+                        .format(TTL_TABLE), (self.name, keys[0][0], expireAfterSeconds))
+        except sqlite3.IntegrityError as e:
+            raise OperationFailure('Unable to create unique index {0} in {1}: {2}'.format(name, self.name, e))
+        return name
+
+    def drop(self):
+        self.database.drop_collection(self.name)
+
+    def _get_ttl_indexes(self):
+        return self.database.connection.execute('SELECT field_name, seconds FROM {0} WHERE table_name = ?'
+                                                .format(TTL_TABLE), (self.name,)).fetchall()
+
+    def _delete_expired(self, field_name, seconds):
+        self.database.connection.execute('DELETE FROM "{0}" WHERE {1} < ?'.format(self.name,
+                                                                                 _field_expression(field_name)),
+                                         (expiration_time(seconds),))
+
+
+class SqliteDatabase(object):
+    """ SQLite database file in the pymongo Database notation. Every thread works thru its own connection:
+        the file is opened in the WAL mode, so that readers do not block the writer.
+        Statements are parametrized and are compiled once per connection by the sqlite3 statement cache """
+
+    def __init__(self, file_name, timeout=30.0, cached_statements=256):
+        self.file_name = file_name
+        self.timeout = timeout
+        self.cached_statements = cached_statements
+        self.lock = Lock()
+        self.collections = dict()
+        self.connections = []
+        self.thread_state = local()
+
+        self.connection.execute('CREATE TABLE IF NOT EXISTS {0} (table_name TEXT NOT NULL, field_name TEXT NOT NULL, '
+                                'seconds INTEGER NOT NULL, PRIMARY KEY (table_name, field_name))'.format(TTL_TABLE))
+
+    @property
+    def connection(self):
+        """ :return: sqlite3 connection of the current thread """
+        connection = getattr(self.thread_state, 'connection', None)
+        if connection is None:
+            # isolation_level=None disables implicit transactions: they are started explicitly by the transaction()
+            connection = sqlite3.connect(self.file_name,
+                                         timeout=self.timeout,
+                                         isolation_level=None,
+                                         check_same_thread=False,
+                                         cached_statements=self.cached_statements)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self.thread_state.connection = connection
+            self.thread_state.depth = 0
+            with self.lock:
+                self.connections.append(connection)
+        return connection
+
+    @contextmanager
+    def transaction(self):
+        """ re-entrant write transaction of the current thread. BEGIN IMMEDIATE takes the write lock upfront,
+            so that concurrent writers wait for up to <timeout> seconds instead of failing on the lock upgrade """
+        connection = self.connection
+        if self.thread_state.depth == 0:
+            connection.execute('BEGIN IMMEDIATE')
+        self.thread_state.depth += 1
+        try:
+            yield connection
+        except:
+            self.thread_state.depth -= 1
+            if self.thread_state.depth == 0:
+                connection.execute('ROLLBACK')
+            raise
+        else:
+            self.thread_state.depth -= 1
+            if self.thread_state.depth == 0:
+                connection.execute('COMMIT')
+
+    def __getitem__(self, name):
+        collection = self.collections.get(name)
+        if collection is None:
+            with self.lock:
+                collection = self.collections.get(name)
+                if collection is None:
+                    collection = SqliteCollection(self, name)
+                    collection.create()
+                    self.collections[name] = collection
+        return collection
+
+    def collection_names(self):
+        rows = self.connection.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name != ?",
+                                       (TTL_TABLE,)).fetchall()
+        return [row[0] for row in rows]
+
+    def drop_collection(self, name):
+        with self.lock:
+            self.collections.pop(name, None)
+        with self.transaction() as connection:
+            connection.execute('DROP TABLE IF EXISTS "{0}"'.format(_validate_name(name)))
+            connection.execute('DELETE FROM {0} WHERE table_name = ?'.format(TTL_TABLE), (name,))
+
+    def drop_database(self):
+        for name in self.collection_names():
+            self.drop_collection(name)
+
+    def close(self):
+        with self.lock:
+            for connection in self.connections:
+                connection.close()
+            self.connections = []
+        self.thread_state = local()
@@ -3,6 +3,8 @@ __author__ = 'Bohdan Mushkevych'
 from odm.document import BaseDocument
 from odm.fields import StringField, ObjectIdField, ListField, IntegerField
 
+from synergy.db.model.tracked_document import TrackedDocument
+
 MAX_NUMBER_OF_EVENTS = 128
 TIMEPERIOD = 'timeperiod'
 PROCESS_NAME = 'process_name'
@@ -40,7 +42,7 @@ STATE_IN_PROGRESS = 'state_in_progress'
 STATE_EMBRYO = 'state_embryo'
 
 
-class Job(BaseDocument):
+class Job(TrackedDocument):
     """ class presents status for the time-period, and indicates whether data was process by particular process"""
 
     db_id = ObjectIdField('_id', null=True)
@@ -52,6 +54,19 @@ class Job(BaseDocument):
     event_log = ListField(EVENT_LOG)
     number_of_failures = IntegerField(NUMBER_OF_FAILURES, default=0)
 
+    @classmethod
+    def _get_fields(cls):
+        # BaseDocument builds field maps per instance; Job instances share a single copy instead
+        if '_fields_map' not in cls.__dict__:
+            cls._fields_map = super(Job, cls)._get_fields()
+        return cls._fields_map
+
+    @classmethod
+    def _get_attributes(cls):
+        if '_attributes_map' not in cls.__dict__:
+            cls._attributes_map = super(Job, cls)._get_attributes()
+        return cls._attributes_map
+
     @BaseDocument.key.getter
     def key(self):
         return self.process_name, self.timeperiod
@@ -62,6 +77,45 @@ class Job(BaseDocument):
         self.process_name = value[0]
         self.timeperiod = value[1]
 
+    def add_log_entry(self, entry):
+        """ adds the entry on top of the event log, that retains MAX_NUMBER_OF_EVENTS latest entries.
+            the entry is pushed into the DB record by the next JobDao.update, even if the event log is not loaded """
+        if self.is_event_log_loaded:
+            event_log = self.event_log
+            event_log.insert(0, entry)
+            del event_log[MAX_NUMBER_OF_EVENTS:]
+        self.__dict__.setdefault('_new_log_entries', []).insert(0, entry)
+
+    def get_new_log_entries(self):
+        """ :return: entries added by add_log_entry since the last JobDao.update, latest first """
+        return list(self.__dict__.get('_new_log_entries', []))
+
+    def mark_clean(self, field_names=None):
+        super(Job, self).mark_clean(field_names)
+        if field_names is None:
+            self.__dict__.pop('_new_log_entries', None)
+
+    def get_update(self):
+        """ :return: MongoDB update document with the modified fields and the new event log entries """
+        update = super(Job, self).get_update()
+        new_log_entries = self.get_new_log_entries()
+        if new_log_entries and EVENT_LOG not in self.dirty_fields:
+            update['$push'] = {EVENT_LOG: {'$each': new_log_entries,
+                                           '$position': 0,
+                                           '$slice': MAX_NUMBER_OF_EVENTS}}
+        return update
+
+    def mark_event_log_loaded(self, is_loaded=True):
+        """ called by the JobDao, that read the job record without its event log,
+            and by the reader of the event log, once it is loaded """
+        self.__dict__['_is_event_log_loaded'] = is_loaded
+
+    @property
+    def is_event_log_loaded(self):
+        """ :return: False if the job record was read from the DB without its event log, and it is not yet loaded.
+            NOTICE: the event_log field is not an indicator, as its default [] is set by every serialization """
+        return self.__dict__.get('_is_event_log_loaded', True)
+
     @property
     def is_active(self):
         return self.state in [STATE_FINAL_RUN, STATE_IN_PROGRESS, STATE_EMBRYO]
@@ -0,0 +1,83 @@
+__author__ = 'Bohdan Mushkevych'
+
+from odm.document import BaseDocument
+
+ID = '_id'
+
+
+class TrackedDocument(BaseDocument):
+    """ Document that tracks the fields modified since it was read from or written to the DB,
+        so that the DAO could update the DB record with only those fields.
+        NOTICE: in-place modifications of the list and dict fields are not tracked: assign the field instead """
+
+    def __init__(self, **values):
+        super(TrackedDocument, self).__init__(**values)
+        # values passed to the constructor are not yet in the DB
+        for attribute_name in values:
+            self._mark_dirty(self._attributes[attribute_name].field_name)
+
+    def _mark_dirty(self, field_name):
+        dirty_fields = self.__dict__.get('_dirty_fields')
+        if dirty_fields is None:
+            # created on the first modification: documents that are only read carry no tracking state
+            dirty_fields = self.__dict__['_dirty_fields'] = set()
+        dirty_fields.add(field_name)
+
+    def __setattr__(self, name, value):
+        attributes = self.__dict__.get('_attributes')
+        if attributes is not None and name in attributes:
+            self._mark_dirty(attributes[name].field_name)
+        super(TrackedDocument, self).__setattr__(name, value)
+
+    def __delattr__(self, name):
+        attributes = self.__dict__.get('_attributes')
+        if attributes is not None and name in attributes:
+            self._mark_dirty(attributes[name].field_name)
+        super(TrackedDocument, self).__delattr__(name)
+
+    def __setitem__(self, name, value):
+        result = super(TrackedDocument, self).__setitem__(name, value)
+        self._mark_dirty(name)
+        return result
+
+    def __delitem__(self, name):
+        result = super(TrackedDocument, self).__delitem__(name)
+        self._mark_dirty(name)
+        return result
+
+    @property
+    def dirty_fields(self):
+        """ :return: set of field names modified since the document was read from or written to the DB """
+        return set(self.__dict__.get('_dirty_fields') or [])
+
+    def mark_clean(self, field_names=None):
+        """ marks the given fields, or the whole document if None, as synchronized with the DB """
+        if field_names is None:
+            self.__dict__.pop('_dirty_fields', None)
+        elif self.__dict__.get('_dirty_fields'):
+            self.__dict__['_dirty_fields'].difference_update(field_names)
+
+    def get_update(self):
+        """ :return: MongoDB update document that $set the modified fields and $unset the removed ones;
+            empty dict if the document has no modifications. _id is never updated """
+        dirty_fields = self.__dict__.get('_dirty_fields')
+        if not dirty_fields:
+            return dict()
+
+        document = self.document
+        to_set = dict()
+        to_unset = dict()
+        for field_name in dirty_fields:
+            if field_name == ID:
+                continue
+            elif field_name in document:
+                to_set[field_name] = document[field_name]
+            else:
+                to_unset[field_name] = ''
+
+        update = dict()
+        if to_set:
+            update['$set'] = to_set
+        if to_unset:
+            update['$unset'] = to_unset
+        return update
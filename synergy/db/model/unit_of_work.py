@@ -1,8 +1,9 @@
 __author__ = 'Bohdan Mushkevych'
 
-from odm.document import BaseDocument
 from odm.fields import StringField, ObjectIdField, IntegerField, DictField, DateTimeField
 
+from synergy.db.model.tracked_document import TrackedDocument
+
 TIMEPERIOD = 'timeperiod'
 START_TIMEPERIOD = 'start_timeperiod'  # lower boundary (as Synergy date) of the period that needs to be processed
 END_TIMEPERIOD = 'end_timeperiod'      # upper boundary (as Synergy date) of the period that needs to be processed
@@ -13,6 +14,8 @@ CREATED_AT = 'created_at'
 SUBMITTED_AT = 'submitted_at'
 STARTED_AT = 'started_at'
 FINISHED_AT = 'finished_at'
+UPDATED_AT = 'updated_at'              # time of the latest insert or update; stamped by the UnitOfWorkDao
+HEARTBEAT_AT = 'heartbeat_at'          # time of the latest heartbeat of the worker processing the UOW
 NUMBER_OF_AGGREGATED_DOCUMENTS = 'number_of_aggregated_documents'
 NUMBER_OF_PROCESSED_DOCUMENTS = 'number_of_processed_documents'
 NUMBER_OF_RETRIES = 'number_of_retries'
@@ -51,7 +54,7 @@ STATE_INVALID = 'state_invalid'
 STATE_NOOP = 'state_noop'
 
 
-class UnitOfWork(BaseDocument):
+class UnitOfWork(TrackedDocument):
     """ Module represents persistent Model for atomic unit of work performed by the system.
     UnitOfWork Instances are stored in the <unit_of_work> collection """
 
@@ -71,6 +74,8 @@ class UnitOfWork(BaseDocument):
     submitted_at = DateTimeField(SUBMITTED_AT)
     started_at = DateTimeField(STARTED_AT)
     finished_at = DateTimeField(FINISHED_AT)
+    updated_at = DateTimeField(UPDATED_AT)
+    heartbeat_at = DateTimeField(HEARTBEAT_AT)
 
     number_of_aggregated_documents = IntegerField(NUMBER_OF_AGGREGATED_DOCUMENTS)
     number_of_processed_documents = IntegerField(NUMBER_OF_PROCESSED_DOCUMENTS)
@@ -1,14 +1,14 @@
 __author__ = 'Bohdan Mushkevych'
 
 from synergy.mx.base_request_handler import BaseRequestHandler, valid_action_request, safe_json_response
-from synergy.db.dao.unit_of_work_dao import UnitOfWorkDao
+from synergy.db.dao.cached_unit_of_work_dao import CachedUnitOfWorkDao
 from synergy.db.dao.uow_log_dao import UowLogDao
 
 
 class AbstractActionHandler(BaseRequestHandler):
     def __init__(self, request, **values):
         super(AbstractActionHandler, self).__init__(request, **values)
-        self.uow_dao = UnitOfWorkDao(self.logger)
+        self.uow_dao = CachedUnitOfWorkDao(self.logger)
         self.uow_log_dao = UowLogDao(self.logger)
 
     @property
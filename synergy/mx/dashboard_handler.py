@@ -9,6 +9,7 @@ from synergy.db.dao import job_dao
 from synergy.db.dao.job_dao import JobDao
 from synergy.db.dao import unit_of_work_dao
 from synergy.db.dao.unit_of_work_dao import UnitOfWorkDao
+from synergy.db.model import job, unit_of_work
 from synergy.scheduler.scheduler_constants import COLLECTION_JOB_YEARLY, \
     COLLECTION_JOB_MONTHLY, COLLECTION_JOB_DAILY, COLLECTION_JOB_HOURLY
 from synergy.system.decorator import thread_safe
@@ -16,6 +17,12 @@ from synergy.system import time_helper
 from synergy.system.time_qualifier import QUALIFIER_DAILY, QUALIFIER_MONTHLY, QUALIFIER_YEARLY
 from synergy.mx.base_request_handler import BaseRequestHandler, valid_action_request
 
+# fields rendered by the dashboards or required to build the record key.
+# NOTICE: event logs and UOW arguments are requested on demand via the object_viewer
+MANAGED_PROJECTION = [job.PROCESS_NAME, job.TIMEPERIOD, job.STATE]
+FREERUN_PROJECTION = [unit_of_work.PROCESS_NAME, unit_of_work.TIMEPERIOD, unit_of_work.STATE,
+                      unit_of_work.START_OBJ_ID, unit_of_work.END_OBJ_ID]
+
 
 class DashboardHandler(BaseRequestHandler):
     def __init__(self, request, **values):
@@ -86,11 +93,7 @@ class ManagedStatements(object):
         try:
             query = job_dao.QUERY_GET_LIKE_TIMEPERIOD(timeperiod, include_running,
                                                       include_processed, include_noop, include_failed)
-            records_list = self.job_dao.run_query(collection_name, query)
-            if len(records_list) == 0:
-                self.logger.warning('MX: no Job Records found in {0} since {1}.'.format(collection_name, timeperiod))
-
-            for job_record in records_list:
+            for job_record in self.job_dao.iter_query(collection_name, query, MANAGED_PROJECTION):
                 if job_record.process_name not in self.managed_handlers:
                     continue
 
@@ -99,6 +102,8 @@ class ManagedStatements(object):
                     continue
 
                 resp[job_record.key] = job_record.document
+        except LookupError:
+            self.logger.warning('MX: no Job Records found in {0} since {1}.'.format(collection_name, timeperiod))
         except Exception as e:
             self.logger.error('MX Dashboard ManagedStatements error: {0}'.format(e))
         return resp
@@ -119,11 +124,7 @@ class FreerunStatements(object):
         try:
             query = unit_of_work_dao.QUERY_GET_FREERUN_SINCE(timeperiod, include_running,
                                                              include_processed, include_noop, include_failed)
-            records_list = self.uow_dao.run_query(query)
-            if len(records_list) == 0:
-                self.logger.warning('MX: no Freerun UOW records found since {0}.'.format(timeperiod))
-
-            for uow_record in records_list:
+            for uow_record in self.uow_dao.iter_query(query, FREERUN_PROJECTION):
                 if uow_record.process_name not in self.freerun_handlers:
                     continue
 
@@ -132,6 +133,8 @@ class FreerunStatements(object):
                     continue
 
                 resp[uow_record.key] = uow_record.document
+        except LookupError:
+            self.logger.warning('MX: no Freerun UOW records found since {0}.'.format(timeperiod))
         except Exception as e:
             self.logger.error('MX Dashboard FreerunStatements error: {0}'.format(e))
         return resp
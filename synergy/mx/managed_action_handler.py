@@ -83,4 +83,4 @@ class ManagedActionHandler(AbstractActionHandler):
     @valid_action_request
     def action_get_event_log(self):
         node = self._get_tree_node()
-        return {'event_log': [] if not node.job_record else node.job_record.event_log}
+        return {'event_log': node.event_log}
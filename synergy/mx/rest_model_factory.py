@@ -26,11 +26,10 @@ def get_dependant_trees(timetable, tree_obj):
 
 
 def get_reprocessing_queue(gc, process_name):
+    """ :return: timeperiods of the reprocessing queue in the priority order, i.e. the next one to be resubmitted first.
+        NOTICE: the queue iterates in the heap order, which is not sorted """
     per_process = gc.reprocess_uows[process_name]
-    q = []
-    for priority_entry in sorted(per_process.queue):
-        q.append(priority_entry.entry.timeperiod)
-    return q
+    return [priority_entry.entry.timeperiod for priority_entry in sorted(per_process)]
 
 
 def create_rest_managed_scheduler_entry(thread_handler, timetable, gc):
@@ -0,0 +1,15 @@
+__author__ = 'Bohdan Mushkevych'
+
+from synergy.mx.base_request_handler import BaseRequestHandler
+
+
+class TimetableActionHandler(BaseRequestHandler):
+    def __init__(self, request, **values):
+        super(TimetableActionHandler, self).__init__(request, **values)
+        self.is_request_valid = True
+
+    def action_validate(self):
+        """ performs full validation of all Timetable trees, as opposed to the incremental one run by the GC """
+        self.scheduler.timetable.validate(full=True)
+        self.logger.info('MX: performed full Timetable validation')
+        return self.reply_ok()
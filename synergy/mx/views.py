@@ -12,11 +12,13 @@ from werkzeug.utils import redirect
 from synergy.mx.gc_action_handler import GcActionHandler
 from synergy.mx.freerun_action_handler import FreerunActionHandler
 from synergy.mx.managed_action_handler import ManagedActionHandler
+from synergy.mx.timetable_action_handler import TimetableActionHandler
 from synergy.mx.scheduler_entries import SchedulerEntries
 from synergy.mx.dashboard_handler import DashboardHandler
 from synergy.mx.utils import render_template, expose
 from synergy.mx.tree_node_details import TreeNodeDetails
 from synergy.mx.tree_details import TreeDetails
+from synergy.db.dao.cached_unit_of_work_dao import UowCache
 
 
 @expose('/entries/managed/')
@@ -169,6 +171,18 @@ def gc_refresh(request, **values):
     return Response(status=NO_CONTENT)
 
 
+@expose('/uow_cache/stats/')
+def uow_cache_stats(request, **values):
+    return Response(response=json.dumps(UowCache().stats), mimetype='application/json')
+
+
+@expose('/timetable/validate/')
+def timetable_validate(request, **values):
+    handler = TimetableActionHandler(request, **values)
+    handler.action_validate()
+    return Response(status=NO_CONTENT)
+
+
 def get_action_handler(request, **values):
     if 'is_freerun' in request.args and request.args['is_freerun'] in ('True', 'true', '1'):
         handler = FreerunActionHandler(request, **values)
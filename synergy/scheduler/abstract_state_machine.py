@@ -6,7 +6,7 @@ from logging import INFO, WARNING, ERROR
 from synergy.db.model import job
 from synergy.db.model.job import Job
 from synergy.db.error import DuplicateKeyError
-from synergy.db.dao.unit_of_work_dao import UnitOfWorkDao
+from synergy.db.dao.cached_unit_of_work_dao import CachedUnitOfWorkDao
 from synergy.db.dao.job_dao import JobDao
 from synergy.db.model import unit_of_work
 from synergy.db.model.unit_of_work import UnitOfWork
@@ -24,7 +24,7 @@ class AbstractStateMachine(object):
         self.logger = logger
         self.mq_transmitter = MqTransmitter(self.logger)
         self.timetable = timetable
-        self.uow_dao = UnitOfWorkDao(self.logger)
+        self.uow_dao = CachedUnitOfWorkDao(self.logger)
         self.job_dao = JobDao(self.logger)
 
     @property
@@ -128,6 +128,7 @@ class AbstractStateMachine(object):
             its state should be set to STATE_NOOP without any processing """
         job_record.state = job.STATE_NOOP
         self.job_dao.update(job_record)
+        self.timetable.update_job_record(job_record)
 
         time_grouping = context.process_context[job_record.process_name].time_grouping
         msg = 'Job {0}@{1} with time_grouping {2} was transferred to STATE_NOOP' \
@@ -198,6 +199,7 @@ class AbstractStateMachine(object):
             # Skip this timeperiod itself
             job_record.state = job.STATE_SKIPPED
             self.job_dao.update(job_record)
+            self.timetable.update_job_record(job_record)
             self.mq_transmitter.publish_job_status(job_record)
 
             msg = 'Job {0}@{1} is blocked by STATE_SKIPPED dependencies. ' \
@@ -244,6 +246,7 @@ class AbstractStateMachine(object):
         except LookupError as e:
             job_record.number_of_failures += 1
             self.job_dao.update(job_record)
+            self.timetable.update_job_record(job_record)
             self.timetable.skip_if_needed(job_record)
             msg = 'Increasing fail counter for Job {0}@{1}, because of: {2}' \
                   .format(job_record.process_name, job_record.timeperiod, e)
@@ -272,6 +275,8 @@ class AbstractStateMachine(object):
                 self.uow_dao.update(uow)
             self._process_state_in_progress(job_record)
 
+        self.timetable.update_job_record(job_record)
+
         msg = 'Reprocessed Job {0} for {1}@{2}: state transfer {3} -> {4};' \
               .format(job_record.db_id, job_record.process_name, job_record.timeperiod,
                       original_job_state, job_record.state)
@@ -286,6 +291,7 @@ class AbstractStateMachine(object):
         if not job_record.is_finished:
             job_record.state = job.STATE_SKIPPED
             self.job_dao.update(job_record)
+            self.timetable.update_job_record(job_record)
 
         if job_record.related_unit_of_work:
             uow = self.uow_dao.get_one(job_record.related_unit_of_work)
@@ -312,12 +318,29 @@ class AbstractStateMachine(object):
                          .format(job_record.db_id, job_record.process_name, job_record.timeperiod))
         return job_record
 
+    def create_jobs(self, process_name, timeperiods):
+        """ bulk version of the create_job: creates job records in STATE_EMBRYO for given process_name and timeperiods
+            timeperiods that already have a job record in the DB are skipped
+            :returns: list of created job records of type <Job>"""
+        job_records = []
+        for timeperiod in timeperiods:
+            job_record = Job()
+            job_record.state = job.STATE_EMBRYO
+            job_record.timeperiod = timeperiod
+            job_record.process_name = process_name
+            job_records.append(job_record)
+        job_records = self.job_dao.insert_many(job_records)
+
+        self.logger.info('Created {0} Jobs for {1}'.format(len(job_records), process_name))
+        return job_records
+
     def update_job(self, job_record, uow, new_state):
         """ method updates job record with a new unit_of_work and new state"""
         original_job_state = job_record.state
         job_record.state = new_state
         job_record.related_unit_of_work = uow.db_id
         self.job_dao.update(job_record)
+        self.timetable.update_job_record(job_record)
 
         msg = 'Updated Job {0} for {1}@{2}: state transfer {3} -> {4};' \
               .format(job_record.db_id, job_record.process_name, job_record.timeperiod, original_job_state, new_state)
@@ -13,7 +13,9 @@ from synergy.system.mq_transmitter import MqTransmitter
 from synergy.scheduler.scheduler_constants import PROCESS_GC
 from synergy.scheduler.thread_handler import ManagedThreadHandler
 from synergy.db.model import unit_of_work
-from synergy.db.dao.unit_of_work_dao import UnitOfWorkDao
+from synergy.db.dao.cached_unit_of_work_dao import CachedUnitOfWorkDao
+
+SCAN_OVERLAP = timedelta(minutes=1)
 
 
 class GarbageCollector(object):
@@ -29,23 +31,56 @@ class GarbageCollector(object):
         self.timetable = scheduler.timetable
 
         self.lock = Lock()
-        self.uow_dao = UnitOfWorkDao(self.logger)
+        self.uow_dao = CachedUnitOfWorkDao(self.logger)
         self.reprocess_uows = collections.defaultdict(PriorityQueue)
         self.timer = RepeatTimer(settings.settings['gc_run_interval'], self._run)
 
+        # format: {uow.db_id: UnitOfWork} for every active managed UOW known to the GC
+        self.candidates = dict()
+        # UOWs updated after the scan_watermark are fetched by the next incremental scan
+        self.scan_watermark = None
+        self.full_scan_at = None
+
+    def _refresh_candidates(self):
+        """ method synchronizes self.candidates with the DB:
+            - full scan reads all active managed UOWs. it is performed by the first run
+            and then every <gc_full_scan_interval> seconds to reconcile any missed update
+            - incremental scan reads only UOWs that were inserted or updated since the previous scan """
+        since = settings.settings['synergy_start_timeperiod']
+        utc_now = datetime.utcnow()
+
+        if self.full_scan_at is None \
+                or utc_now - self.full_scan_at > timedelta(seconds=settings.settings['gc_full_scan_interval']):
+            self.candidates = dict()
+            try:
+                for uow in self.uow_dao.iter_reprocessing_candidates(since):
+                    self.candidates[uow.db_id] = uow
+            except LookupError as e:
+                self.logger.info('flow: no UOW candidates found for reprocessing: {0}'.format(e))
+            self.full_scan_at = utc_now
+            self.logger.info('full scan: {0} UOW candidates'.format(len(self.candidates)))
+        else:
+            # the overlap covers updates that were in flight during the previous scan and moderate clock skew
+            number_of_updated = 0
+            for uow in self.uow_dao.iter_updated_since(self.scan_watermark - SCAN_OVERLAP, since):
+                number_of_updated += 1
+                if uow.is_active:
+                    self.candidates[uow.db_id] = uow
+                else:
+                    self.candidates.pop(uow.db_id, None)
+            self.logger.info('incremental scan: {0} updated UOWs; {1} UOW candidates'
+                             .format(number_of_updated, len(self.candidates)))
+
+        self.scan_watermark = utc_now
+
     @thread_safe
     def scan_uow_candidates(self):
         """ method performs two actions:
             - enlist stale or invalid units of work into reprocessing queue
             - cancel UOWs that are older than 2 days and have been submitted more than 1 hour ago """
-        try:
-            since = settings.settings['synergy_start_timeperiod']
-            uow_list = self.uow_dao.get_reprocessing_candidates(since)
-        except LookupError as e:
-            self.logger.info('flow: no UOW candidates found for reprocessing: {0}'.format(e))
-            return
+        self._refresh_candidates()
 
-        for uow in uow_list:
+        for uow in list(self.candidates.values()):
             try:
                 if uow.process_name not in self.managed_handlers:
                     self.logger.debug('process {0} is not known to the Synergy Scheduler. Skipping its UOW.'
@@ -68,6 +103,14 @@ class GarbageCollector(object):
                 # thus - any UOW older 2 days could be marked as STATE_CANCELED
                 if datetime.utcnow() - uow.created_at > timedelta(hours=settings.settings['gc_life_support_hours']):
                     self._cancel_uow(uow)
+                    del self.candidates[uow.db_id]
+                    continue
+
+                if uow.is_in_progress and uow.heartbeat_at is not None:
+                    # the worker reports its liveness: resubmit the UOW without the release lag
+                    # as soon as the heartbeats have lapsed, and never while they arrive
+                    if not self._is_heartbeat_alive(uow):
+                        self.reprocess_uows[uow.process_name].put(PriorityEntry(uow, lag_in_minutes=0))
                     continue
 
                 # if the UOW has been idle for more than 1 hour - resubmit it
@@ -87,17 +130,29 @@ class GarbageCollector(object):
         """
         assert isinstance(q, PriorityQueue)
 
+        bulk_size = settings.settings['db_bulk_size']
         current_timestamp = compute_release_time(lag_in_minutes=0)
-        for _ in range(len(q)):
-            entry = q.pop()
-            assert isinstance(entry, PriorityEntry)
+        while q:
+            batch = []
+            while q and len(batch) < bulk_size:
+                entry = q.peek()
+                assert isinstance(entry, PriorityEntry)
 
-            if ignore_priority or entry.release_time < current_timestamp:
-                self._resubmit_uow(entry.entry)
-            else:
-                q.put(entry)
+                if not ignore_priority and entry.release_time >= current_timestamp:
+                    break
+                batch.append(q.pop())
+
+            if not batch:
                 break
 
+            try:
+                self._resubmit_uows([entry.entry for entry in batch])
+            except Exception:
+                # return the batch to the queue, so it is retried by the next flush
+                for entry in batch:
+                    q.put(entry)
+                raise
+
     @thread_safe
     def flush(self, ignore_priority=False):
         """ method iterates over each reprocessing queues and re-submits UOW whose waiting time has expired """
@@ -108,19 +163,14 @@ class GarbageCollector(object):
     def validate(self):
         """ method iterates over the reprocessing queue and synchronizes state of every UOW with the DB
             should it change via the MX to STATE_CANCELED - remove the UOW from the queue """
-        for process_name, q in self.reprocess_uows.items():
-            if not q:
-                continue
+        entries = [(q, entry) for q in self.reprocess_uows.values() for entry in q]
+        uows = self.uow_dao.get_many([entry.entry.db_id for _, entry in entries])
+        canceled_ids = set(uow.db_id for uow in uows if uow.is_canceled)
 
-            invalid_entries = list()
-            for entry in q.queue:
-                assert isinstance(entry, PriorityEntry)
-                uow = self.uow_dao.get_one(entry.entry.db_id)
-                if uow.is_canceled:
-                    invalid_entries.append(entry)
-
-            for entry in invalid_entries:
-                q.queue.remove(entry)
+        for q, entry in entries:
+            assert isinstance(entry, PriorityEntry)
+            if entry.entry.db_id in canceled_ids:
+                q.remove(entry)
 
         self.logger.info('reprocessing queue validated')
 
@@ -131,24 +181,54 @@ class GarbageCollector(object):
         q = self.reprocess_uows[process_name]
         self._flush_queue(q, ignore_priority)
 
+    def _is_heartbeat_alive(self, uow):
+        """ :return: True if the UOW is in progress
+            and its worker has sent a heartbeat within <gc_heartbeat_timeout> """
+        if not uow.is_in_progress or uow.heartbeat_at is None:
+            return False
+        return datetime.utcnow() - uow.heartbeat_at <= timedelta(seconds=settings.settings['gc_heartbeat_timeout'])
+
     def _resubmit_uow(self, uow):
-        # re-read UOW from the DB, in case it was STATE_CANCELLED by MX
-        uow = self.uow_dao.get_one(uow.db_id)
-        if uow.is_canceled:
-            self.logger.info('suppressed re-submission of UOW {0} for {1}@{2} in {3};'
-                             .format(uow.db_id, uow.process_name, uow.timeperiod, uow.state))
-            return
+        self._resubmit_uows([uow])
+
+    def _resubmit_uows(self, uows):
+        """ method re-submits UOWs with a single DB read, a single DB write and a single MQ publishing per batch """
+        # re-read UOWs from the DB, in case some were STATE_CANCELLED by MX
+        fresh_uows = dict((uow.db_id, uow) for uow in self.uow_dao.get_many([uow.db_id for uow in uows]))
+
+        resubmitted = []
+        for uow_id in [uow.db_id for uow in uows]:
+            uow = fresh_uows.get(uow_id)
+            if uow is None:
+                self.logger.warning('skipped re-submission of UOW {0}: record is not found in the DB'.format(uow_id))
+                continue
 
-        if uow.is_invalid:
-            uow.number_of_retries += 1
+            if uow.is_canceled:
+                self.logger.info('suppressed re-submission of UOW {0} for {1}@{2} in {3};'
+                                 .format(uow.db_id, uow.process_name, uow.timeperiod, uow.state))
+                continue
 
-        uow.state = unit_of_work.STATE_REQUESTED
-        uow.submitted_at = datetime.utcnow()
-        self.uow_dao.update(uow)
+            if self._is_heartbeat_alive(uow):
+                self.logger.info('suppressed re-submission of UOW {0} for {1}@{2}: worker heartbeat has resumed'
+                                 .format(uow.db_id, uow.process_name, uow.timeperiod))
+                continue
+
+            if uow.is_invalid:
+                uow.number_of_retries += 1
+
+            uow.state = unit_of_work.STATE_REQUESTED
+            uow.submitted_at = datetime.utcnow()
+            resubmitted.append(uow)
+
+        if not resubmitted:
+            return
 
-        self.mq_transmitter.publish_managed_uow(uow)
-        self.logger.info('re-submitted UOW {0} for {1}@{2}; attempt {3}'
-                         .format(uow.db_id, uow.process_name, uow.timeperiod, uow.number_of_retries))
+        self.uow_dao.update_many(resubmitted, [unit_of_work.STATE, unit_of_work.SUBMITTED_AT,
+                                               unit_of_work.NUMBER_OF_RETRIES])
+        self.mq_transmitter.publish_managed_uows(resubmitted)
+        for uow in resubmitted:
+            self.logger.info('re-submitted UOW {0} for {1}@{2}; attempt {3}'
+                             .format(uow.db_id, uow.process_name, uow.timeperiod, uow.number_of_retries))
 
     def _cancel_uow(self, uow):
         uow.state = unit_of_work.STATE_CANCELED
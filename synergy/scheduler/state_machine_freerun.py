@@ -8,7 +8,7 @@ from synergy.db.error import DuplicateKeyError
 from synergy.db.model import unit_of_work
 from synergy.db.model.unit_of_work import UnitOfWork
 from synergy.db.model.freerun_process_entry import FreerunProcessEntry, MAX_NUMBER_OF_EVENTS
-from synergy.db.dao.unit_of_work_dao import UnitOfWorkDao
+from synergy.db.dao.cached_unit_of_work_dao import CachedUnitOfWorkDao
 from synergy.db.dao.freerun_process_dao import FreerunProcessDao
 from synergy.system import time_helper
 from synergy.system.time_qualifier import QUALIFIER_REAL_TIME
@@ -24,7 +24,7 @@ class StateMachineFreerun(object):
         self.name = name
         self.logger = logger
         self.mq_transmitter = MqTransmitter(self.logger)
-        self.uow_dao = UnitOfWorkDao(self.logger)
+        self.uow_dao = CachedUnitOfWorkDao(self.logger)
         self.sfe_dao = FreerunProcessDao(self.logger)
 
     @with_reconnect
@@ -10,7 +10,7 @@ from synergy.db.model.managed_process_entry import ManagedProcessEntry
 from synergy.db.model.freerun_process_entry import FreerunProcessEntry
 from synergy.db.dao.freerun_process_dao import FreerunProcessDao
 from synergy.system import time_helper
-from synergy.system.decorator import with_reconnect, thread_safe
+from synergy.system.decorator import with_reconnect
 from synergy.system.synergy_process import SynergyProcess
 from synergy.scheduler.garbage_collector import GarbageCollector
 from synergy.scheduler.uow_status_listener import UowStatusListener
@@ -30,10 +30,13 @@ class Scheduler(SynergyProcess):
 
     def __init__(self, process_name):
         super(Scheduler, self).__init__(process_name)
-        self.lock = Lock()
         self.logger.info('Initializing {0}...'.format(self.process_name))
         self.managed_handlers = dict()
         self.freerun_handlers = dict()
+
+        # format: {handler_key: Lock}. serializes ticks of a freerun handler
+        # managed handlers are serialized by the timetable locks of their dependency group
+        self.freerun_locks = dict()
         self.timetable = Timetable(self.logger)
         self.freerun_process_dao = FreerunProcessDao(self.logger)
 
@@ -72,6 +75,7 @@ class Scheduler(SynergyProcess):
             handler_key = (process_entry.process_name, process_entry.entry_name)
             handler = FreerunThreadHandler(self.logger, handler_key, trigger_frequency, call_back, process_entry)
             self.freerun_handlers[handler.key] = handler
+            self.freerun_locks.setdefault(handler.key, Lock())
         else:
             raise ValueError('ProcessEntry type {0} is not known to the system. Skipping it.'
                              .format(process_entry.__class__.__name__))
@@ -114,6 +118,7 @@ class Scheduler(SynergyProcess):
     def start(self, *_):
         """ reads managed process entries and starts timer instances; starts dependant threads """
         self.logger.info('Starting Scheduler...')
+        db_manager.ensure_indexes()
         db_manager.synch_db()
         self._load_managed_entries()
 
@@ -138,9 +143,10 @@ class Scheduler(SynergyProcess):
         process_entry = self.managed_handlers[process_name].process_entry
         return self.timetable.state_machines[process_entry.state_machine_name]
 
-    @thread_safe
     def fire_managed_worker(self, thread_handler_header):
-        """ requests next valid job for given process and manages its state """
+        """ requests next valid job for given process and manages its state.
+            the tick holds only the timetable lock of the process' dependency group,
+            so that processes of unrelated trees are managed concurrently """
 
         def _fire_worker(process_entry, prev_job_record):
             assert isinstance(process_entry, ManagedProcessEntry)
@@ -180,24 +186,25 @@ class Scheduler(SynergyProcess):
             assert isinstance(thread_handler_header, ThreadHandlerHeader)
             self.logger.info('{0} {{'.format(thread_handler_header.key))
 
-            job_record = _fire_worker(thread_handler_header.process_entry, None)
-            while job_record and job_record.is_finished:
-                job_record = _fire_worker(thread_handler_header.process_entry, job_record)
+            with self.timetable.tree_lock(thread_handler_header.process_entry.process_name):
+                job_record = _fire_worker(thread_handler_header.process_entry, None)
+                while job_record and job_record.is_finished:
+                    job_record = _fire_worker(thread_handler_header.process_entry, job_record)
 
         except Exception as e:
             self.logger.error('Exception: {0}'.format(e), exc_info=True)
         finally:
             self.logger.info('}')
 
-    @thread_safe
     def fire_freerun_worker(self, thread_handler_header):
         """ fires free-run worker with no dependencies to track """
         try:
             assert isinstance(thread_handler_header, ThreadHandlerHeader)
             self.logger.info('{0} {{'.format(thread_handler_header.key))
 
-            state_machine = self.timetable.state_machines[STATE_MACHINE_FREERUN]
-            state_machine.manage_schedulable(thread_handler_header.process_entry)
+            with self.freerun_locks[thread_handler_header.key]:
+                state_machine = self.timetable.state_machines[STATE_MACHINE_FREERUN]
+                state_machine.manage_schedulable(thread_handler_header.process_entry)
 
         except Exception as e:
             self.logger.error('fire_freerun_worker: {0}'.format(e))
@@ -16,7 +16,7 @@ class ThreadHandlerHeader(object):
 
 
 class AbstractThreadHandler(object):
-    """ ThreadHandler is a thread running within the Synergy Scheduler and triggering Scheduler's fire_XXX logic"""
+    """ ThreadHandler triggers Scheduler's fire_XXX logic by means of a timer served by the process-wide TimerService"""
 
     def __init__(self, logger, key, trigger_frequency, call_back, process_entry):
         self.logger = logger
@@ -1,16 +1,19 @@
 __author__ = 'Bohdan Mushkevych'
 
+import time
+import functools
 import collections
+from contextlib import contextmanager
 from datetime import datetime
 from threading import RLock
 
-from synergy.db.dao.job_dao import JobDao
+from synergy.db.dao.job_dao import JobDao, JOB_PROJECTION, decode_job
+from synergy.db.model import job
 from synergy.db.model.job import Job
 from synergy.conf import context
 from synergy.conf import settings
 from synergy.system import time_helper, utils
 from synergy.system.time_qualifier import *
-from synergy.system.decorator import thread_safe
 from synergy.scheduler.scheduler_constants import COLLECTION_JOB_HOURLY, COLLECTION_JOB_DAILY, \
     COLLECTION_JOB_MONTHLY, COLLECTION_JOB_YEARLY
 from synergy.scheduler.tree import MultiLevelTree
@@ -20,6 +23,25 @@ from synergy.scheduler.state_machine_discrete import StateMachineDiscrete
 from synergy.scheduler.state_machine_freerun import StateMachineFreerun
 
 
+def tree_safe(resolve_trees):
+    """ wraps Timetable method with acquire/release cycle of the locks guarding dependency groups of the trees
+        :param resolve_trees: function(timetable, *args, **kwargs) that returns trees the method operates on """
+    def _decorator(method):
+        @functools.wraps(method)
+        def _locker(self, *args, **kwargs):
+            with self.locked(resolve_trees(self, *args, **kwargs)):
+                return method(self, *args, **kwargs)
+        return _locker
+    return _decorator
+
+
+_by_tree_node = lambda timetable, tree_node, *args, **kwargs: [tree_node.tree]
+_by_tree_nodes = lambda timetable, tree_nodes: set([tree_node.tree for tree_node in tree_nodes])
+_by_job_record = lambda timetable, job_record, *args, **kwargs: [timetable.get_tree(job_record.process_name)]
+_by_process_name = lambda timetable, process_name, *args, **kwargs: [timetable.get_tree(process_name)]
+_all_trees = lambda timetable, *args, **kwargs: list(timetable.trees.values())
+
+
 class Timetable(object):
     """ Timetable holds all known process trees, where every node presents a timeperiod-driven job"""
 
@@ -35,7 +57,14 @@ class Timetable(object):
         # remember to enlist here all trees the system is working with
         self.trees = self._construct_trees_from_context()
 
+        # index in format {process_name: tree}; populated by self._register_dependencies
+        self.process_trees = dict()
+
         self._register_dependencies()
+
+        # format: {tree: (group index, RLock)}; see self._construct_tree_locks
+        self.tree_locks = self._construct_tree_locks()
+
         self.load_tree()
         self.build_trees()
         self.validate()
@@ -62,7 +91,7 @@ class Timetable(object):
         return trees
 
     def _register_dependencies(self):
-        """ register dependencies between trees"""
+        """ register dependencies between trees and index the trees by names of their processes """
         for tree_name, context_entry in context.timetable_context.items():
             tree = self.trees[tree_name]
             assert isinstance(tree, MultiLevelTree)
@@ -71,14 +100,56 @@ class Timetable(object):
                 assert isinstance(dependent_on_tree, MultiLevelTree)
                 tree.register_dependent_on(dependent_on_tree)
 
+            for process_name in context_entry.enclosed_processes:
+                self.process_trees[process_name] = tree
+
+    def _construct_tree_locks(self):
+        """ trees connected by a dependency edge in either direction form a dependency group.
+            cascades, such as reprocessing or skipping of a node, never leave the dependency group,
+            hence every group is guarded by a lock of its own and jobs of unrelated groups are managed concurrently.
+            groups are indexed in the order of their smallest tree name; the index defines locking order
+            :return: dict in format {tree: (group index, RLock)} """
+        tree_locks = dict()
+        group_index = 0
+        for tree_name in sorted(self.trees):
+            tree = self.trees[tree_name]
+            if tree in tree_locks:
+                continue
+
+            group_lock = (group_index, RLock())
+            group_index += 1
+            pending = [tree]
+            tree_locks[tree] = group_lock
+            while pending:
+                current = pending.pop()
+                for neighbour in current.dependent_on + current.dependants:
+                    if neighbour not in tree_locks:
+                        tree_locks[neighbour] = group_lock
+                        pending.append(neighbour)
+        return tree_locks
+
+    @contextmanager
+    def locked(self, trees):
+        """ acquires locks of the dependency groups of the given trees in the ascending order of the group index.
+            trees unknown to the timetable, such as None, are guarded by the timetable-wide self.lock """
+        group_locks = sorted(set([self.tree_locks.get(tree, (-1, self.lock)) for tree in trees]),
+                             key=lambda entry: entry[0])
+        for _, lock in group_locks:
+            lock.acquire()
+        try:
+            yield
+        finally:
+            for _, lock in reversed(group_locks):
+                lock.release()
+
+    def tree_lock(self, process_name):
+        """ :return: context manager that holds the lock of the dependency group hosting the given process """
+        return self.locked([self.get_tree(process_name)])
+
     # *** node manipulation methods ***
     def _find_dependant_trees(self, tree_obj):
         """ returns list of trees that are dependent_on given tree_obj """
-        dependant_trees = []
-        for tree_name, tree in self.trees.items():
-            if tree_obj in tree.dependent_on:
-                dependant_trees.append(tree)
-        return dependant_trees
+        return list(tree_obj.dependants)
 
     def _find_dependant_tree_nodes(self, node_a):
         dependant_nodes = set()
@@ -89,7 +160,7 @@ class Timetable(object):
             dependant_nodes.add(node_b)
         return dependant_nodes
 
-    @thread_safe
+    @tree_safe(_by_tree_node)
     def reprocess_tree_node(self, tree_node, tx_context=None):
         """ method reprocesses the node and all its dependants and parent nodes """
         if not tx_context:
@@ -112,6 +183,8 @@ class Timetable(object):
             state_machine = self.state_machines[state_machine_name]
             state_machine.reprocess_job(tree_node.job_record)
 
+        # node is active again and must be visited by the next tree traversal
+        tree_node.parent.update_child(tree_node)
         tx_context[tree_node.process_name][tree_node.timeperiod] = tree_node
         self.reprocess_tree_node(tree_node.parent, tx_context)
 
@@ -121,7 +194,7 @@ class Timetable(object):
 
         return tx_context
 
-    @thread_safe
+    @tree_safe(_by_tree_node)
     def skip_tree_node(self, tree_node, tx_context=None):
         """ method skips the node and all its dependants and child nodes """
         if not tx_context:
@@ -141,6 +214,8 @@ class Timetable(object):
             state_machine = self.state_machines[state_machine_name]
             state_machine.skip_job(tree_node.job_record)
 
+        if tree_node.parent is not None:
+            tree_node.parent.update_child(tree_node)
         tx_context[tree_node.process_name][tree_node.timeperiod] = tree_node
         for timeperiod, node in tree_node.children.items():
             self.skip_tree_node(node, tx_context)
@@ -151,7 +226,7 @@ class Timetable(object):
 
         return tx_context
 
-    @thread_safe
+    @tree_safe(_by_tree_node)
     def assign_job_record(self, tree_node):
         """ - looks for an existing job record in the DB, and if not found
             - creates a job record in STATE_EMBRYO and bind it to the given tree node """
@@ -163,37 +238,73 @@ class Timetable(object):
             job_record = state_machine.create_job(tree_node.process_name, tree_node.timeperiod)
         tree_node.job_record = job_record
 
+    @tree_safe(_by_tree_nodes)
+    def assign_job_records(self, tree_nodes):
+        """ bulk version of the assign_job_record:
+            - looks for existing job records in the DB with a single query per job collection
+            - creates missing job records in STATE_EMBRYO in batches and binds them to the given tree nodes """
+        # format: {(process_name, timeperiod): AbstractTreeNode}
+        nodes = dict(((tree_node.process_name, tree_node.timeperiod), tree_node) for tree_node in tree_nodes)
+        if not nodes:
+            return
+
+        for job_record in self.job_dao.get_many(list(nodes)):
+            nodes.pop(job_record.key).job_record = job_record
+
+        # format: {process_name: [timeperiod]}
+        missing_timeperiods = collections.defaultdict(list)
+        for process_name, timeperiod in nodes:
+            missing_timeperiods[process_name].append(timeperiod)
+
+        for process_name, timeperiods in missing_timeperiods.items():
+            state_machine_name = context.process_context[process_name].state_machine_name
+            state_machine = self.state_machines[state_machine_name]
+            for job_record in state_machine.create_jobs(process_name, timeperiods):
+                nodes.pop(job_record.key).job_record = job_record
+
+        # remaining job records were created by a concurrent party after the bulk read
+        for tree_node in nodes.values():
+            self.assign_job_record(tree_node)
+
+    @tree_safe(_by_job_record)
+    def update_job_record(self, job_record):
+        """ method is called by the state machines to notify the tree of the job record state change """
+        tree = self.get_tree(job_record.process_name)
+        tree.update_node(job_record)
+
     # *** Tree-manipulation methods ***
-    @thread_safe
     def get_tree(self, process_name):
-        """ return tree that is managing time-periods for given process"""
-        for tree_name, tree in self.trees.items():
-            if process_name in tree:
-                return tree
+        """ return tree that is managing time-periods for given process
+            NOTICE: the index is not modified after the timetable construction, hence no locking is required """
+        return self.process_trees.get(process_name)
 
-    @thread_safe
     def _build_tree_by_level(self, time_qualifier, collection_name, since):
-        """ method iterated thru all documents in all job collections and builds a tree of known system state"""
+        """ method streams all documents from the job collection and builds a tree of known system state.
+            documents are decoded into Job instances only if there is a tree of a matching time qualifier
+            to hold them """
         invalid_tree_records = dict()
         invalid_tq_records = dict()
+        number_of_loaded = 0
+        started_at = time.time()
+
+        for document in self.job_dao.cursor_all(collection_name, since):
+            process_name = document[job.PROCESS_NAME]
+            tree = self.get_tree(process_name)
+            if tree is None:
+                utils.increment_family_property(process_name, invalid_tree_records)
+                continue
 
-        try:
-            job_records = self.job_dao.get_all(collection_name, since)
-            for job_record in job_records:
-                tree = self.get_tree(job_record.process_name)
-                if tree is None:
-                    utils.increment_family_property(job_record.process_name, invalid_tree_records)
-                    continue
-
-                job_time_qualifier = context.process_context[job_record.process_name].time_qualifier
-                if time_qualifier != job_time_qualifier:
-                    utils.increment_family_property(job_record.process_name, invalid_tq_records)
-                    continue
-
-                tree.update_node(job_record)
+            job_time_qualifier = context.process_context[process_name].time_qualifier
+            if time_qualifier != job_time_qualifier:
+                utils.increment_family_property(process_name, invalid_tq_records)
+                continue
 
-        except LookupError:
-            self.logger.warning('No job records in {0}.'.format(collection_name))
+            # process names, timeperiods and states repeat across the tree; keep a single copy of each
+            for field_name in (job.PROCESS_NAME, job.TIMEPERIOD, job.STATE):
+                if field_name in document:
+                    document[field_name] = utils.intern_string(document[field_name])
+            tree.update_node(decode_job(document, JOB_PROJECTION))
+            number_of_loaded += 1
 
         for name, counter in invalid_tree_records.items():
             self.logger.warning('Skipping {0} job records for {1} since no tree is handling it.'
@@ -203,7 +314,17 @@ class Timetable(object):
             self.logger.warning('Skipping {0} job records for {1} since the process has different time qualifier.'
                                 .format(counter, name))
 
-    @thread_safe
+        number_of_skipped = sum(invalid_tree_records.values()) + sum(invalid_tq_records.values())
+        if number_of_loaded + number_of_skipped == 0:
+            self.logger.warning('No job records in {0}.'.format(collection_name))
+            return
+
+        elapsed = max(time.time() - started_at, 1e-6)
+        self.logger.info('Loaded {0} and skipped {1} job records from {2} in {3:.3f} sec ({4:.0f} records/sec).'
+                         .format(number_of_loaded, number_of_skipped, collection_name, elapsed,
+                                 (number_of_loaded + number_of_skipped) / elapsed))
+
+    @tree_safe(_all_trees)
     def load_tree(self):
         """ method iterates thru all objects older than synergy_start_timeperiod parameter in job collections
         and loads them into this timetable"""
@@ -218,19 +339,23 @@ class Timetable(object):
         self._build_tree_by_level(QUALIFIER_MONTHLY, COLLECTION_JOB_MONTHLY, since=monthly_timeperiod)
         self._build_tree_by_level(QUALIFIER_YEARLY, COLLECTION_JOB_YEARLY, since=yearly_timeperiod)
 
-    @thread_safe
     def build_trees(self):
-        """ method iterates thru all trees and ensures that all time-period nodes are created up till <utc_now>"""
+        """ method iterates thru all trees and ensures that all time-period nodes are created up till <utc_now>
+            and have job records assigned. only the dependency group of the tree being built is locked """
         for tree_name, tree in self.trees.items():
-            tree.build_tree()
-
-    @thread_safe
-    def validate(self):
-        """validates that none of nodes in tree is improperly finalized and that every node has job_record"""
+            with self.locked([tree]):
+                tree.build_tree()
+                self.assign_job_records(tree.get_unassigned_nodes())
+
+    def validate(self, full=False):
+        """validates that none of nodes in tree is improperly finalized and that every node has job_record.
+        only the dependency group of the tree being validated is locked
+        :param full: if True, all tree nodes are validated; otherwise only nodes changed since the last validation """
         for tree_name, tree in self.trees.items():
-            tree.validate()
+            with self.locked([tree]):
+                tree.validate(full)
 
-    @thread_safe
+    @tree_safe(_by_job_record)
     def dependent_on_composite_state(self, job_record):
         """ :return instance of <NodesCompositeState> """
         assert isinstance(job_record, Job)
@@ -239,7 +364,7 @@ class Timetable(object):
         return node.dependent_on_composite_state()
 
     # *** Job manipulation methods ***
-    @thread_safe
+    @tree_safe(_by_job_record)
     def skip_if_needed(self, job_record):
         """ method is called from abstract_state_machine.manage_job to notify about job's failed processing
             if should_skip_node returns True - the node's job_record is transferred to STATE_SKIPPED """
@@ -248,7 +373,7 @@ class Timetable(object):
         if tree.should_skip_tree_node(node):
             self.skip_tree_node(node)
 
-    @thread_safe
+    @tree_safe(_by_process_name)
     def get_next_job_record(self, process_name):
         """ :returns: the next job record to work on for the given process"""
         tree = self.get_tree(process_name)
@@ -258,7 +383,7 @@ class Timetable(object):
             self.assign_job_record(node)
         return node.job_record
 
-    @thread_safe
+    @tree_safe(_by_job_record)
     def is_job_record_finalizable(self, job_record):
         """ :return: True, if the node and all its children are either in STATE_PROCESSED or STATE_SKIPPED"""
         assert isinstance(job_record, Job)
@@ -266,7 +391,24 @@ class Timetable(object):
         node = tree.get_node(job_record.process_name, job_record.timeperiod)
         return node.is_finalizable()
 
-    @thread_safe
+    @tree_safe(_by_job_record)
+    def get_event_log(self, job_record):
+        """ job records are loaded into the timetable without their event logs
+            method reads the event log of the given job record from the DB, if it is not yet loaded,
+            and puts on top of it the entries that are not yet pushed into the DB
+            :return: event log of the job record """
+        if not job_record.is_event_log_loaded:
+            try:
+                event_log = self.job_dao.get_event_log(job_record.process_name, job_record.timeperiod)
+            except LookupError:
+                event_log = []
+            job_record.event_log = (job_record.get_new_log_entries() + event_log)[:job.MAX_NUMBER_OF_EVENTS]
+            # event log read from the DB is not a modification of the job record
+            job_record.mark_clean([job.EVENT_LOG])
+            job_record.mark_event_log_loaded()
+        return job_record.event_log
+
+    @tree_safe(_by_process_name)
     def add_log_entry(self, process_name, timeperiod, msg):
         """ adds a non-persistent log entry to the tree node """
         tree = self.get_tree(process_name)
@@ -3,14 +3,10 @@ __author__ = 'Bohdan Mushkevych'
 from datetime import datetime
 
 from synergy.scheduler.process_hierarchy import ProcessHierarchy
-from synergy.scheduler.tree_node import TreeNode, RootNode
+from synergy.scheduler.tree_node import TreeNode, RootNode, MAX_NUMBER_OF_FAILURES
 from synergy.conf import settings
 from synergy.system import time_helper
-from synergy.system.time_helper import cast_to_time_qualifier
-
-
-# number of times a Job can fail before it is considered STATE_SKIPPED.
-MAX_NUMBER_OF_FAILURES = 3
+from synergy.system.time_qualifier import QUALIFIER_DICT
 
 
 class AbstractTree(object):
@@ -19,15 +15,20 @@ class AbstractTree(object):
     def __init__(self):
         self.dependent_on = []
 
+        # reverse of the dependent_on: trees that are dependent on this one
+        self.dependants = []
+
     def register_dependent_on(self, tree):
         """registering tree that we are dependent on.
         example: horizontal client should not be finalized until we have finalized vertical site for the same period"""
         self.dependent_on.append(tree)
+        tree.dependants.append(self)
 
     def unregister_dependent_on(self, tree):
         """unregistering tree that we are dependent on"""
         if tree in self.dependent_on:
             self.dependent_on.remove(tree)
+            tree.dependants.remove(self)
 
 
 class MultiLevelTree(AbstractTree):
@@ -45,6 +46,7 @@ class MultiLevelTree(AbstractTree):
 
         self.build_timeperiod = None
         self.validation_timestamp = None
+        self.dirty_nodes = set()
         self.timetable = timetable
         self.tree_name = tree_name
         self.mx_name = mx_name
@@ -67,28 +69,30 @@ class MultiLevelTree(AbstractTree):
             # here, we work at yearly/linear level
             return None
 
-        parent_siblings = list(grandparent.children)
-        sorted_keys = sorted(parent_siblings)
-        index = sorted_keys.index(parent.timeperiod)
-        if index + 1 >= len(sorted_keys):
+        next_timeperiod = grandparent.children.next_key(parent.timeperiod)
+        if next_timeperiod is None:
             return None
         else:
-            return grandparent.children[sorted_keys[index + 1]]
+            return grandparent.children[next_timeperiod]
 
     def _get_next_child_node(self, parent):
         """
             Iterates among children of the given parent and looks for a suitable node to process
             In case given parent has no suitable nodes, a younger parent will be found
             and the logic will be repeated for him
+            NOTICE: iteration starts from the children cursor, as all preceding children are known to be exhausted
         """
-        children_keys = list(parent.children)
-        sorted_keys = sorted(children_keys)
-        for key in sorted_keys:
-            node = parent.children[key]
+        children = parent.children
+        sorted_keys = children.sorted_keys
+        for index in range(children.cursor, len(sorted_keys)):
+            node = children[sorted_keys[index]]
             if node.job_record is None:
                 self.timetable.assign_job_record(node)
                 return node
             elif self.should_skip_tree_node(node):
+                if index == children.cursor:
+                    # advance cursor only thru an uninterrupted sequence of exhausted nodes
+                    children.cursor = index + 1
                 continue
             elif node.job_record.is_active:
                 return node
@@ -100,8 +104,8 @@ class MultiLevelTree(AbstractTree):
             return self._get_next_child_node(new_parent)
         else:
             # if all valid parents are exploited - return current node
-            process_name = parent.children[sorted_keys[0]].process_name
-            time_qualifier = parent.children[sorted_keys[0]].time_qualifier
+            process_name = children[sorted_keys[0]].process_name
+            time_qualifier = children[sorted_keys[0]].time_qualifier
             actual_timeperiod = time_helper.actual_timeperiod(time_qualifier)
             return self.get_node(process_name, actual_timeperiod)
 
@@ -121,10 +125,56 @@ class MultiLevelTree(AbstractTree):
         else:
             parent = self.root
 
+        return self._get_child(parent, hierarchy_entry, timeperiod)
+
+    def _get_nodes(self, time_qualifier, timeperiods):
+        """
+        Bulk version of the _get_node for the ordered timeperiods of a single tree level:
+        the parent node is resolved and its ancestors are notified once per run of siblings
+        rather than once per timeperiod
+        :param time_qualifier: identifies the tree level
+        :param timeperiods: ordered sequence of timeperiods
+        """
+        hierarchy_entry = self.process_hierarchy.get_by_qualifier(time_qualifier)
+        if not hierarchy_entry.parent:
+            for timeperiod in timeperiods:
+                self._get_child(self.root, hierarchy_entry, timeperiod)
+            return
+
+        def _notify_ancestors(node, number_of_children):
+            if node is not None and len(node.children) != number_of_children:
+                node.parent.update_child(node)
+
+        parent_time_qualifier = hierarchy_entry.parent.process_entry.time_qualifier
+        parent_timeperiod, parent, number_of_children = None, None, 0
+        for timeperiod in timeperiods:
+            next_parent_timeperiod = hierarchy_entry.parent.cast_timeperiod(timeperiod)
+            if next_parent_timeperiod != parent_timeperiod:
+                _notify_ancestors(parent, number_of_children)
+                parent_timeperiod = next_parent_timeperiod
+                parent = self._get_node(parent_time_qualifier, parent_timeperiod)
+                number_of_children = len(parent.children)
+            self._get_child(parent, hierarchy_entry, timeperiod, notify_ancestors=False)
+        _notify_ancestors(parent, number_of_children)
+
+    def _get_child(self, parent, hierarchy_entry, timeperiod, notify_ancestors=True):
+        """ :return: child node of the parent identified by the timeperiod. The node is created if it does not exist
+            :param notify_ancestors: if False, ancestors of the parent are not updated for the new child
+            and the caller is responsible for the parent.parent.update_child(parent) call """
         node = parent.children.get(timeperiod)
         if node is None:
             node = TreeNode(self, parent, hierarchy_entry.process_entry.process_name, timeperiod, None)
-            parent.children[timeperiod] = node
+            # new node has no job record and must be visited on the next traversal:
+            # children index accounts for the new node and rewinds its cursor on insertion
+            parent.children[node.timeperiod] = node
+            self.mark_dirty(node)
+            if notify_ancestors and parent.parent is not None:
+                parent.parent.update_child(parent)
+
+            # existence of the younger sibling affects validation of the older one
+            previous_timeperiod = parent.children.previous_key(timeperiod)
+            if previous_timeperiod is not None:
+                self.mark_dirty(parent.children[previous_timeperiod])
 
         return node
 
@@ -159,35 +209,27 @@ class MultiLevelTree(AbstractTree):
         # iterate thru children and check if all of them are in STATE_SKIPPED (i.e. no data for parent to process)
         # if any is still in processing (i.e. has produced some data) - then we can not skip parent of the child node
         # case 3': consider parent as worth processing (i.e. do not skip) if child's job_record is None
-        all_children_spoiled = True
-        for key, child in node.children.items():
-            if child.job_record is None or \
-                    (child.job_record.number_of_failures <= MAX_NUMBER_OF_FAILURES
-                     and not child.job_record.is_skipped):
-                all_children_spoiled = False
-                break
-        return all_children_spoiled
+        return len(node.children) == 0 or node.children.all_spoiled
 
     def build_tree(self, rebuild=False):
-        """ method builds tree by iterating from the synergy_start_timeperiod to the current time
-            and inserting corresponding nodes """
+        """ method builds tree by inserting nodes for the range of timeperiods
+            from the synergy_start_timeperiod to the current time """
 
         time_qualifier = self.process_hierarchy.bottom_process.time_qualifier
-        process_name = self.process_hierarchy.bottom_process.process_name
         if rebuild or self.build_timeperiod is None:
             timeperiod = settings.settings['synergy_start_timeperiod']
         else:
             timeperiod = self.build_timeperiod
 
-        timeperiod = cast_to_time_qualifier(time_qualifier, timeperiod)
         actual_timeperiod = time_helper.actual_timeperiod(time_qualifier)
-
-        while actual_timeperiod >= timeperiod:
-            self.get_node(process_name, timeperiod)
-            timeperiod = time_helper.increment_timeperiod(time_qualifier, timeperiod)
-
+        self._get_nodes(time_qualifier, time_helper.timeperiod_range(time_qualifier, timeperiod, actual_timeperiod))
         self.build_timeperiod = actual_timeperiod
 
+    def get_unassigned_nodes(self):
+        """ :return: list of tree nodes that have no job record assigned
+            NOTICE: such nodes are always dirty, as they have not yet passed validation """
+        return [node for node in self.dirty_nodes if node.job_record is None]
+
     def get_next_node(self, process_name):
         """ :return: <AbstractTreeNode> next node to process by a process with process_name """
         if process_name not in self.process_hierarchy:
@@ -213,9 +255,30 @@ class MultiLevelTree(AbstractTree):
         time_qualifier = self.process_hierarchy[process_name].process_entry.time_qualifier
         return self._get_node(time_qualifier, timeperiod)
 
-    def validate(self):
+    def mark_dirty(self, node):
+        """ registers the node for the next incremental validation """
+        self.dirty_nodes.add(node)
+
+    def validate(self, full=False):
         """ method starts validation of the tree.
+            Incremental validation covers only nodes marked as dirty since the previous validation and their ancestors.
+            Nodes are validated bottom-up, so that the children are validated before their parents
+            :param full: if True, the whole tree is traversed and validated regardless of the dirty nodes
             @see TreeNode.validate """
-        for timeperiod, child in self.root.children.items():
-            child.validate()
+        # nodes that are marked as dirty during this validation are kept for the next one
+        dirty_nodes, self.dirty_nodes = self.dirty_nodes, set()
+
+        if full:
+            for timeperiod, child in self.root.children.items():
+                child.validate()
+        else:
+            nodes = set(dirty_nodes)
+            for node in dirty_nodes:
+                ancestor = node.parent
+                while ancestor is not None and ancestor.parent is not None and ancestor not in nodes:
+                    nodes.add(ancestor)
+                    ancestor = ancestor.parent
+
+            for node in sorted(nodes, key=lambda x: (QUALIFIER_DICT[x.time_qualifier], x.timeperiod)):
+                node.validate(recursive=False)
         self.validation_timestamp = datetime.utcnow()
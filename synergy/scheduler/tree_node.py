@@ -1,11 +1,20 @@
 __author__ = 'Bohdan Mushkevych'
 
-from synergy.db.model import job
+from bisect import bisect_left, bisect_right, insort
+
 from synergy.system import time_helper
+from synergy.system.utils import intern_string
 from synergy.system.immutable_dict import ImmutableDict
 from synergy.conf import context
 
 
+# number of times a Job can fail before it is considered STATE_SKIPPED.
+MAX_NUMBER_OF_FAILURES = 3
+
+# bottom-level nodes of the process hierarchy have no children and share this single empty mapping
+NO_CHILDREN = ImmutableDict({})
+
+
 class NodesCompositeState(object):
     """ Instance of this structure represents composite state of TreeNodes """
 
@@ -36,17 +45,188 @@ class NodesCompositeState(object):
             self.skipped_present = True
 
 
+def _job_state(job_record):
+    """ :return: tuple (is_active, is_finished, is_skipped, is_failed) describing given job record
+        where is_failed stands for a job that is not skipped, but has exhausted its MAX_NUMBER_OF_FAILURES """
+    if job_record is None:
+        return False, False, False, False
+
+    is_skipped = bool(job_record.is_skipped)
+    is_failed = not is_skipped and job_record.number_of_failures > MAX_NUMBER_OF_FAILURES
+    return bool(job_record.is_active), bool(job_record.is_finished), is_skipped, is_failed
+
+
+class ChildrenIndex(dict):
+    """ dictionary of child nodes in format {timeperiod: TreeNode}
+        that maintains an ordered list of its keys and a cursor into it:
+        children in front of the cursor are known to be exempt from processing
+        i.e. finished or qualified to be skipped.
+        In addition, the index counts active/finished/skipped/failed job records of its children.
+        NOTICE: the counters and the cursor are updated by the refresh, that is called when a child is assigned
+        a job record, and by the Timetable.update_job_record on every state change made by the state machines.
+        A job record modified in place, without that notification, leaves them stale: hence a counter that claims
+        all children is confirmed by re-reading their job records, while a negative answer is served in O(1) """
+    __slots__ = ('sorted_keys', 'cursor', 'number_of_active', 'number_of_finished',
+                 'number_of_skipped', 'number_of_failed', '_states')
+
+    def __init__(self):
+        super(ChildrenIndex, self).__init__()
+        self.sorted_keys = []
+        self.cursor = 0
+
+        self.number_of_active = 0
+        self.number_of_finished = 0
+        self.number_of_skipped = 0
+        self.number_of_failed = 0
+
+        # format: {timeperiod: job state tuple, as it is accounted in the counters}
+        self._states = dict()
+
+    def __setitem__(self, key, value):
+        if key not in self:
+            if not self.sorted_keys or key > self.sorted_keys[-1]:
+                # timeperiods are predominantly appended in the ascending order
+                self.sorted_keys.append(key)
+            else:
+                insort(self.sorted_keys, key)
+        super(ChildrenIndex, self).__setitem__(key, value)
+        self.refresh(key)
+
+    def __delitem__(self, key):
+        super(ChildrenIndex, self).__delitem__(key)
+        self._account(key, _job_state(None))
+        del self._states[key]
+
+        index = bisect_left(self.sorted_keys, key)
+        del self.sorted_keys[index]
+        if index < self.cursor:
+            self.cursor -= 1
+
+    def _account(self, key, new_state):
+        """ :return: True if the counters were changed """
+        old_state = self._states.get(key, (False, False, False, False))
+        if old_state == new_state:
+            return False
+
+        self.number_of_active += new_state[0] - old_state[0]
+        self.number_of_finished += new_state[1] - old_state[1]
+        self.number_of_skipped += new_state[2] - old_state[2]
+        self.number_of_failed += new_state[3] - old_state[3]
+        self._states[key] = new_state
+        return True
+
+    def refresh(self, key):
+        """ method re-reads job record of the child identified by the key, updates the counters
+            and moves the cursor back to the child, so that it is re-evaluated on the next traversal """
+        self._account(key, _job_state(self[key].job_record))
+        self.rewind(key)
+
+    def _recount(self):
+        """ method re-reads job records of all children and updates the counters
+            children, whose job records were modified in place, are re-evaluated on the next traversal """
+        for key, node in self.items():
+            if self._account(key, _job_state(node.job_record)):
+                self.rewind(key)
+
+    @property
+    def all_finished(self):
+        """ :return: True if job records of all children are in finished state """
+        if self.number_of_finished != len(self):
+            return False
+        self._recount()
+        return self.number_of_finished == len(self)
+
+    @property
+    def all_inactive(self):
+        """ :return: True if none of the children job records is in active state """
+        if self.number_of_active != 0:
+            return False
+        self._recount()
+        return self.number_of_active == 0
+
+    @property
+    def all_skipped(self):
+        """ :return: True if job records of all children are in STATE_SKIPPED """
+        if self.number_of_skipped != len(self):
+            return False
+        self._recount()
+        return self.number_of_skipped == len(self)
+
+    @property
+    def all_spoiled(self):
+        """ :return: True if job records of all children are either in STATE_SKIPPED
+            or have exhausted their MAX_NUMBER_OF_FAILURES """
+        if self.number_of_skipped + self.number_of_failed != len(self):
+            return False
+        self._recount()
+        return self.number_of_skipped + self.number_of_failed == len(self)
+
+    def previous_key(self, key):
+        """ :return: key that immediately precedes the given one in the ascending order, or None """
+        index = bisect_left(self.sorted_keys, key)
+        if index == 0:
+            return None
+        return self.sorted_keys[index - 1]
+
+    def next_key(self, key):
+        """ :return: key that immediately follows the given one in the ascending order, or None """
+        index = bisect_right(self.sorted_keys, key)
+        if index >= len(self.sorted_keys):
+            return None
+        return self.sorted_keys[index]
+
+    def rewind(self, key):
+        """ moves the cursor back to the position of the given key, if the cursor has already passed it """
+        index = bisect_left(self.sorted_keys, key)
+        if index < self.cursor:
+            self.cursor = index
+
+
 class AbstractTreeNode(object):
+    # a tree holds a node per timeperiod for years of history, hence nodes carry no per-instance __dict__
+    __slots__ = ('tree', 'parent', 'process_name', 'timeperiod', '_job_record', 'time_qualifier', 'children')
+
     def __init__(self, tree, parent, process_name, timeperiod, job_record):
         self.tree = tree
         self.parent = parent
-        self.process_name = process_name
-        self.timeperiod = timeperiod
-        self.job_record = job_record
+        self.process_name = intern_string(process_name)
+        self.timeperiod = intern_string(timeperiod)
+        self._job_record = job_record
 
         # fields self.time_qualifier and self.children are properly set in the child class
         self.time_qualifier = None
-        self.children = ImmutableDict({})
+        self.children = NO_CHILDREN
+
+    @property
+    def job_record(self):
+        return self._job_record
+
+    @job_record.setter
+    def job_record(self, value):
+        """ assigning the job record notifies the parent, that accounts its state in the ChildrenIndex.
+            NOTICE: state changes of the job record in place must be followed by the Timetable.update_job_record,
+            that re-assigns it """
+        self._job_record = value
+        if self.parent is not None:
+            self.parent.update_child(self)
+
+    @property
+    def event_log(self):
+        """ :return: event log of the node's job record.
+            job records are loaded into the timetable without their event logs,
+            hence the event log is read from the DB on the first access """
+        if self.job_record is None:
+            return []
+        return self.tree.timetable.get_event_log(self.job_record)
+
+    def update_child(self, child):
+        """ method refreshes state counters and the cursor of this node's children for the given child
+            and propagates the update up the tree, so that the child is re-evaluated on the next traversal
+            and re-validated on the next tree validation """
+        self.children.refresh(child.timeperiod)
+        self.tree.mark_dirty(child)
+        if self.parent is not None:
+            self.parent.update_child(self)
 
     def is_finalizable(self):
         """method checks whether:
@@ -61,15 +241,15 @@ class AbstractTreeNode(object):
         if self.job_record is None:
             self.tree.timetable.assign_job_record(self)
 
-        children_processed = all([child.job_record.is_finished for child in self.children.values()])
-
-        return children_processed and self.job_record.is_active
+        # children are checked last, as their confirmed state costs a pass over them
+        return self.job_record.is_active and (len(self.children) == 0 or self.children.all_finished)
 
-    def validate(self):
+    def validate(self, recursive=True):
         """method traverse tree and performs following activities:
         * requests a job record in STATE_EMBRYO if no job record is currently assigned to the node
         * requests nodes for reprocessing, if STATE_PROCESSED node relies on unfinalized nodes
-        * requests node for skipping if it is daily node and all 24 of its Hourly nodes are in STATE_SKIPPED state"""
+        * requests node for skipping if it is daily node and all 24 of its Hourly nodes are in STATE_SKIPPED state
+        :param recursive: if False, children of the node are not validated and are assumed to be valid """
 
         # step 1: request Job record if current one is not set
         if self.job_record is None:
@@ -80,15 +260,12 @@ class AbstractTreeNode(object):
         has_younger_sibling = next_timeperiod in self.parent.children
 
         # step 3: define if all children are done and if perhaps they all are in STATE_SKIPPED
-        all_children_skipped = True
-        all_children_finished = True
-        for timeperiod, child in self.children.items():
-            child.validate()
+        if recursive:
+            for timeperiod, child in self.children.items():
+                child.validate()
 
-            if child.job_record.is_active:
-                all_children_finished = False
-            if not child.job_record.is_skipped:
-                all_children_skipped = False
+        all_children_skipped = len(self.children) == 0 or self.children.all_skipped
+        all_children_finished = len(self.children) == 0 or self.children.all_inactive
 
         # step 4: request this node's reprocessing if it is enroute to STATE_PROCESSED
         # while some of its children are still performing processing
@@ -110,11 +287,12 @@ class AbstractTreeNode(object):
 
     def add_log_entry(self, entry):
         """ :db.model.job record holds event log, that can be accessed by MX
-            this method adds a record and removes oldest one if necessary """
-        event_log = self.job_record.event_log
-        if len(event_log) > job.MAX_NUMBER_OF_EVENTS:
-            del event_log[-1]
-        event_log.insert(0, entry)
+            this method adds a record and removes oldest one if necessary.
+            the record is pushed into the DB by the next update of the job record """
+        if self.job_record is None:
+            return
+
+        self.job_record.add_log_entry(entry)
 
     def find_counterpart_in(self, tree_b):
         """ Finds a TreeNode counterpart for this node in tree_b
@@ -159,21 +337,25 @@ class AbstractTreeNode(object):
 
 
 class TreeNode(AbstractTreeNode):
+    __slots__ = ()
+
     def __init__(self, tree, parent, process_name, timeperiod, job_record):
         super(TreeNode, self).__init__(tree, parent, process_name, timeperiod, job_record)
         self.time_qualifier = context.process_context[process_name].time_qualifier
 
         child_hierarchy_entry = tree.process_hierarchy.get_child_by_qualifier(self.time_qualifier)
         if child_hierarchy_entry:
-            children = dict()
+            children = ChildrenIndex()
         else:
             # this is the bottom process of the process hierarchy with no children
-            children = ImmutableDict({})
+            children = NO_CHILDREN
         self.children = children
 
 
 class RootNode(AbstractTreeNode):
+    __slots__ = ()
+
     def __init__(self, tree):
         super(RootNode, self).__init__(tree, None, None, None, None)
         self.time_qualifier = None
-        self.children = dict()
+        self.children = ChildrenIndex()
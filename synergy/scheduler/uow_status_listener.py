@@ -6,7 +6,7 @@ from amqp import AMQPError
 
 from synergy.db.model.mq_transmission import MqTransmission
 from synergy.db.model import unit_of_work
-from synergy.db.dao.unit_of_work_dao import UnitOfWorkDao
+from synergy.db.dao.cached_unit_of_work_dao import CachedUnitOfWorkDao
 from synergy.scheduler.scheduler_constants import QUEUE_UOW_STATUS
 from synergy.mq.flopsy import Consumer
 
@@ -18,7 +18,7 @@ class UowStatusListener(object):
         self.scheduler = scheduler
         self.timetable = scheduler.timetable
         self.logger = scheduler.logger
-        self.uow_dao = UnitOfWorkDao(self.logger)
+        self.uow_dao = CachedUnitOfWorkDao(self.logger)
         self.consumer = Consumer(QUEUE_UOW_STATUS)
         self.main_thread = None
 
@@ -38,6 +38,8 @@ class UowStatusListener(object):
             self.logger.info('UowStatusListener {')
 
             mq_request = MqTransmission.from_json(message.body)
+            # the status message reports a change made by the worker: the cached record is outdated
+            self.uow_dao.invalidate(mq_request.record_db_id)
             uow = self.uow_dao.get_one(mq_request.record_db_id)
             if uow.unit_of_work_type != unit_of_work.TYPE_MANAGED:
                 self.logger.info('Received transmission from non-managed UOW execution: {0}. Ignoring it.'
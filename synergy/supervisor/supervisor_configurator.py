@@ -1,12 +1,11 @@
 __author__ = 'Bohdan Mushkevych'
 
 import re
-import pymongo
 from six import string_types
 
 from synergy.db.dao.box_configuration_dao import BoxConfigurationDao, QUERY_PROCESSES_FOR_BOX_ID
-from synergy.db.manager import ds_manager
-from synergy.db.model.box_configuration import BoxConfiguration, BOX_ID, PROCESS_NAME
+from synergy.db.manager import ds_manager, index_registry
+from synergy.db.model.box_configuration import BoxConfiguration
 from synergy.conf import context, settings
 from synergy.supervisor.supervisor_constants import PROCESS_SUPERVISOR, COLLECTION_BOX_CONFIGURATION
 from synergy.system.system_logger import get_logger
@@ -128,8 +127,7 @@ class SupervisorConfigurator(object):
         ds._db.drop_collection(COLLECTION_BOX_CONFIGURATION)
         self.logger.info('*synergy.box_configuration* table has been dropped')
 
-        connection = ds.connection(COLLECTION_BOX_CONFIGURATION)
-        connection.create_index([(BOX_ID, pymongo.ASCENDING), (PROCESS_NAME, pymongo.ASCENDING)], unique=True)
+        index_registry.ensure_indexes(ds, self.logger, [COLLECTION_BOX_CONFIGURATION])
 
         for process_name, supervisor_entry in self.process_map.items():
             if supervisor_entry.is_present_on(self.box_id):
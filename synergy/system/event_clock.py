@@ -1,13 +1,16 @@
 __author__ = 'Bohdan Mushkevych'
 
+import sys
+import heapq
+import threading
+import traceback
 from six import string_types
 from datetime import datetime, timedelta
 
-from synergy.system.repeat_timer import RepeatTimer
+from synergy.system.timer_service import TimerService
 
 TIME_OF_DAY_FORMAT = "%H:%M"
 EVERY_DAY = '*'        # marks every day as suitable to trigger the event
-TRIGGER_INTERVAL = 30  # half a minute
 
 
 class EventTime(object):
@@ -52,7 +55,8 @@ class EventTime(object):
         def wind_days(start_date):
             while True:
                 if self.day_of_week == EVERY_DAY or start_date.weekday() == int(self.day_of_week):
-                    return start_date.replace(hour=self.time_of_day.hour, minute=self.time_of_day.minute)
+                    return start_date.replace(hour=self.time_of_day.hour, minute=self.time_of_day.minute,
+                                              second=0, microsecond=0)
                 else:
                     start_date += timedelta(days=1)
 
@@ -69,19 +73,27 @@ class EventTime(object):
 
 class EventClock(object):
     """ This class triggers on predefined time set in format 'day_of_week-HH:MM' or 'HH:MM'
-    Maintaining API compatibility with the RepeatTimer class """
+    Maintaining API compatibility with the RepeatTimer class.
+    EventClock keeps a heap of upcoming occurrences of its events and asks the TimerService
+    to wake it exactly at the earliest one; the heap is recomputed only after a fire or change_interval """
 
     def __init__(self, interval, call_back, args=None, kwargs=None):
         if not kwargs: kwargs = {}
         if not args: args = []
 
+        self.lock = threading.RLock()
         self.timestamps = []
+        # heap of tuples (datetime of the upcoming occurrence, EventTime)
+        self.schedule = []
+
+        # generation identifies the current countdown; every re-schedule and cancellation invalidates it
+        self.generation = 0
+        self.is_running = False
         self.change_interval(interval)
 
         self.args = args
         self.kwargs = kwargs
         self.call_back = call_back
-        self.handler = RepeatTimer(TRIGGER_INTERVAL, self.manage_schedule)
         self.activation_dt = None
 
     def _trigger_now(self):
@@ -91,33 +103,82 @@ class EventClock(object):
         self.call_back(*self.args, **self.kwargs)
         self.activation_dt = datetime.utcnow()
 
-    def manage_schedule(self, *_):
-        current_time = EventTime.utc_now()
-        if current_time in self.timestamps:
-            self._trigger_now()
+    def _compute_schedule(self, utc_now):
+        """ builds the heap of upcoming occurrences of every event. must be called with self.lock held """
+        self.schedule = [(event_time.next_trigger_frequency(utc_now), event_time) for event_time in self.timestamps]
+        heapq.heapify(self.schedule)
+
+    def _advance_schedule(self, utc_now):
+        """ replaces occurrences that are due by <utc_now> with the following ones. must be called with self.lock held
+            :return: True if any of the occurrences was due """
+        is_due = False
+        while self.schedule and self.schedule[0][0] <= utc_now:
+            fire_dt, event_time = heapq.heappop(self.schedule)
+            heapq.heappush(self.schedule, (event_time.next_trigger_frequency(fire_dt + timedelta(minutes=1)),
+                                           event_time))
+            is_due = True
+        return is_due
+
+    def _schedule(self):
+        """ starts countdown to the earliest upcoming occurrence. must be called with self.lock held """
+        self.generation += 1
+        if not self.schedule:
+            return
+
+        delay = (self.schedule[0][0] - datetime.utcnow()).total_seconds()
+        TimerService().schedule(self, self.generation, max(delay, 0))
+
+    def fire(self, generation):
+        """ called by the TimerService at the end of the countdown """
+        with self.lock:
+            if not self.is_running or generation != self.generation:
+                return
+            is_due = self._advance_schedule(datetime.utcnow())
+
+        try:
+            if is_due:
+                self._trigger_now()
+        except Exception:
+            sys.stderr.write('Exception in EventClock call_back {0}'.format(self.call_back))
+            traceback.print_exc(file=sys.stderr)
+        finally:
+            with self.lock:
+                if self.is_running and generation == self.generation:
+                    self._schedule()
 
     def start(self):
-        self.handler.start()
+        with self.lock:
+            if self.is_running:
+                return
+            self.is_running = True
+            self._compute_schedule(datetime.utcnow())
+            self._schedule()
 
     def cancel(self):
-        self.handler.cancel()
+        with self.lock:
+            self.is_running = False
+            self.generation += 1
 
     def trigger(self):
         current_time = EventTime.utc_now()
         if current_time not in self.timestamps:
             self._trigger_now()
         else:
-            # leave it to the regular flow to trigger the call_back via manage_schedule method
+            # leave it to the regular flow to trigger the call_back at the scheduled occurrence
             pass
 
     def change_interval(self, value):
         """ :param value: list of strings in format 'Day_of_Week-HH:MM' """
         assert not isinstance(value, string_types)
-        self.timestamps = []
+        with self.lock:
+            self.timestamps = []
+            for timestamp in value:
+                event = EventTime(timestamp)
+                self.timestamps.append(event)
 
-        for timestamp in value:
-            event = EventTime(timestamp)
-            self.timestamps.append(event)
+            if self.is_running:
+                self._compute_schedule(datetime.utcnow())
+                self._schedule()
 
     def next_run_in(self, utc_now=None):
         """ :param utc_now: optional parameter to be used by Unit Tests as a definition of "now"
@@ -138,4 +199,4 @@ class EventClock(object):
             return None
 
     def is_alive(self):
-        return self.handler.is_alive()
+        return self.is_running
@@ -1,6 +1,7 @@
 __author__ = 'Bohdan Mushkevych'
 
 from threading import Lock
+from collections import OrderedDict
 
 from synergy.scheduler.scheduler_constants import QUEUE_UOW_STATUS, QUEUE_JOB_STATUS
 from synergy.db.model.mq_transmission import MqTransmission
@@ -31,6 +32,22 @@ class MqTransmitter(object):
         publisher.publish(mq_request.document)
         publisher.release()
 
+    @thread_safe
+    def publish_managed_uows(self, uows):
+        """ publishes UOWs in their order, acquiring the publisher once per process """
+        per_process = OrderedDict()
+        for uow in uows:
+            per_process.setdefault(uow.process_name, []).append(uow)
+
+        for process_name, process_uows in per_process.items():
+            publisher = self.publishers.get(process_name)
+            try:
+                for uow in process_uows:
+                    mq_request = MqTransmission(process_name=uow.process_name, record_db_id=uow.db_id)
+                    publisher.publish(mq_request.document)
+            finally:
+                publisher.release()
+
     @thread_safe
     def publish_freerun_uow(self, freerun_entry, uow):
         mq_request = MqTransmission(process_name=freerun_entry.process_name,
@@ -67,24 +67,67 @@ class PriorityEntry(object):
 
 
 class PriorityQueue(object):
-    """ Priority Queue that retrieves entries in the priority order (lowest first) """
+    """ Priority Queue that retrieves entries in the priority order (lowest first).
+        Entries are indexed by the key of their unit_of_work, so that the membership test and the removal take O(1).
+        Removed entries are not deleted from the heap right away: they are dropped
+        once they surface at the top of the heap or when the heap is compacted (lazy deletion) """
 
     def __init__(self):
-        self.queue = list()
+        self.heap = list()
+
+        # format: {unit_of_work key: PriorityEntry}
+        self.entries = dict()
 
     def __len__(self):
-        return len(self.queue)
+        return len(self.entries)
 
     def __contains__(self, item):
-        return item in self.queue
+        return item.entry.key in self.entries
+
+    def __iter__(self):
+        """ :return: iterator over the queue entries in the heap order, which starts with the minimal entry
+            but is not sorted. the iterator works on a copy of the heap and tolerates concurrent modifications """
+        for item in list(self.heap):
+            if self._is_live(item):
+                yield item
+
+    @property
+    def queue(self):
+        """ :return: list of the queue entries in the heap order """
+        return list(self)
+
+    def _is_live(self, item):
+        return self.entries.get(item.entry.key) is item
+
+    def _drop_stale_top(self):
+        while self.heap and not self._is_live(self.heap[0]):
+            heapq.heappop(self.heap)
+
+    def _compact(self):
+        """ rebuilds the heap once the removed entries outnumber the live ones """
+        if len(self.heap) > 2 * len(self.entries) + 16:
+            self.heap = [item for item in self.heap if self._is_live(item)]
+            heapq.heapify(self.heap)
 
     def put(self, item):
-        heapq.heappush(self.queue, item)
+        """ adds the item to the queue. the item replaces a queued entry of the same unit_of_work, if any """
+        self.entries[item.entry.key] = item
+        heapq.heappush(self.heap, item)
+        self._compact()
+
+    def remove(self, item):
+        """ removes an entry of the item's unit_of_work from the queue, if present """
+        self.entries.pop(item.entry.key, None)
+        self._compact()
 
     def pop(self):
         """ :return: minimal element is removed from the queue and returned to the caller """
-        return heapq.heappop(self.queue)
+        self._drop_stale_top()
+        item = heapq.heappop(self.heap)
+        del self.entries[item.entry.key]
+        return item
 
     def peek(self):
         """ :return: minimal element without being removed from the queue """
-        return min(self.queue)
+        self._drop_stale_top()
+        return self.heap[0]
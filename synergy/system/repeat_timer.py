@@ -3,19 +3,25 @@
 @author: Brian Curtin
 http://code.activestate.com/lists/python-ideas/8982/
 """
+import sys
 import numbers
 import threading
+import traceback
 from datetime import datetime, timedelta
 
+from synergy.system.timer_service import TimerService
 
-class RepeatTimer(threading.Thread):
-    """ This class triggers every number of seconds """
+
+class RepeatTimer(object):
+    """ This class triggers every number of seconds.
+        RepeatTimer owns no thread: its countdowns are tracked by the process-wide TimerService,
+        and its call_back is executed by one of the TimerService dispatch threads """
     def __init__(self, interval, call_back, daemonic=None, args=None, kwargs=None):
+        """ :param daemonic: if False, the running timer keeps the process alive, as a non-daemonic thread would.
+            None stands for the daemonic state of the current thread, as in Python3 """
         if not kwargs: kwargs = {}
         if not args: args = []
-        
-        threading.Thread.__init__(self)
-        # handle daemonic state as in Python3
+
         if daemonic is not None:
             self.daemon = daemonic
         else:
@@ -29,38 +35,67 @@ class RepeatTimer(threading.Thread):
         self.call_back = call_back
         self.args = args
         self.kwargs = kwargs
-        self.event = threading.Event()
-        self.event.set()
         self.activation_dt = None
-        self.__timer = None
-
-    def run(self):
-        while self.event.is_set():
-            self.activation_dt = datetime.utcnow()
-            self.__timer = threading.Timer(self.interval_new,
-                                           self.call_back,
-                                           self.args,
-                                           self.kwargs)
-            self.interval_current = self.interval_new
-            self.__timer.start()
-            self.__timer.join()
+
+        # generation identifies the current countdown; every re-schedule and cancellation invalidates it
+        self.generation = 0
+        self.is_running = False
+        self.lock = threading.RLock()
+
+    def _schedule(self):
+        """ starts a new countdown. must be called with self.lock held """
+        self.generation += 1
+        self.activation_dt = datetime.utcnow()
+        self.interval_current = self.interval_new
+        TimerService().schedule(self, self.generation, self.interval_current)
+
+    def start(self):
+        """ starts the countdown. the call_back is called in <interval> seconds """
+        with self.lock:
+            if self.is_running:
+                return
+            self.is_running = True
+            if not self.daemon:
+                TimerService().hold_process()
+            self._schedule()
+
+    def fire(self, generation):
+        """ called by the TimerService at the end of the countdown.
+            the next countdown starts once the call_back is complete """
+        with self.lock:
+            if not self.is_running or generation != self.generation:
+                return
+
+        try:
+            self.call_back(*self.args, **self.kwargs)
+        except Exception:
+            sys.stderr.write('Exception in RepeatTimer call_back {0}'.format(self.call_back))
+            traceback.print_exc(file=sys.stderr)
+        finally:
+            with self.lock:
+                # the countdown could have been cancelled or restarted by the trigger() while the call_back was running
+                if self.is_running and generation == self.generation:
+                    self._schedule()
 
     def cancel(self):
         """ stops the timer. call_back function is not called """
-        self.event.clear()
-        if self.__timer is not None:
-            self.__timer.cancel()
+        with self.lock:
+            if self.is_running and not self.daemon:
+                TimerService().release_process()
+            self.is_running = False
+            self.generation += 1
 
     def trigger(self):
         """ calls the call_back function. interrupts the timer to start a new countdown """
         self.call_back(*self.args, **self.kwargs)
-        if self.__timer is not None:
-            self.__timer.cancel()
+        with self.lock:
+            if self.is_running:
+                self._schedule()
 
     def change_interval(self, value):
         """ :param value: <tick> interval in seconds
             current countdown is not interrupted
-            new interval will be applied after the trigger execution """
+            new interval is applied to the next countdown, started after the call_back or trigger execution """
         self.interval_new = value
 
     def next_run_in(self, utc_now=None):
@@ -75,3 +110,6 @@ class RepeatTimer(threading.Thread):
             return next_run - utc_now
         else:
             return None
+
+    def is_alive(self):
+        return self.is_running
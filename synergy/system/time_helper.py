@@ -6,6 +6,7 @@ import calendar
 
 from datetime import datetime, timedelta
 from synergy.system.time_qualifier import *
+from synergy.system import timeperiod_arithmetic
 
 SYNERGY_SESSION_PATTERN = '%Y%m%d%H%M%S'
 SYNERGY_HOURLY_PATTERN = '%Y%m%d%H'
@@ -99,7 +100,14 @@ def increment_timeperiod(time_qualifier, timeperiod, delta=1):
     """ method performs simple increment/decrement of the timeperiods
     For instance: 2010010119 with delta=1 -> 2010010120
     Or 2010010000 with delta=-1 -> 2009120000, etc"""
+    result = timeperiod_arithmetic.increment_timeperiod(time_qualifier, timeperiod, delta)
+    if result is None:
+        result = _increment_timeperiod_by_datetime(time_qualifier, timeperiod, delta)
+    return result
 
+
+def _increment_timeperiod_by_datetime(time_qualifier, timeperiod, delta):
+    """ datetime-based increment_timeperiod: handles timeperiods rejected by the timeperiod_arithmetic """
     pattern = define_pattern(timeperiod)
     t = datetime.strptime(timeperiod, pattern)
 
@@ -138,7 +146,14 @@ def increment_timeperiod(time_qualifier, timeperiod, delta=1):
 def cast_to_time_qualifier(time_qualifier, timeperiod):
     """ method casts given timeperiod accordingly to time qualifier.
     For example, will cast session time format of 20100101193412 to 2010010119 with QUALIFIER_HOURLY """
+    result = timeperiod_arithmetic.cast_to_time_qualifier(time_qualifier, timeperiod)
+    if result is None:
+        result = _cast_to_time_qualifier_by_datetime(time_qualifier, timeperiod)
+    return result
+
 
+def _cast_to_time_qualifier_by_datetime(time_qualifier, timeperiod):
+    """ datetime-based cast_to_time_qualifier: handles timeperiods rejected by the timeperiod_arithmetic """
     if time_qualifier == QUALIFIER_HOURLY:
         date_format = SYNERGY_HOURLY_PATTERN
     elif time_qualifier == QUALIFIER_DAILY:
@@ -155,6 +170,21 @@ def cast_to_time_qualifier(time_qualifier, timeperiod):
     return t.strftime(date_format)
 
 
+def timeperiod_range(time_qualifier, start_timeperiod, end_timeperiod):
+    """ method returns list of timeperiods of the given time qualifier
+    from the start_timeperiod to the end_timeperiod inclusively. Both boundaries are casted to the time qualifier.
+    For instance: QUALIFIER_HOURLY, 2010010122, 2010010201 -> [2010010122, 2010010123, 2010010200, 2010010201] """
+    result = timeperiod_arithmetic.timeperiod_range(time_qualifier, start_timeperiod, end_timeperiod)
+    if result is None:
+        result = []
+        timeperiod = cast_to_time_qualifier(time_qualifier, start_timeperiod)
+        end_timeperiod = cast_to_time_qualifier(time_qualifier, end_timeperiod)
+        while end_timeperiod >= timeperiod:
+            result.append(timeperiod)
+            timeperiod = increment_timeperiod(time_qualifier, timeperiod)
+    return result
+
+
 def datetime_to_synergy(time_qualifier, dt):
     """ method parses datetime and returns Synergy Date"""
     if time_qualifier == QUALIFIER_HOURLY:
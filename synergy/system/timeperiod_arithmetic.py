@@ -0,0 +1,349 @@
+""" Module contains integer-based arithmetic on timeperiods in Synergy format YYYYMMDDHH and YYYYMMDDHHmmSS.
+Functions of this module produce results identical to their datetime-based counterparts from the time_helper,
+however they operate directly on the digits of the timeperiod and avoid datetime.strptime and datetime.strftime.
+Timeperiods, that the datetime-based functions either treat specially or reject, are not handled:
+in such case functions of this module return None and the caller falls back to the datetime-based computation """
+
+__author__ = 'Bohdan Mushkevych'
+
+from datetime import date
+
+from synergy.system.time_qualifier import *
+
+# Python 2 datetime.strftime rejects years prior to 1900
+MIN_YEAR = 1900
+MAX_YEAR = 9999
+
+DAYS_IN_MONTH = (0, 31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31)
+
+
+def _is_leap(year):
+    return year % 4 == 0 and (year % 100 != 0 or year % 400 == 0)
+
+
+def _days_in_month(year, month):
+    if month == 2 and _is_leap(year):
+        return 29
+    return DAYS_IN_MONTH[month]
+
+
+def _build_month_day(allow_zero):
+    """ :return: dict {'MMDD': (month, day)} for all the days of a leap year
+        :param allow_zero: zero components of YYYYMMDDHH are matched by the literal zeros of the pattern
+        and datetime.strptime defaults them to 1 """
+    month_day = dict()
+    first = 0 if allow_zero else 1
+    for month in range(first, 13):
+        for day in range(first, _days_in_month(2000, month or 1) + 1):
+            month_day['%02d%02d' % (month, day)] = (month or 1, day or 1)
+    return month_day
+
+
+# lookup tables for parsing and formatting of the timeperiod components
+TWO_DIGITS = tuple('%02d' % i for i in range(60))
+MONTH_DAY = _build_month_day(allow_zero=True)
+SESSION_MONTH_DAY = _build_month_day(allow_zero=False)
+HOURS = dict((TWO_DIGITS[i], i) for i in range(24))
+MONTHS = dict((TWO_DIGITS[i], i) for i in range(1, 13))
+MINUTES = frozenset(TWO_DIGITS[:60])
+SECONDS = frozenset(TWO_DIGITS[:60])
+
+# years served by the fast paths of the increment and the cast, that spare the str/int conversions of the year
+FAST_YEARS = dict(('%04d' % year, year) for year in range(MIN_YEAR, 2200))
+FAST_YEAR_NAMES = dict((year, name) for name, year in FAST_YEARS.items())
+# format: {'MMDD' of the YYYYMMDDHH timeperiod: 'MMDD' with the zero components replaced by 01}
+CAST_MONTH_DAY = dict((name, TWO_DIGITS[month] + TWO_DIGITS[day]) for name, (month, day) in MONTH_DAY.items())
+
+
+def _parse(timeperiod):
+    """ :return: tuple (year, month, day, hour) matching datetime.strptime(timeperiod, define_pattern(timeperiod))
+        or None if the timeperiod is not handled by this module """
+    length = len(timeperiod)
+    if length == 10:
+        month_day = MONTH_DAY.get(timeperiod[4:8])
+    elif length == 14:
+        # session timeperiod YYYYMMDDHHmmSS
+        if timeperiod[10:12] not in MINUTES or timeperiod[12:14] not in SECONDS:
+            return None
+        month_day = SESSION_MONTH_DAY.get(timeperiod[4:8])
+    else:
+        return None
+
+    hour = HOURS.get(timeperiod[8:10])
+    year = timeperiod[0:4]
+    if month_day is None or hour is None or not year.isdigit() or year < '1900':
+        return None
+
+    month, day = month_day
+    if day == 29 and month == 2 and not _is_leap(int(year)):
+        return None
+    return year, month, day, hour
+
+
+def _shift_days(year, month, day, days):
+    """ :param year: 4-digit year string
+        :return: tuple (year, month, day) shifted by the given number of days or None if the result is out of range """
+    day += days
+    if 1 <= day <= 28 or (month != 2 and 1 <= day <= DAYS_IN_MONTH[month]):
+        return year, month, day
+
+    year = int(year)
+    if 1 <= day <= _days_in_month(year, month):
+        return str(year), month, day
+
+    try:
+        shifted = date.fromordinal(date(year, month, 1).toordinal() + day - 1)
+    except (ValueError, OverflowError):
+        return None
+    if shifted.year < MIN_YEAR:
+        return None
+    return str(shifted.year), shifted.month, shifted.day
+
+
+def _format(time_qualifier, year, month, day, hour):
+    """ :param year: 4-digit year string """
+    if time_qualifier == QUALIFIER_HOURLY:
+        return year + TWO_DIGITS[month] + TWO_DIGITS[day] + TWO_DIGITS[hour]
+    elif time_qualifier == QUALIFIER_DAILY:
+        return year + TWO_DIGITS[month] + TWO_DIGITS[day] + '00'
+    elif time_qualifier == QUALIFIER_MONTHLY:
+        return year + TWO_DIGITS[month] + '0000'
+    elif time_qualifier == QUALIFIER_YEARLY:
+        return year + '000000'
+    return None
+
+
+def cast_to_time_qualifier(time_qualifier, timeperiod):
+    """ integer-based version of the time_helper.cast_to_time_qualifier
+        :return: timeperiod casted to the time qualifier or None if the arguments are not handled by this module """
+    year = timeperiod[0:4]
+    month_day = CAST_MONTH_DAY.get(timeperiod[4:8])
+    if len(timeperiod) == 10 and month_day is not None and year in FAST_YEARS and timeperiod[8:10] in HOURS \
+            and (month_day != '0229' or _is_leap(FAST_YEARS[year])):
+        # fast path for the YYYYMMDDHH timeperiods within the FAST_YEARS
+        if time_qualifier == QUALIFIER_HOURLY:
+            return year + month_day + timeperiod[8:10]
+        elif time_qualifier == QUALIFIER_DAILY:
+            return year + month_day + '00'
+        elif time_qualifier == QUALIFIER_MONTHLY:
+            return year + month_day[0:2] + '0000'
+        elif time_qualifier == QUALIFIER_YEARLY:
+            return year + '000000'
+        return None
+
+    parsed = _parse(timeperiod)
+    if parsed is None:
+        return None
+    return _format(time_qualifier, *parsed)
+
+
+def _shift_days_fast(year, month, day, days):
+    """ :param year: integer year from the FAST_YEARS
+        :return: tuple (year, month, day) shifted by the given number of days into the adjacent month at most,
+        or None if the result is outside of the adjacent months or the FAST_YEARS """
+    day += days
+    if day < 1:
+        month -= 1
+        if month == 0:
+            year, month = year - 1, 12
+        day += _days_in_month(year, month)
+        if day < 1:
+            return None
+    elif day > 28:
+        days_in_month = _days_in_month(year, month)
+        if day > days_in_month:
+            day -= days_in_month
+            month += 1
+            if month == 13:
+                year, month = year + 1, 1
+            if day > _days_in_month(year, month):
+                return None
+
+    if year not in FAST_YEAR_NAMES:
+        return None
+    return year, month, day
+
+
+def _increment_hourly(timeperiod, delta):
+    """ fast path for the timeperiod YYYYMMDDHH """
+    hour = HOURS.get(timeperiod[8:10])
+    year = FAST_YEARS.get(timeperiod[0:4])
+    month_day = SESSION_MONTH_DAY.get(timeperiod[4:8])
+    if hour is None or year is None or month_day is None:
+        return None
+    hour += delta
+    if 0 <= hour < 24 and month_day != (2, 29):
+        return timeperiod[0:8] + TWO_DIGITS[hour]
+
+    month, day = month_day
+    if month_day == (2, 29) and not _is_leap(year):
+        return None
+    days, hour = divmod(hour, 24)
+    shifted = _shift_days_fast(year, month, day, days)
+    if shifted is None:
+        return None
+    year, month, day = shifted
+    return FAST_YEAR_NAMES[year] + TWO_DIGITS[month] + TWO_DIGITS[day] + TWO_DIGITS[hour]
+
+
+def _increment_daily(timeperiod, delta):
+    """ fast path for the timeperiod YYYYMMDD00 """
+    year = FAST_YEARS.get(timeperiod[0:4])
+    month_day = SESSION_MONTH_DAY.get(timeperiod[4:8])
+    if year is None or month_day is None or timeperiod[8:10] != '00':
+        return None
+    month, day = month_day
+    if 1 <= day + delta <= 28 and day != 29:
+        return timeperiod[0:6] + TWO_DIGITS[day + delta] + '00'
+
+    if month_day == (2, 29) and not _is_leap(year):
+        return None
+    shifted = _shift_days_fast(year, month, day, delta)
+    if shifted is None:
+        return None
+    year, month, day = shifted
+    return FAST_YEAR_NAMES[year] + TWO_DIGITS[month] + TWO_DIGITS[day] + '00'
+
+
+def _increment_monthly(timeperiod, delta):
+    """ fast path for the timeperiod YYYYMM0000 """
+    month = MONTHS.get(timeperiod[4:6])
+    year = FAST_YEARS.get(timeperiod[0:4])
+    if month is None or year is None or timeperiod[6:10] != '0000':
+        return None
+    month += delta
+    if 1 <= month <= 12:
+        return timeperiod[0:4] + TWO_DIGITS[month] + '0000'
+
+    # the month/year carry of the time_helper.increment_timeperiod is the division by 12 of the months count
+    year, month = divmod(year * 12 + month - 1, 12)
+    name = FAST_YEAR_NAMES.get(year)
+    if name is None:
+        return None
+    return name + TWO_DIGITS[month + 1] + '0000'
+
+
+def _increment_yearly(timeperiod, delta):
+    """ fast path for the timeperiod YYYY000000 """
+    year = FAST_YEARS.get(timeperiod[0:4])
+    if year is None or timeperiod[4:10] != '000000':
+        return None
+    name = FAST_YEAR_NAMES.get(year + delta)
+    if name is None:
+        return None
+    return name + '000000'
+
+
+# format: {time_qualifier: function(timeperiod, delta)}
+# functions serve the timeperiods in the format of their time qualifier within the FAST_YEARS, unless the increment
+# crosses a boundary that requires the calendar; otherwise they return None and the timeperiod is parsed
+FAST_INCREMENTS = {
+    QUALIFIER_HOURLY: _increment_hourly,
+    QUALIFIER_DAILY: _increment_daily,
+    QUALIFIER_MONTHLY: _increment_monthly,
+    QUALIFIER_YEARLY: _increment_yearly,
+}
+
+
+def increment_timeperiod(time_qualifier, timeperiod, delta=1):
+    """ integer-based version of the time_helper.increment_timeperiod
+        :return: incremented timeperiod or None if the arguments are not handled by this module """
+    fast_increment = FAST_INCREMENTS.get(time_qualifier)
+    if fast_increment is not None and len(timeperiod) == 10 and type(delta) is int:
+        result = fast_increment(timeperiod, delta)
+        if result is not None:
+            return result
+
+    parsed = _parse(timeperiod)
+    if parsed is None or not isinstance(delta, int):
+        return None
+    year, month, day, hour = parsed
+
+    if time_qualifier == QUALIFIER_HOURLY:
+        hour += delta
+        if not 0 <= hour < 24:
+            days, hour = divmod(hour, 24)
+            shifted = _shift_days(year, month, day, days)
+            if shifted is None:
+                return None
+            year, month, day = shifted
+
+    elif time_qualifier == QUALIFIER_DAILY:
+        shifted = _shift_days(year, month, day, delta)
+        if shifted is None:
+            return None
+        year, month, day = shifted
+
+    elif time_qualifier == QUALIFIER_MONTHLY:
+        # mirrors the month/year carry of the time_helper.increment_timeperiod
+        yearly_increment = abs(delta) // 12
+        yearly_increment = yearly_increment if delta >= 0 else -yearly_increment
+        monthly_increment = delta - yearly_increment * 12
+
+        month += monthly_increment
+        if month > 12:
+            month -= 12
+            yearly_increment += 1
+        elif month < 1:
+            month += 12
+            yearly_increment -= 1
+
+        if yearly_increment:
+            new_year = int(year) + yearly_increment
+            if not MIN_YEAR <= new_year <= MAX_YEAR:
+                return None
+            year = str(new_year)
+        if day > 28 and day > _days_in_month(int(year), month):
+            # datetime.replace would reject the day that does not exist in the new month
+            return None
+
+    elif time_qualifier == QUALIFIER_YEARLY:
+        new_year = int(year) + delta
+        if not MIN_YEAR <= new_year <= MAX_YEAR or day > _days_in_month(new_year, month):
+            return None
+        year = str(new_year)
+
+    else:
+        return None
+
+    return _format(time_qualifier, year, month, day, hour)
+
+
+def timeperiod_range(time_qualifier, start_timeperiod, end_timeperiod):
+    """ integer-based version of the time_helper.timeperiod_range
+        the range is produced by blocks of days and months rather than by a chain of increments
+        :return: list of timeperiods or None if the arguments are not handled by this module """
+    start = _parse(start_timeperiod)
+    end = _parse(end_timeperiod)
+    if start is None or end is None:
+        return None
+
+    first = _format(time_qualifier, *start)
+    last = _format(time_qualifier, *end)
+    if first is None or first > last:
+        return [] if first is not None else None
+
+    start_year, start_month, start_day, start_hour = start
+    end_year, end_month, end_day, end_hour = end
+    start_year, end_year = int(start_year), int(end_year)
+
+    if time_qualifier == QUALIFIER_YEARLY:
+        return [str(year) + '000000' for year in range(start_year, end_year + 1)]
+
+    elif time_qualifier == QUALIFIER_MONTHLY:
+        first_month = start_year * 12 + start_month - 1
+        last_month = end_year * 12 + end_month - 1
+        return [str(month // 12) + TWO_DIGITS[month % 12 + 1] + '0000' for month in range(first_month, last_month + 1)]
+
+    days = []
+    for ordinal in range(date(start_year, start_month, start_day).toordinal(),
+                         date(end_year, end_month, end_day).toordinal() + 1):
+        day = date.fromordinal(ordinal)
+        days.append(str(day.year) + TWO_DIGITS[day.month] + TWO_DIGITS[day.day])
+
+    if time_qualifier == QUALIFIER_DAILY:
+        return [day + '00' for day in days]
+
+    hours = TWO_DIGITS[:24]
+    timeperiods = [day + hour for day in days for hour in hours]
+    return timeperiods[start_hour:len(timeperiods) - 23 + end_hour]
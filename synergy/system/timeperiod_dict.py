@@ -6,6 +6,43 @@ import collections
 from synergy.system import time_helper
 from synergy.system.time_qualifier import *
 
+# format: {(time_qualifier, time_grouping, upper_boundary): {stem token: grouped stem token}}
+_STEM_TABLES = dict()
+
+# format: {'YYYYMM': number of days in the month}
+_MONTH_LENGTHS = dict()
+
+
+def _group_stem(stem, time_grouping, upper_boundary):
+    """ :return: grouped stem. see TimeperiodDict._do_stem_grouping """
+    # exclude 00 from lower boundary, unless the grouping == 1
+    lower_boundary = 0 if time_grouping == 1 else 1
+    for i in range(lower_boundary, upper_boundary):
+        candidate = i * time_grouping
+        if stem <= candidate <= upper_boundary:
+            return candidate
+    return upper_boundary
+
+
+def _get_stem_table(time_qualifier, time_grouping, upper_boundary):
+    """ :return: dict {stem token: grouped stem token} for all two-digit stem tokens from 00 to 99.
+        tables are computed once per (time_qualifier, time_grouping, upper_boundary)
+        and are shared by all TimeperiodDict instances """
+    key = (time_qualifier, time_grouping, upper_boundary)
+    if key not in _STEM_TABLES:
+        _STEM_TABLES[key] = dict(('{0:02d}'.format(stem),
+                                  '{0:02d}'.format(_group_stem(stem, time_grouping, upper_boundary)))
+                                 for stem in range(100))
+    return _STEM_TABLES[key]
+
+
+def _get_month_length(year_month):
+    """ :param year_month: timeperiod prefix in format YYYYMM
+        :return: number of days in the month """
+    if year_month not in _MONTH_LENGTHS:
+        _MONTH_LENGTHS[year_month] = calendar.monthrange(int(year_month[:4]), int(year_month[4:]))[1]
+    return _MONTH_LENGTHS[year_month]
+
 
 class TimeperiodDict(collections.MutableMapping):
     """ module represents a _smart_ dictionary, where key is a timeperiod
@@ -23,6 +60,15 @@ class TimeperiodDict(collections.MutableMapping):
         upper_boundary = self._get_stem_upper_boundary()
         assert 1 <= time_grouping <= upper_boundary
 
+        # format: {upper_boundary: stem table}
+        # DAILY upper boundary is month-dependent, hence its tables are built for every month length
+        if time_qualifier == QUALIFIER_DAILY:
+            upper_boundaries = range(28, 32)
+        else:
+            upper_boundaries = [upper_boundary]
+        self.stem_tables = dict((boundary, _get_stem_table(time_qualifier, time_grouping, boundary))
+                                for boundary in upper_boundaries)
+
         self.data = dict()
         self.update(dict(*args, **kwargs))
 
@@ -65,22 +111,32 @@ class TimeperiodDict(collections.MutableMapping):
                 - for 2015010520 and QUALIFIER_HOURLY and time_grouping=8, stem would be 23
         """
 
-        # exclude 00 from lower boundary, unless the grouping == 1
-        lower_boundary = 0 if self.time_grouping == 1 else 1
         upper_boundary = self._get_stem_upper_boundary(timeperiod)
-
-        for i in range(lower_boundary, upper_boundary):
-            candidate = i * self.time_grouping
-            if stem <= candidate <= upper_boundary:
-                return candidate
-        return upper_boundary
+        return _group_stem(stem, self.time_grouping, upper_boundary)
 
     def _translate_timeperiod(self, timeperiod):
-        """ method translates given timeperiod to the grouped timeperiod """
+        """ method translates given timeperiod to the grouped timeperiod
+            by a lookup of the timeperiod's stem in the precomputed stem table """
         if self.time_grouping == 1:
             # no translation is performed for identity grouping
             return timeperiod
 
+        if len(timeperiod) == 10:
+            try:
+                if self.time_qualifier == QUALIFIER_HOURLY:
+                    return timeperiod[:8] + self.stem_tables[23][timeperiod[8:]]
+                elif self.time_qualifier == QUALIFIER_DAILY:
+                    stem_table = self.stem_tables[_get_month_length(timeperiod[:6])]
+                    return timeperiod[:6] + stem_table[timeperiod[6:8]] + timeperiod[8:]
+                else:  # self.time_qualifier == QUALIFIER_MONTHLY:
+                    return timeperiod[:4] + self.stem_tables[12][timeperiod[4:6]] + timeperiod[6:]
+            except (KeyError, ValueError):
+                # malformed timeperiod: let the tokenizing translation report it
+                pass
+        return self._translate_timeperiod_by_tokens(timeperiod)
+
+    def _translate_timeperiod_by_tokens(self, timeperiod):
+        """ method translates given timeperiod to the grouped timeperiod by computing its grouped stem """
         # step 1: tokenize timeperiod into: (year, month, day, hour)
         # for instance: daily 2015031400 -> ('2015', '03', '14', '00')
         year, month, day, hour = time_helper.tokenize_timeperiod(timeperiod)
@@ -0,0 +1,131 @@
+__author__ = 'Bohdan Mushkevych'
+
+import sys
+import time
+import heapq
+import atexit
+import itertools
+import threading
+import traceback
+
+try:
+    from queue import Queue
+except ImportError:
+    from Queue import Queue
+
+from synergy.conf import settings
+from synergy.system.decorator import singleton
+
+
+@singleton
+class TimerService(object):
+    """ Process-wide timer service: a single thread keeps a heap of timer deadlines
+        and hands due timers to a small pool of dispatch threads, which call timer.fire(generation).
+        Cancelled or re-scheduled timers are not removed from the heap: their stale entries are
+        recognized by the outdated generation and dropped once they surface at the top of the heap.
+        TimerService threads are daemonic; while any non-daemonic timer is running,
+        a non-daemonic keep-alive thread holds the process, as a non-daemonic threading.Thread would """
+
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.pool_size = settings.settings['timer_pool_size']
+
+        # heap of tuples (deadline, sequence, timer, generation)
+        # the sequence preserves FIFO order of the equal deadlines and spares comparison of the timers
+        self.heap = []
+        self.sequence = itertools.count()
+        self.heap_thread = None
+        self.is_running = True
+
+        # dispatch threads are started on demand, up to the pool_size
+        self.dispatch_queue = Queue()
+        self.dispatch_threads = []
+        self.number_of_idle = 0
+
+        # number of running non-daemonic timers; has a separate condition, not to steal heap thread notifications
+        self.keep_alive_condition = threading.Condition()
+        self.number_of_non_daemonic = 0
+        self.keep_alive_thread = None
+
+    def _start_thread(self, target, name, daemon=True):
+        thread = threading.Thread(target=target, name=name)
+        thread.daemon = daemon
+        thread.start()
+        return thread
+
+    def _stop(self):
+        """ stops the heap thread at the interpreter exit """
+        with self.condition:
+            self.is_running = False
+            self.condition.notify()
+        if self.heap_thread is not None:
+            self.heap_thread.join(1.0)
+
+    def _run_heap(self):
+        with self.condition:
+            while self.is_running:
+                if not self.heap:
+                    self.condition.wait()
+                    continue
+
+                deadline, _, timer, generation = self.heap[0]
+                timeout = deadline - time.time()
+                if timeout > 0:
+                    self.condition.wait(timeout)
+                    continue
+
+                heapq.heappop(self.heap)
+                if generation != timer.generation:
+                    # stale entry of a cancelled or re-scheduled timer
+                    continue
+
+                if self.dispatch_queue.qsize() >= self.number_of_idle \
+                        and len(self.dispatch_threads) < self.pool_size:
+                    name = 'TimerService-dispatch-{0}'.format(len(self.dispatch_threads))
+                    self.dispatch_threads.append(self._start_thread(self._run_dispatch, name))
+                self.dispatch_queue.put((timer, generation))
+
+    def _run_dispatch(self):
+        while True:
+            with self.condition:
+                self.number_of_idle += 1
+            timer, generation = self.dispatch_queue.get()
+            with self.condition:
+                self.number_of_idle -= 1
+
+            try:
+                timer.fire(generation)
+            except Exception:
+                sys.stderr.write('Exception on firing timer {0}'.format(timer.__class__.__name__))
+                traceback.print_exc(file=sys.stderr)
+
+    def _run_keep_alive(self):
+        with self.keep_alive_condition:
+            while self.number_of_non_daemonic > 0:
+                self.keep_alive_condition.wait()
+            self.keep_alive_thread = None
+
+    def hold_process(self):
+        """ called by a non-daemonic timer on its start: the process is kept alive until the matching release """
+        with self.keep_alive_condition:
+            self.number_of_non_daemonic += 1
+            if self.keep_alive_thread is None:
+                self.keep_alive_thread = self._start_thread(self._run_keep_alive, 'TimerService-keep-alive',
+                                                            daemon=False)
+
+    def release_process(self):
+        """ called by a non-daemonic timer on its cancellation """
+        with self.keep_alive_condition:
+            self.number_of_non_daemonic -= 1
+            self.keep_alive_condition.notify()
+
+    def schedule(self, timer, generation, delay):
+        """ requests timer.fire(generation) call in <delay> seconds
+            :param timer: object with fields <generation> and method <fire(generation)>
+            :param generation: the call is dropped, should the timer.generation differ at the deadline """
+        with self.condition:
+            if self.heap_thread is None:
+                self.heap_thread = self._start_thread(self._run_heap, 'TimerService-heap')
+                atexit.register(self._stop)
+            heapq.heappush(self.heap, (time.time() + delay, next(self.sequence), timer, generation))
+            self.condition.notify()
@@ -13,6 +13,19 @@ from synergy.conf import settings
 from synergy.conf import context
 
 
+# pool of canonical string instances, see intern_string
+_interned_strings = dict()
+
+
+def intern_string(value):
+    """ :return: canonical instance of the given string, so that equal strings held by numerous
+        long-lived objects (such as process names and timeperiods of the tree nodes) share a single copy.
+        unlike built-in intern, supports both str and unicode under Python 2 """
+    if value is None:
+        return None
+    return _interned_strings.setdefault(value, value)
+
+
 def fully_qualified_table_name(table_name):
     # fully qualified table name
     fqtn = settings.settings['aws_redshift_orca_prefix'] + table_name + settings.settings['aws_redshift_orca_suffix']
@@ -2,11 +2,13 @@ __author__ = 'Bohdan Mushkevych'
 
 from datetime import datetime
 
+from synergy.conf import settings
 from synergy.db.model import unit_of_work
 from synergy.db.model.mq_transmission import MqTransmission
 from synergy.db.dao.unit_of_work_dao import UnitOfWorkDao
 from synergy.system.mq_transmitter import MqTransmitter
 from synergy.system.performance_tracker import UowAwareTracker
+from synergy.system.repeat_timer import RepeatTimer
 from synergy.system.uow_log_handler import UowLogHandler
 from synergy.workers.abstract_mq_worker import AbstractMqWorker
 
@@ -43,6 +45,15 @@ class AbstractUowAwareWorker(AbstractMqWorker):
         """ method is called from the *finally* clause and is suppose to clean up after the uow processing """
         pass
 
+    def _heartbeat(self, uow_id):
+        """ method is called every <uow_heartbeat_interval> seconds by the timer thread while the UOW is being
+            processed and signals to the GarbageCollector that the worker is alive.
+            NOTICE: the UOW instance of the worker thread is never touched; the record is updated by its id """
+        try:
+            self.uow_dao.update_heartbeat(uow_id)
+        except Exception:
+            self.logger.error('Error on UOW {0} heartbeat'.format(uow_id), exc_info=True)
+
     def _mq_callback(self, message):
         try:
             mq_request = MqTransmission.from_json(message.body)
@@ -59,10 +70,13 @@ class AbstractUowAwareWorker(AbstractMqWorker):
             return
 
         db_log_handler = UowLogHandler(self.logger, uow.db_id)
+        heartbeat_timer = RepeatTimer(settings.settings['uow_heartbeat_interval'], self._heartbeat, args=[uow.db_id])
         try:
             uow.state = unit_of_work.STATE_IN_PROGRESS
             uow.started_at = datetime.utcnow()
+            uow.heartbeat_at = uow.started_at
             self.uow_dao.update(uow)
+            heartbeat_timer.start()
             self.performance_tracker.start_uow(uow)
 
             if self.perform_db_logging:
@@ -100,6 +114,7 @@ class AbstractUowAwareWorker(AbstractMqWorker):
                 self.uow_dao.update(uow)
 
         finally:
+            heartbeat_timer.cancel()
             self.consumer.acknowledge(message.delivery_tag)
             self.consumer.close()
             self._clean_up()
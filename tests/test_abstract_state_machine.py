@@ -129,6 +129,22 @@ class AbstractSMUnitTest(unittest.TestCase):
         self.sm_real._process_noop_timeperiod.reset_mock()
         self.sm_real._process_state_embryo.reset_mock()
 
+    def test_create_jobs(self):
+        """ method tests that bulk job creation skips job records that already exist in the DB """
+        timeperiods = [TEST_PRESET_TIMEPERIOD,
+                       time_helper.increment_timeperiod(QUALIFIER_HOURLY, TEST_PRESET_TIMEPERIOD),
+                       time_helper.increment_timeperiod(QUALIFIER_HOURLY, TEST_PRESET_TIMEPERIOD, 2)]
+
+        # simulate that the first job record is already present in the DB
+        self.job_dao_mocked.insert_many = mock.MagicMock(side_effect=lambda job_records: job_records[1:])
+        job_records = self.sm_real.create_jobs(PROCESS_SITE_HOURLY, timeperiods)
+
+        self.assertEqual(len(self.job_dao_mocked.insert_many.call_args_list), 1)
+        self.assertEqual([job_record.timeperiod for job_record in job_records], timeperiods[1:])
+        for job_record in job_records:
+            self.assertTrue(job_record.is_embryo)
+            self.assertEqual(job_record.process_name, PROCESS_SITE_HOURLY)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,96 @@
+__author__ = 'Bohdan Mushkevych'
+
+import time
+import unittest
+from threading import Thread, Lock, RLock
+try:
+    import mock
+except ImportError:
+    from unittest import mock
+
+from bson.objectid import ObjectId
+
+from settings import enable_test_mode
+enable_test_mode()
+
+from synergy.conf import settings
+from synergy.db.dao.base_dao import NoLock
+from synergy.db.dao.unit_of_work_dao import UnitOfWorkDao
+from synergy.db.dao.managed_process_dao import ManagedProcessDao
+from synergy.db.model.managed_process_entry import PROCESS_NAME
+from synergy.system.system_logger import get_logger
+from tests.ut_context import PROCESS_UNIT_TEST
+
+NUMBER_OF_THREADS = 4
+
+
+class SlowCollection(object):
+    """ collection stand-in that records the number of concurrent calls """
+
+    def __init__(self):
+        self.lock = Lock()
+        self.active_calls = 0
+        self.max_active_calls = 0
+
+    def find_one(self, query):
+        with self.lock:
+            self.active_calls += 1
+            self.max_active_calls = max(self.max_active_calls, self.active_calls)
+        time.sleep(0.05)
+        with self.lock:
+            self.active_calls -= 1
+        return {'_id': query['_id']}
+
+
+class BaseDaoUnitTest(unittest.TestCase):
+    def setUp(self):
+        self.logger = get_logger(PROCESS_UNIT_TEST)
+        self.collection = SlowCollection()
+
+    def _run_concurrently(self, db_lock_free):
+        with mock.patch.dict(settings.settings, {'db_lock_free': db_lock_free}), \
+                mock.patch('synergy.db.manager.ds_manager.ds_factory') as ds_factory:
+            ds_factory.return_value.connection.return_value = self.collection
+            uow_dao = UnitOfWorkDao(self.logger)
+
+        threads = [Thread(target=uow_dao.get_one, args=(ObjectId(),)) for _ in range(NUMBER_OF_THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return uow_dao
+
+    def test_locking_dao(self):
+        uow_dao = self._run_concurrently(db_lock_free=False)
+        self.assertIsInstance(uow_dao.lock, type(RLock()))
+        self.assertEqual(self.collection.max_active_calls, 1)
+
+    def test_lock_free_dao(self):
+        uow_dao = self._run_concurrently(db_lock_free=True)
+        self.assertIsInstance(uow_dao.lock, NoLock)
+        self.assertGreater(self.collection.max_active_calls, 1)
+
+    def test_iter_query(self):
+        documents = [{'_id': ObjectId(), PROCESS_NAME: 'process_{0}'.format(i)} for i in range(3)]
+        collection = mock.Mock()
+        collection.find.return_value.batch_size.side_effect = \
+            lambda batch_size: iter(documents[:batch_size])
+        with mock.patch('synergy.db.manager.ds_manager.ds_factory') as ds_factory:
+            ds_factory.return_value.connection.return_value = collection
+            managed_process_dao = ManagedProcessDao(self.logger)
+
+        # records are decoded lazily, and the caller could stop early
+        records = managed_process_dao.iter_query({}, batch_size=2)
+        self.assertEqual(next(records).process_name, 'process_0')
+        self.assertEqual([record.process_name for record in records], ['process_1'])
+
+        # LookupError is raised only once the stream turns out to be empty
+        self.assertEqual(len(managed_process_dao.run_query({})), 3)
+        collection.find.return_value.batch_size.side_effect = lambda batch_size: iter([])
+        records = managed_process_dao.iter_query({})
+        self.assertRaises(LookupError, next, records)
+        self.assertFalse(collection.find.return_value.count.called)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -82,6 +82,36 @@ class TestEventClock(unittest.TestCase):
             processed_output = handler.next_run_in(utc_now=fixed_utc_now)
             self.assertEqual(processed_output, expected_output)
 
+    def test_schedule(self):
+        # 2014-05-01 is Thu. In Python it is weekday=3
+        fixed_utc_now = datetime(year=2014, month=5, day=1, hour=13, minute=0, second=0)
+        handler = EventClock(['*-17:00', '4-15:45', '*-09:00'], None)
+        handler._compute_schedule(fixed_utc_now)
+        self.assertEqual(handler.schedule[0][0], datetime(year=2014, month=5, day=1, hour=17, minute=0))
+
+        # nothing is due before the earliest occurrence
+        self.assertFalse(handler._advance_schedule(datetime(year=2014, month=5, day=1, hour=16, minute=59, second=59)))
+
+        # fired occurrence is replaced by the following one
+        self.assertTrue(handler._advance_schedule(datetime(year=2014, month=5, day=1, hour=17, minute=0, second=1)))
+        self.assertEqual(sorted([entry[0] for entry in handler.schedule]),
+                         [datetime(year=2014, month=5, day=2, hour=9, minute=0),
+                          datetime(year=2014, month=5, day=2, hour=15, minute=45),
+                          datetime(year=2014, month=5, day=2, hour=17, minute=0)])
+
+    def test_start_cancel(self):
+        handler = EventClock(['*-17:00'], None)
+        self.assertFalse(handler.is_alive())
+        self.assertIsNone(handler.next_run_in())
+
+        handler.start()
+        self.assertTrue(handler.is_alive())
+        self.assertLessEqual(handler.next_run_in(), timedelta(days=1))
+        self.assertEqual(len(handler.schedule), 1)
+
+        handler.cancel()
+        self.assertFalse(handler.is_alive())
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -24,7 +24,7 @@ from synergy.scheduler.thread_handler import ManagedThreadHandler
 from synergy.scheduler.garbage_collector import GarbageCollector
 from synergy.system.mq_transmitter import MqTransmitter
 from synergy.system.system_logger import get_logger
-from synergy.system.priority_queue import PriorityEntry
+from synergy.system.priority_queue import PriorityEntry, compute_release_time
 from tests.ut_context import *
 
 
@@ -111,7 +111,8 @@ class GarbageCollectorUnitTest(unittest.TestCase):
 
     def test_invalid_and_fresh_uow(self):
         uow = get_invalid_and_fresh_uow()
-        self.worker.uow_dao.get_reprocessing_candidates = mock.MagicMock(return_value=[uow])
+        self.worker.uow_dao.iter_reprocessing_candidates = mock.MagicMock(return_value=[uow])
+        self.worker.uow_dao.iter_updated_since = mock.MagicMock(return_value=[uow])
         self.assertEqual(len(self.worker.reprocess_uows[uow.process_name]), 0)
 
         # use-case 1 - UOW is invalid, and added to the reprocessing_queue
@@ -131,7 +132,7 @@ class GarbageCollectorUnitTest(unittest.TestCase):
         uow = get_invalid_and_stale_uow()
         self.worker.uow_dao.update = assume_uow_is_cancelled
 
-        self.worker.uow_dao.get_reprocessing_candidates = mock.MagicMock(return_value=[uow])
+        self.worker.uow_dao.iter_reprocessing_candidates = mock.MagicMock(return_value=[uow])
         self.assertEqual(len(self.worker.reprocess_uows[uow.process_name]), 0)
 
         # use-case - transferring job to STATE_CANCELED bypassing the reprocessing_queue
@@ -144,7 +145,7 @@ class GarbageCollectorUnitTest(unittest.TestCase):
         uow = get_valid_and_fresh_uow()
         self.worker.uow_dao.update = assume_uow_is_requested
 
-        self.worker.uow_dao.get_reprocessing_candidates = mock.MagicMock(return_value=[uow])
+        self.worker.uow_dao.iter_reprocessing_candidates = mock.MagicMock(return_value=[uow])
         self.assertEqual(len(self.worker.reprocess_uows[uow.process_name]), 0)
 
         # use-case - uow is healthy and should be filtered out by the DAO
@@ -158,7 +159,7 @@ class GarbageCollectorUnitTest(unittest.TestCase):
         uow = get_valid_and_stale_uow()
         self.worker.uow_dao.update = assume_uow_is_cancelled
 
-        self.worker.uow_dao.get_reprocessing_candidates = mock.MagicMock(return_value=[uow])
+        self.worker.uow_dao.iter_reprocessing_candidates = mock.MagicMock(return_value=[uow])
         self.assertEqual(len(self.worker.reprocess_uows[uow.process_name]), 0)
 
         # use-case - transferring job to STATE_CANCELED bypassing the reprocessing_queue
@@ -175,7 +176,7 @@ class GarbageCollectorUnitTest(unittest.TestCase):
         self.assertEqual(len(self.worker.reprocess_uows[uow.process_name]), 1)
         uow.state = unit_of_work.STATE_CANCELED
 
-        self.worker.uow_dao.get_one = mock.MagicMock(return_value=uow)
+        self.worker.uow_dao.get_many = mock.MagicMock(return_value=[uow])
 
         self.worker.validate()
         self.assertEqual(len(self.worker.reprocess_uows[uow.process_name]), 0)
@@ -184,13 +185,118 @@ class GarbageCollectorUnitTest(unittest.TestCase):
         uow = get_valid_and_stale_uow()
         uow.state = unit_of_work.STATE_CANCELED
 
-        self.worker.uow_dao.get_one = mock.MagicMock(return_value=uow)
-        self.worker.uow_dao.update = mock.MagicMock()
+        self.worker.uow_dao.get_many = mock.MagicMock(return_value=[uow])
+        self.worker.uow_dao.update_many = mock.MagicMock()
         self.worker._resubmit_uow(uow)
 
         self.assertEqual(len(self.worker.reprocess_uows[uow.process_name]), 0)
         self.assertTrue(self.worker.mq_transmitter.publish_uow_status.call_args_list == [])        # called 0 times
-        self.assertTrue(self.worker.uow_dao.update.call_args_list == [])    # called 0 times
+        self.assertTrue(self.worker.mq_transmitter.publish_managed_uows.call_args_list == [])      # called 0 times
+        self.assertTrue(self.worker.uow_dao.update_many.call_args_list == [])   # called 0 times
+
+    def test_batched_flush(self):
+        uows = [create_unit_of_work(PROCESS_SITE_HOURLY, i, i + 1, state=unit_of_work.STATE_INVALID, uow_id=i)
+                for i in range(5)]
+        uows[1].state = unit_of_work.STATE_CANCELED
+        for uow in uows:
+            self.worker.reprocess_uows[uow.process_name].put(PriorityEntry(uow))
+
+        self.worker.uow_dao.get_many = mock.MagicMock(return_value=uows)
+        self.worker.uow_dao.update_many = mock.MagicMock()
+
+        with mock.patch.dict(settings.settings, {'db_bulk_size': 3}):
+            self.worker.flush(ignore_priority=True)
+
+        # one DB read, one DB write and one MQ publishing per batch of db_bulk_size
+        self.assertEqual(self.worker.uow_dao.get_many.call_count, 2)
+        self.assertEqual(self.worker.uow_dao.update_many.call_count, 2)
+        self.assertEqual(self.worker.mq_transmitter.publish_managed_uows.call_count, 2)
+
+        resubmitted = [uow for args in self.worker.mq_transmitter.publish_managed_uows.call_args_list
+                       for uow in args[0][0]]
+        self.assertEqual(sorted(uow.db_id for uow in resubmitted), ['0', '2', '3', '4'])
+        for uow in resubmitted:
+            assume_uow_is_requested(uow)
+            self.assertEqual(uow.number_of_retries, 1)
+        self.assertEqual(len(self.worker.reprocess_uows[PROCESS_SITE_HOURLY]), 0)
+
+    def test_failed_flush(self):
+        uow = get_invalid_and_stale_uow()
+        self.worker.reprocess_uows[uow.process_name].put(PriorityEntry(uow))
+        self.worker.uow_dao.get_many = mock.MagicMock(return_value=[uow])
+        self.worker.uow_dao.update_many = mock.MagicMock()
+        self.worker.mq_transmitter.publish_managed_uows.side_effect = IOError('broker is unreachable')
+
+        # entries of the failed batch are returned to the reprocessing queue
+        self.assertRaises(IOError, self.worker.flush, True)
+        self.assertEqual(len(self.worker.reprocess_uows[uow.process_name]), 1)
+
+    def test_incremental_scan(self):
+        uow = get_valid_and_fresh_uow()
+        self.worker.uow_dao.iter_reprocessing_candidates = mock.MagicMock(return_value=[uow])
+        self.worker.uow_dao.iter_updated_since = mock.MagicMock(return_value=[])
+
+        # first scan reads all candidates; the following ones - only the updated UOWs
+        self.worker.scan_uow_candidates()
+        self.worker.scan_uow_candidates()
+        self.assertEqual(self.worker.uow_dao.iter_reprocessing_candidates.call_count, 1)
+        self.assertEqual(self.worker.uow_dao.iter_updated_since.call_count, 1)
+        self.assertEqual(list(self.worker.candidates.values()), [uow])
+
+        # candidate that was not updated since the previous scan is still enlisted once its time comes
+        uow.submitted_at = datetime.utcnow() - timedelta(hours=2)
+        self.worker.scan_uow_candidates()
+        self.assertEqual(len(self.worker.reprocess_uows[uow.process_name]), 1)
+
+        # finished UOW is no longer a candidate
+        finished_uow = get_valid_and_fresh_uow()
+        finished_uow.state = unit_of_work.STATE_PROCESSED
+        self.worker.uow_dao.iter_updated_since = mock.MagicMock(return_value=[finished_uow])
+        self.worker.scan_uow_candidates()
+        self.assertEqual(self.worker.candidates, dict())
+
+        # full scan reconciles the candidates every gc_full_scan_interval
+        self.worker.full_scan_at -= timedelta(seconds=settings.settings['gc_full_scan_interval'] + 1)
+        self.worker.scan_uow_candidates()
+        self.assertEqual(self.worker.uow_dao.iter_reprocessing_candidates.call_count, 2)
+        self.assertEqual(list(self.worker.candidates.values()), [uow])
+
+    def test_heartbeat(self):
+        uow = create_unit_of_work(PROCESS_SITE_HOURLY, 0, 1,
+                                  state=unit_of_work.STATE_IN_PROGRESS,
+                                  created_at=datetime.utcnow() - timedelta(hours=2),
+                                  submitted_at=datetime.utcnow() - timedelta(hours=2),
+                                  uow_id=0)
+        uow.heartbeat_at = datetime.utcnow()
+        self.worker.uow_dao.iter_reprocessing_candidates = mock.MagicMock(return_value=[uow])
+        self.worker.uow_dao.get_many = mock.MagicMock(return_value=[uow])
+        self.worker.uow_dao.update_many = mock.MagicMock()
+
+        # long-running UOW with a live heartbeat is not resubmitted
+        self.worker.scan_uow_candidates()
+        self.assertEqual(len(self.worker.reprocess_uows[uow.process_name]), 0)
+
+        # UOW with a lapsed heartbeat is enlisted with no release lag
+        uow.heartbeat_at -= timedelta(seconds=settings.settings['gc_heartbeat_timeout'] + 1)
+        self.worker.scan_uow_candidates()
+        q = self.worker.reprocess_uows[uow.process_name]
+        self.assertEqual(len(q), 1)
+        self.assertLessEqual(q.peek().release_time, compute_release_time(lag_in_minutes=0))
+
+        self.worker.flush(ignore_priority=True)
+        self.worker.mq_transmitter.publish_managed_uows.assert_called_once_with([uow])
+        assume_uow_is_requested(uow)
+
+    def test_resumed_heartbeat(self):
+        uow = get_valid_and_fresh_uow()
+        uow.heartbeat_at = datetime.utcnow()
+        self.worker.uow_dao.get_many = mock.MagicMock(return_value=[uow])
+        self.worker.uow_dao.update_many = mock.MagicMock()
+
+        # heartbeat has resumed after the UOW was enlisted: re-submission is suppressed
+        self.worker._resubmit_uow(uow)
+        self.assertTrue(self.worker.uow_dao.update_many.call_args_list == [])   # called 0 times
+        self.assertTrue(self.worker.mq_transmitter.publish_managed_uows.call_args_list == [])      # called 0 times
 
     def test_select_reprocessing_candidates(self):
         logger = get_logger(PROCESS_UNIT_TEST)
@@ -0,0 +1,81 @@
+__author__ = 'Bohdan Mushkevych'
+
+import unittest
+try:
+    import mock
+except ImportError:
+    from unittest import mock
+
+from pymongo import ASCENDING
+from pymongo.errors import OperationFailure
+
+from settings import enable_test_mode
+enable_test_mode()
+
+from synergy.db.manager import index_registry
+from synergy.db.model import unit_of_work
+from synergy.db.dao.unit_of_work_dao import UnitOfWorkDao
+from synergy.scheduler.scheduler_constants import COLLECTION_UNIT_OF_WORK
+from synergy.system.system_logger import get_logger
+from tests.ut_context import PROCESS_UNIT_TEST
+
+COLLECTION_SCAN_PLAN = {'queryPlanner': {'winningPlan': {'stage': 'COLLSCAN'}}}
+INDEX_SCAN_PLAN = {'queryPlanner': {'winningPlan': {'stage': 'FETCH',
+                                                    'inputStage': {'stage': 'IXSCAN', 'indexName': 'state_1'}}}}
+LEGACY_COLLECTION_SCAN_PLAN = {'cursor': 'BasicCursor'}
+LEGACY_INDEX_SCAN_PLAN = {'cursor': 'BtreeCursor state_1'}
+
+
+class TestIndexRegistry(unittest.TestCase):
+    def setUp(self):
+        self.logger = get_logger(PROCESS_UNIT_TEST)
+        self.ds = mock.Mock()
+        self.connection = self.ds.connection.return_value
+
+    def test_declarations(self):
+        # UnitOfWorkDao module declares indexes for the hot queries of the unit_of_work collection
+        self.assertIsNotNone(UnitOfWorkDao)
+        keys = [entry.keys for entry in index_registry.get_indexes([COLLECTION_UNIT_OF_WORK])]
+        self.assertIn([(unit_of_work.UNIT_OF_WORK_TYPE, ASCENDING),
+                       (unit_of_work.STATE, ASCENDING),
+                       (unit_of_work.TIMEPERIOD, ASCENDING)], keys)
+
+        shape_names = [shape.shape_name for shape in index_registry.get_query_shapes([COLLECTION_UNIT_OF_WORK])]
+        self.assertIn('get_reprocessing_candidates', shape_names)
+        self.assertIn('get_freerun_since', shape_names)
+
+        # repeated declaration does not produce a duplicate
+        number_of_indexes = len(index_registry.get_indexes())
+        index_registry.register_index(COLLECTION_UNIT_OF_WORK, [(unit_of_work.UPDATED_AT, ASCENDING)])
+        self.assertEqual(len(index_registry.get_indexes()), number_of_indexes)
+
+    def test_ensure_indexes(self):
+        entries = index_registry.get_indexes([COLLECTION_UNIT_OF_WORK])
+        self.connection.create_index.side_effect = [OperationFailure('IndexOptionsConflict')] + \
+                                                   ['index_name'] * (len(entries) - 1)
+
+        number_of_failures = index_registry.ensure_indexes(self.ds, self.logger, [COLLECTION_UNIT_OF_WORK])
+        self.assertEqual(number_of_failures, 1)
+        self.assertEqual(self.connection.create_index.call_count, len(entries))
+        self.connection.create_index.assert_any_call(entries[0].keys, unique=True)
+
+    def test_explain(self):
+        self.assertTrue(index_registry.is_collection_scan(COLLECTION_SCAN_PLAN))
+        self.assertTrue(index_registry.is_collection_scan(LEGACY_COLLECTION_SCAN_PLAN))
+        self.assertFalse(index_registry.is_collection_scan(INDEX_SCAN_PLAN))
+        self.assertFalse(index_registry.is_collection_scan(LEGACY_INDEX_SCAN_PLAN))
+
+        shapes = index_registry.get_query_shapes([COLLECTION_UNIT_OF_WORK])
+        cursor = self.connection.find.return_value
+        cursor.sort.return_value = cursor
+        cursor.explain.side_effect = [COLLECTION_SCAN_PLAN] + [INDEX_SCAN_PLAN] * (len(shapes) - 1)
+
+        report = index_registry.explain_query_shapes(self.ds, self.logger, [COLLECTION_UNIT_OF_WORK])
+        self.assertEqual(len(report), len(shapes))
+        self.assertEqual([is_collection_scan for _, _, is_collection_scan in report],
+                         [True] + [False] * (len(shapes) - 1))
+        self.assertEqual(report[1][1], ['FETCH', 'IXSCAN'])
+
+
+if __name__ == '__main__':
+    unittest.main()
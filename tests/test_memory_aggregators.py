@@ -0,0 +1,53 @@
+__author__ = 'Bohdan Mushkevych'
+
+import unittest
+try:
+    import mock
+except ImportError:
+    from unittest import mock
+
+from settings import enable_test_mode
+enable_test_mode()
+
+from synergy.conf import settings
+from tests import test_site_hourly_aggregator, test_site_daily_aggregator, \
+    test_site_monthly_aggregator, test_site_yearly_aggregator
+
+
+class MemoryDataSourceMixin(object):
+    """ runs the aggregator test on the memory Data Source, hence no MongoDB is required """
+
+    def setUp(self):
+        self.ds_type_patcher = mock.patch.dict(settings.settings, {'ds_type': 'memory'})
+        self.ds_type_patcher.start()
+        super(MemoryDataSourceMixin, self).setUp()
+
+    def tearDown(self):
+        try:
+            super(MemoryDataSourceMixin, self).tearDown()
+        finally:
+            self.ds_type_patcher.stop()
+
+
+class MemorySiteHourlyAggregatorUnitTest(MemoryDataSourceMixin,
+                                         test_site_hourly_aggregator.SiteHourlyAggregatorUnitTest):
+    pass
+
+
+class MemorySiteDailyAggregatorUnitTest(MemoryDataSourceMixin,
+                                        test_site_daily_aggregator.SiteDailyAggregatorUnitTest):
+    pass
+
+
+class MemorySiteMonthlyAggregatorUnitTest(MemoryDataSourceMixin,
+                                          test_site_monthly_aggregator.SiteMonthlyAggregatorUnitTest):
+    pass
+
+
+class MemorySiteYearlyAggregatorUnitTest(MemoryDataSourceMixin,
+                                         test_site_yearly_aggregator.SiteYearlyAggregatorUnitTest):
+    pass
+
+
+if __name__ == '__main__':
+    unittest.main()
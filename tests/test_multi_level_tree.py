@@ -10,10 +10,12 @@ from constants import PROCESS_SITE_HOURLY, PROCESS_SITE_DAILY, PROCESS_SITE_YEAR
 from synergy.system import time_helper
 from synergy.system.utils import increment_family_property
 from synergy.system.time_qualifier import QUALIFIER_HOURLY
-from synergy.scheduler.tree_node import AbstractTreeNode
+from synergy.db.model import job
+from synergy.scheduler.tree_node import AbstractTreeNode, TreeNode
 from synergy.scheduler.tree import MultiLevelTree
 from synergy.scheduler.timetable import Timetable
 from synergy.conf import settings
+from tests.state_machine_testing_utils import get_job_record
 
 
 class TestTwoLevelTree(unittest.TestCase):
@@ -132,6 +134,166 @@ class TestTwoLevelTree(unittest.TestCase):
             tree.build_tree()
             self._perform_assertions(tree, 2 * delta)
 
+    def test_get_next_node(self):
+        delta = 50
+        tree = self.trees[1]
+        assert isinstance(tree, MultiLevelTree)
+        settings.settings['synergy_start_timeperiod'] = \
+            time_helper.increment_timeperiod(QUALIFIER_HOURLY, self.actual_timeperiod, -delta)
+        tree.build_tree()
+
+        hourly_nodes = []
+        for daily_timeperiod in tree.root.children.sorted_keys:
+            daily_node = tree.root.children[daily_timeperiod]
+            daily_node.job_record = get_job_record(job.STATE_EMBRYO, daily_timeperiod, PROCESS_SITE_DAILY)
+            for hourly_timeperiod in daily_node.children.sorted_keys:
+                hourly_nodes.append(daily_node.children[hourly_timeperiod])
+
+        active_index = 30
+        for index, node in enumerate(hourly_nodes):
+            state = job.STATE_EMBRYO if index == active_index else job.STATE_PROCESSED
+            node.job_record = get_job_record(state, node.timeperiod, PROCESS_SITE_HOURLY)
+
+        # first active node is located, and the cursor is moved past the processed nodes
+        next_node = tree.get_next_node(PROCESS_SITE_HOURLY)
+        self.assertEqual(next_node, hourly_nodes[active_index])
+        self.assertEqual(next_node.parent.children.cursor,
+                         next_node.parent.children.sorted_keys.index(next_node.timeperiod))
+        self.assertEqual(tree.get_next_node(PROCESS_SITE_HOURLY), hourly_nodes[active_index])
+
+        # reprocessing of an older node rewinds the cursor
+        reprocess_index = 5
+        reprocessed_node = hourly_nodes[reprocess_index]
+        reprocessed_node.job_record = get_job_record(job.STATE_IN_PROGRESS, reprocessed_node.timeperiod,
+                                                     PROCESS_SITE_HOURLY)
+        self.assertEqual(tree.get_next_node(PROCESS_SITE_HOURLY), reprocessed_node)
+
+        # finished node is passed by the cursor on the next traversal
+        reprocessed_node.job_record.state = job.STATE_PROCESSED
+        self.assertEqual(tree.get_next_node(PROCESS_SITE_HOURLY), hourly_nodes[active_index])
+
+    def test_children_counters(self):
+        delta = 30
+        tree = self.trees[1]
+        assert isinstance(tree, MultiLevelTree)
+        settings.settings['synergy_start_timeperiod'] = \
+            time_helper.increment_timeperiod(QUALIFIER_HOURLY, self.actual_timeperiod, -delta)
+        tree.build_tree()
+
+        daily_timeperiod = tree.root.children.sorted_keys[0]
+        daily_node = tree.root.children[daily_timeperiod]
+        daily_node.job_record = get_job_record(job.STATE_EMBRYO, daily_timeperiod, PROCESS_SITE_DAILY)
+        children = daily_node.children
+        for hourly_timeperiod, node in children.items():
+            node.job_record = get_job_record(job.STATE_SKIPPED, hourly_timeperiod, PROCESS_SITE_HOURLY)
+
+        self.assertEqual(children.number_of_skipped, len(children))
+        self.assertEqual(children.number_of_finished, len(children))
+        self.assertEqual(children.number_of_active, 0)
+        self.assertTrue(tree.should_skip_tree_node(daily_node))
+
+        # in-place state change is accounted once the tree is notified
+        hourly_node = children[children.sorted_keys[0]]
+        hourly_node.job_record.state = job.STATE_IN_PROGRESS
+        tree.update_node(hourly_node.job_record)
+        self.assertEqual(children.number_of_active, 1)
+        self.assertEqual(children.number_of_skipped, len(children) - 1)
+        self.assertFalse(tree.should_skip_tree_node(daily_node))
+
+        # failed job records are considered spoiled
+        hourly_node.job_record.number_of_failures = 4
+        tree.update_node(hourly_node.job_record)
+        self.assertEqual(children.number_of_failed, 1)
+        self.assertTrue(tree.should_skip_tree_node(daily_node))
+
+        # in-place state change without the notification is caught once a counter claims all children
+        stale_node = children[children.sorted_keys[1]]
+        children.cursor = len(children)
+        stale_node.job_record.state = job.STATE_IN_PROGRESS
+        self.assertFalse(tree.should_skip_tree_node(daily_node))
+        self.assertEqual(children.number_of_active, 2)
+        self.assertEqual(children.cursor, 1)
+
+    def test_bulk_build_tree(self):
+        def snapshot(tree):
+            """ :return: tuple (dirty timeperiods, {node timeperiod: (children keys, cursor, number_of_active)}) """
+            nodes = dict()
+            pending = [tree.root]
+            while pending:
+                node = pending.pop()
+                if node.children:
+                    nodes[node.timeperiod] = (list(node.children.sorted_keys), node.children.cursor,
+                                              node.children.number_of_active)
+                    pending.extend(node.children.values())
+            return sorted(node.timeperiod for node in tree.dirty_nodes), nodes
+
+        delta = 24 * 40
+        start_timeperiod = time_helper.increment_timeperiod(QUALIFIER_HOURLY, self.actual_timeperiod, -delta)
+        settings.settings['synergy_start_timeperiod'] = start_timeperiod
+
+        for tree in self.trees:
+            tree.build_tree()
+
+            # replica of the node-by-node build
+            expected_tree = MultiLevelTree(process_names=list(tree.process_hierarchy),
+                                           timetable=self.time_table_mocked)
+            bottom_process = tree.process_hierarchy.bottom_process
+            timeperiod = time_helper.cast_to_time_qualifier(bottom_process.time_qualifier, start_timeperiod)
+            while time_helper.actual_timeperiod(bottom_process.time_qualifier) >= timeperiod:
+                expected_tree.get_node(bottom_process.process_name, timeperiod)
+                timeperiod = time_helper.increment_timeperiod(bottom_process.time_qualifier, timeperiod)
+
+            self.assertEqual(snapshot(tree), snapshot(expected_tree))
+
+    def test_incremental_validation(self):
+        def assign_embryo(node):
+            node.job_record = get_job_record(job.STATE_EMBRYO, node.timeperiod, node.process_name)
+
+        delta = 30
+        tree = self.trees[1]
+        assert isinstance(tree, MultiLevelTree)
+        self.time_table_mocked.assign_job_record = mock.Mock(side_effect=assign_embryo)
+        settings.settings['synergy_start_timeperiod'] = \
+            time_helper.increment_timeperiod(QUALIFIER_HOURLY, self.actual_timeperiod, -delta)
+        tree.build_tree()
+
+        # all freshly built nodes are validated and receive job records
+        tree.validate()
+        tree.validate()
+        self.assertEqual(len(tree.dirty_nodes), 0)
+        for daily_node in tree.root.children.values():
+            self.assertIsNotNone(daily_node.job_record)
+            for hourly_node in daily_node.children.values():
+                self.assertIsNotNone(hourly_node.job_record)
+
+        # only the changed node and its ancestors are re-validated
+        daily_node = tree.root.children[tree.root.children.sorted_keys[0]]
+        hourly_node = daily_node.children[daily_node.children.sorted_keys[0]]
+        hourly_node.job_record.state = job.STATE_PROCESSED
+        tree.update_node(hourly_node.job_record)
+        with mock.patch.object(TreeNode, 'validate', autospec=True) as validate_mock:
+            tree.validate()
+            validated_nodes = [call_args[0][0] for call_args in validate_mock.call_args_list]
+            self.assertEqual(validated_nodes, [hourly_node, daily_node])
+
+        # full validation visits every node
+        with mock.patch.object(TreeNode, 'validate', autospec=True) as validate_mock:
+            tree.validate(full=True)
+            validated_nodes = [call_args[0][0] for call_args in validate_mock.call_args_list]
+            self.assertEqual(validated_nodes, list(tree.root.children.values()))
+
+    def test_dependants(self):
+        tree_a, tree_b, tree_c = self.trees[0], self.trees[1], self.trees[2]
+        tree_b.register_dependent_on(tree_a)
+        tree_c.register_dependent_on(tree_a)
+        self.assertEqual(tree_a.dependants, [tree_b, tree_c])
+        self.assertEqual(tree_b.dependants, [])
+
+        tree_b.unregister_dependent_on(tree_a)
+        tree_b.unregister_dependent_on(tree_a)
+        self.assertEqual(tree_a.dependants, [tree_c])
+        self.assertEqual(tree_b.dependent_on, [])
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -89,6 +89,36 @@ class PriorityQueueUnitTest(unittest.TestCase):
         self.assertEqual(pe_2, self.priority_queue.peek())
         self.assertEqual(pe_2, self.priority_queue.peek())
 
+    def test_remove(self):
+        entries = list()
+        for i in range(100):
+            uow = create_test_uow()
+            uow.start_id = str(i)
+            entries.append(PriorityEntry(uow, lag_in_minutes=i % 7))
+            self.priority_queue.put(entries[-1])
+
+        # removed entries are no longer reported, nor returned by peek, pop or iteration
+        removed = entries[::2]
+        for entry in removed:
+            self.priority_queue.remove(entry)
+            self.assertNotIn(entry, self.priority_queue)
+        self.assertEqual(len(self.priority_queue), 50)
+        self.assertLessEqual(len(self.priority_queue.heap), 2 * 50 + 16)
+
+        live = sorted(entries[1::2])
+        self.assertEqual(sorted(self.priority_queue), live)
+        self.assertEqual(self.priority_queue.queue[0], live[0])
+        self.assertEqual(self.priority_queue.peek(), live[0])
+        self.assertEqual([self.priority_queue.pop() for _ in range(50)], live)
+        self.assertEqual(len(self.priority_queue), 0)
+        self.assertEqual(list(self.priority_queue), [])
+
+        # re-queued entry replaces the former one of the same unit_of_work
+        self.priority_queue.put(removed[0])
+        self.priority_queue.put(PriorityEntry(removed[0].entry, lag_in_minutes=10))
+        self.assertEqual(len(self.priority_queue), 1)
+        self.assertGreater(self.priority_queue.pop().release_time, removed[0].release_time)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -1,9 +1,14 @@
 __author__ = 'Bohdan Mushkevych'
 
+import os
+import sys
 import time
 import unittest
+import threading
+import subprocess
 from datetime import datetime
 
+from synergy.conf import settings
 from synergy.system import repeat_timer
 
 
@@ -68,6 +73,62 @@ class TestRepeatTimer(unittest.TestCase):
         self.obj.cancel()
         assert True
 
+    def test_shared_timer_service(self):
+        # all timers are served by the same TimerService threads
+        self.obj = repeat_timer.RepeatTimer(TestRepeatTimer.INTERVAL, self.method_no)
+        self.obj.start()
+        self.obj.cancel()
+        number_of_threads = threading.active_count()
+
+        fired = []
+        timers = [repeat_timer.RepeatTimer(1, fired.append, args=[i]) for i in range(50)]
+        for timer in timers:
+            self.addCleanup(timer.cancel)
+            timer.start()
+        # non-daemonic timers share a single keep-alive thread
+        self.assertLessEqual(threading.active_count(), number_of_threads + 1)
+
+        time.sleep(1.5)
+        for timer in timers:
+            timer.cancel()
+        self.assertLessEqual(threading.active_count(), number_of_threads + 1 + settings.settings['timer_pool_size'])
+        self.assertEqual(sorted(fired), list(range(50)))
+        self.assertTrue(all(not timer.is_alive() for timer in timers))
+
+    def test_change_interval(self):
+        self.obj = repeat_timer.RepeatTimer(TestRepeatTimer.INTERVAL, self.method_no)
+        self.assertIsNone(self.obj.next_run_in())
+        self.obj.start()
+        self.obj.change_interval(2 * TestRepeatTimer.INTERVAL)
+        self.assertLessEqual(self.obj.next_run_in().total_seconds(), TestRepeatTimer.INTERVAL)
+
+        # new interval is applied to the next countdown
+        self.obj.cancel()
+        self.obj.start()
+        self.assertGreater(self.obj.next_run_in().total_seconds(), TestRepeatTimer.INTERVAL)
+        self.obj.cancel()
+        self.assertIsNone(self.obj.next_run_in())
+
+    def _run_main_thread_script(self, daemonic):
+        """ :return: output of a process whose main thread starts a RepeatTimer and returns """
+        script = 'import sys\n' \
+                 'from synergy.system.repeat_timer import RepeatTimer\n' \
+                 'def call_back():\n' \
+                 '    sys.stdout.write("fired")\n' \
+                 '    timer.cancel()\n' \
+                 'timer = RepeatTimer(0.5, call_back, daemonic={0})\n' \
+                 'timer.start()\n'.format(daemonic)
+        root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        env = dict(os.environ, PYTHONPATH=root_dir)
+        output = subprocess.check_output([sys.executable, '-c', script], cwd=root_dir, env=env)
+        return output.decode('utf-8')
+
+    def test_non_daemonic_keeps_process_alive(self):
+        # RepeatTimer started by the main thread is non-daemonic and keeps the process alive until cancelled
+        self.assertEqual(self._run_main_thread_script(None), 'fired')
+        self.assertEqual(self._run_main_thread_script(False), 'fired')
+        self.assertEqual(self._run_main_thread_script(True), '')
+
 
 if __name__ == '__main__':
     unittest.main()
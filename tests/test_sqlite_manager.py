@@ -0,0 +1,131 @@
+__author__ = 'Bohdan Mushkevych'
+
+import os
+import shutil
+import tempfile
+import unittest
+try:
+    import mock
+except ImportError:
+    from unittest import mock
+
+from settings import enable_test_mode
+enable_test_mode()
+
+from synergy.conf import settings
+from synergy.db.error import DuplicateKeyError
+from synergy.db.manager import ds_manager, index_registry
+from synergy.db.model import job, unit_of_work
+from synergy.db.model.job import Job
+from synergy.db.model.unit_of_work import UnitOfWork
+from synergy.db.dao.job_dao import JobDao
+from synergy.db.dao.uow_log_dao import UowLogDao
+from synergy.db.dao.unit_of_work_dao import UnitOfWorkDao
+from synergy.scheduler.scheduler_constants import COLLECTION_UNIT_OF_WORK, COLLECTION_JOB_HOURLY
+from synergy.system.system_logger import get_logger
+from tests.ut_context import PROCESS_UNIT_TEST
+from constants import PROCESS_SITE_HOURLY
+
+
+def _create_uow(timeperiod, state=unit_of_work.STATE_REQUESTED):
+    uow = UnitOfWork()
+    uow.process_name = PROCESS_SITE_HOURLY
+    uow.timeperiod = timeperiod
+    uow.start_timeperiod = timeperiod
+    uow.end_timeperiod = timeperiod
+    uow.start_id = '0'
+    uow.end_id = '1'
+    uow.state = state
+    uow.unit_of_work_type = unit_of_work.TYPE_MANAGED
+    return uow
+
+
+class TestSqliteManager(unittest.TestCase):
+    def setUp(self):
+        self.logger = get_logger(PROCESS_UNIT_TEST)
+        self.folder = tempfile.mkdtemp()
+        with mock.patch.dict(settings.settings, {'sqlite_file': os.path.join(self.folder, 'scheduler.db')}):
+            self.ds = ds_manager.SqliteManager(self.logger)
+        index_registry.ensure_indexes(self.ds, self.logger)
+
+        with mock.patch('synergy.db.manager.ds_manager.ds_factory') as ds_factory:
+            ds_factory.return_value = self.ds
+            self.uow_dao = UnitOfWorkDao(self.logger)
+            self.job_dao = JobDao(self.logger)
+            self.uow_log_dao = UowLogDao(self.logger)
+
+    def tearDown(self):
+        self.ds._db.close()
+        shutil.rmtree(self.folder)
+
+    def test_unit_of_work(self):
+        self.assertTrue(self.ds.is_alive())
+        uow = _create_uow('2015010100')
+        uow_id = self.uow_dao.insert(uow)
+        self.assertRaises(DuplicateKeyError, self.uow_dao.insert, _create_uow('2015010100'))
+        self.uow_dao.insert(_create_uow('2015010101', unit_of_work.STATE_PROCESSED))
+
+        uow = self.uow_dao.get_one(uow_id)
+        uow.state = unit_of_work.STATE_IN_PROGRESS
+        self.uow_dao.update(uow)
+        self.uow_dao.update_many([uow], [unit_of_work.NUMBER_OF_RETRIES])
+
+        candidates = self.uow_dao.get_reprocessing_candidates()
+        self.assertEqual([candidate.db_id for candidate in candidates], [str(uow_id)])
+        self.assertTrue(candidates[0].is_in_progress)
+        self.assertEqual(len(self.uow_dao.get_many([uow_id])), 1)
+
+        self.uow_dao.remove(uow_id)
+        self.assertRaises(LookupError, self.uow_dao.get_one, uow_id)
+
+    def test_job_event_log(self):
+        job_record = Job(process_name=PROCESS_SITE_HOURLY, timeperiod='2015010100', state=job.STATE_EMBRYO)
+        self.job_dao.update(job_record)
+        self.assertEqual(self.job_dao.insert_many([Job(process_name=PROCESS_SITE_HOURLY,
+                                                       timeperiod='2015010100', state=job.STATE_EMBRYO)]), [])
+
+        job_record = self.job_dao.get_one(PROCESS_SITE_HOURLY, '2015010100')
+        job_record.state = job.STATE_IN_PROGRESS
+        job_record.add_log_entry(['2015-01-01 00:00:00', 'first'])
+        job_record.add_log_entry(['2015-01-01 01:00:00', 'second'])
+        self.job_dao.update(job_record)
+
+        job_record = self.job_dao.get_one(PROCESS_SITE_HOURLY, '2015010100')
+        self.assertTrue(job_record.is_in_progress)
+        self.assertEqual(job_record.event_log, [['2015-01-01 01:00:00', 'second'], ['2015-01-01 00:00:00', 'first']])
+
+        records = self.job_dao.run_query(COLLECTION_JOB_HOURLY, {job.TIMEPERIOD: {'$gte': '2015010100'},
+                                                                 job.STATE: {'$in': [job.STATE_IN_PROGRESS, None]}},
+                                         [job.STATE])
+        self.assertEqual([record.document.get(job.EVENT_LOG) for record in records], [[]])
+
+    def test_uow_log(self):
+        self.uow_log_dao.ds.connection(self.uow_log_dao.collection_name).update_one(
+            {'related_unit_of_work': 'uow_id'}, {'$push': {'log': 'first'}}, upsert=True)
+        self.uow_log_dao.append_log('uow_id', 'second')
+        self.assertEqual(self.uow_log_dao.get_one('uow_id').log, ['first', 'second'])
+
+        # expired entries are removed by the TTL index on the next write
+        connection = self.uow_log_dao.ds.connection(self.uow_log_dao.collection_name)
+        connection.insert_one({'related_unit_of_work': 'expired_uow_id', 'created_at': '2000-01-01 00:00:00'})
+        connection.ttl_purged_at = 0
+        self.uow_log_dao.append_log('uow_id', 'third')
+        self.assertIsNone(connection.find_one({'related_unit_of_work': 'expired_uow_id'}))
+        self.assertIsNotNone(connection.find_one({'related_unit_of_work': 'uow_id'}))
+
+    def test_indexes(self):
+        self.uow_dao.insert(_create_uow('2015010100'))
+        report = index_registry.explain_query_shapes(self.ds, self.logger, [COLLECTION_UNIT_OF_WORK])
+        self.assertTrue(report)
+        for shape, stages, is_collection_scan in report:
+            self.assertFalse(is_collection_scan, '{0}: {1}'.format(shape.shape_name, stages))
+
+        # ensure_indexes is idempotent
+        self.assertEqual(index_registry.ensure_indexes(self.ds, self.logger), 0)
+
+        self.ds.drop_database()
+        self.assertEqual(self.ds._db.collection_names(), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,9 +1,11 @@
 __author__ = 'Bohdan Mushkevych'
 
+import random
 import unittest
-from datetime import datetime
+from datetime import datetime, timedelta
 
 from synergy.system import time_helper
+from synergy.system import timeperiod_arithmetic
 from synergy.system.time_qualifier import *
 
 
@@ -186,6 +188,86 @@ class TestTimeHelper(unittest.TestCase):
         for key, value in fixture.items():
             self.assertEqual(time_helper.tokenize_timeperiod(value[0]), value[1])
 
+    def _assert_same_outcome(self, fast_function, datetime_function, *args):
+        """ asserts that both functions return the same result or both raise ValueError """
+        try:
+            expected = datetime_function(*args)
+        except ValueError:
+            self.assertRaises(ValueError, fast_function, *args)
+        else:
+            self.assertEqual(fast_function(*args), expected, 'arguments: {0}'.format(args))
+
+    def test_timeperiod_arithmetic(self):
+        """ compares timeperiod_arithmetic fast path with the datetime-based computation
+            on random timeperiods spread over decades and on the calendar edge cases """
+        rnd = random.Random(20101231)
+        start = datetime(1950, 1, 1)
+        span_in_hours = (datetime(2050, 1, 1) - start).days * 24
+        qualifiers = [QUALIFIER_HOURLY, QUALIFIER_DAILY, QUALIFIER_MONTHLY, QUALIFIER_YEARLY]
+
+        timeperiods = []
+        for _ in range(1000):
+            dt = start + timedelta(hours=rnd.randrange(span_in_hours), minutes=rnd.randrange(60))
+            timeperiods.append(time_helper.datetime_to_synergy(rnd.choice(qualifiers), dt))
+            timeperiods.append(dt.strftime(time_helper.SYNERGY_SESSION_PATTERN))
+
+        # month ends, leap days, century years and malformed timeperiods
+        timeperiods += ['2000022900', '1900022800', '2100022823', '2012013100', '2011123123', '1900010100',
+                        '2011023000', '2011130000', '2011010124', '1899123123', '0000000000', '2011',
+                        '20110101000000', '20110100000000', '20111231235959', '2011abcd00',
+                        '20150101235960', '20150101235961']
+        # boundaries of the FAST_YEARS, leap days and zero components of the increment and cast fast paths
+        timeperiods += ['2199123123', '2199120000', '2199000000', '2200010100', '1900000000', '2016022923',
+                        '2015022900', '2016022900', '2016030100', '2100030100', '2015000000', '2015001500',
+                        '2015010000', '2015100000', '2015120000']
+
+        for timeperiod in timeperiods:
+            for time_qualifier in qualifiers:
+                self._assert_same_outcome(time_helper.cast_to_time_qualifier,
+                                          time_helper._cast_to_time_qualifier_by_datetime,
+                                          time_qualifier, timeperiod)
+                for delta in [0, 1, -1, 11, -13, 24, -25, 30, -31, -366, rnd.randint(-50000, 50000)]:
+                    self._assert_same_outcome(time_helper.increment_timeperiod,
+                                              time_helper._increment_timeperiod_by_datetime,
+                                              time_qualifier, timeperiod, delta)
+
+        # well-formed timeperiods are served by the fast path
+        self.assertEqual(timeperiod_arithmetic.increment_timeperiod(QUALIFIER_HOURLY, '2011123123'), '2012010100')
+        self.assertEqual(timeperiod_arithmetic.increment_timeperiod(QUALIFIER_MONTHLY, '2012010000', -1), '2011120000')
+        self.assertEqual(timeperiod_arithmetic.cast_to_time_qualifier(QUALIFIER_DAILY, '20100101193412'), '2010010100')
+        self.assertIsNone(timeperiod_arithmetic.increment_timeperiod(QUALIFIER_MONTHLY, '2011013100', 1))
+        self.assertIsNone(timeperiod_arithmetic.cast_to_time_qualifier(QUALIFIER_HOURLY, '2011023000'))
+
+        # leap seconds are accepted by strptime, but are rejected by datetime
+        self.assertIsNone(timeperiod_arithmetic.increment_timeperiod(QUALIFIER_HOURLY, '20150101235960'))
+        self.assertRaises(ValueError, time_helper.increment_timeperiod, QUALIFIER_HOURLY, '20150101235960')
+
+    def test_timeperiod_range(self):
+        self.assertEqual(time_helper.timeperiod_range(QUALIFIER_HOURLY, '2010010122', '2010010201'),
+                         ['2010010122', '2010010123', '2010010200', '2010010201'])
+        self.assertEqual(time_helper.timeperiod_range(QUALIFIER_MONTHLY, '2010112300', '20110115120000'),
+                         ['2010110000', '2010120000', '2011010000'])
+        self.assertEqual(time_helper.timeperiod_range(QUALIFIER_DAILY, '2010010200', '2010010100'), [])
+
+        # compare with the chain of increments on random ranges spread over decades
+        rnd = random.Random(20100101)
+        start = datetime(1950, 1, 1)
+        for time_qualifier, span_in_hours in [(QUALIFIER_HOURLY, 24 * 40), (QUALIFIER_DAILY, 24 * 800),
+                                              (QUALIFIER_MONTHLY, 24 * 365 * 5), (QUALIFIER_YEARLY, 24 * 365 * 30)]:
+            for _ in range(50):
+                start_dt = start + timedelta(hours=rnd.randrange(24 * 365 * 100))
+                end_dt = start_dt + timedelta(hours=rnd.randrange(-24, span_in_hours))
+                start_timeperiod = time_helper.datetime_to_synergy(time_qualifier, start_dt)
+                end_timeperiod = time_helper.datetime_to_synergy(time_qualifier, end_dt)
+
+                expected = []
+                timeperiod = start_timeperiod
+                while end_timeperiod >= timeperiod:
+                    expected.append(timeperiod)
+                    timeperiod = time_helper._increment_timeperiod_by_datetime(time_qualifier, timeperiod, 1)
+                self.assertEqual(time_helper.timeperiod_range(time_qualifier, start_timeperiod, end_timeperiod),
+                                 expected)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -104,6 +104,28 @@ class TestTimeperiodDict(unittest.TestCase):
             counter += 1
         self.assertEqual(counter, 8)
 
+    def test_stem_tables(self):
+        """ lookup of the precomputed stem tables matches the computed stem grouping """
+        fixture = {
+            QUALIFIER_HOURLY: time_helper.timeperiod_range(QUALIFIER_HOURLY, '2012022700', '2012030323'),
+            QUALIFIER_DAILY: time_helper.timeperiod_range(QUALIFIER_DAILY, '2011010100', '2012123100'),
+            QUALIFIER_MONTHLY: time_helper.timeperiod_range(QUALIFIER_MONTHLY, '2011010000', '2012120000'),
+        }
+
+        for qualifier, timeperiods in fixture.items():
+            upper_boundary = TimeperiodDict(qualifier, 1)._get_stem_upper_boundary()
+            for time_grouping in range(1, upper_boundary + 1):
+                d = TimeperiodDict(qualifier, time_grouping)
+                for timeperiod in timeperiods:
+                    self.assertEqual(d._translate_timeperiod(timeperiod), d._translate_timeperiod_by_tokens(timeperiod),
+                                     msg='failing combination: q={0} grouping={1} timeperiod={2}'.
+                                     format(qualifier, time_grouping, timeperiod))
+
+        # malformed timeperiods are reported by the tokenizing translation
+        d = TimeperiodDict(QUALIFIER_DAILY, 3)
+        self.assertRaises(AssertionError, d._translate_timeperiod, '20101231')
+        self.assertRaises(ValueError, d._translate_timeperiod, '2010133100')
+
 
 if __name__ == '__main__':
     unittest.main()
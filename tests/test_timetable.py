@@ -0,0 +1,128 @@
+__author__ = 'Bohdan Mushkevych'
+
+import unittest
+import threading
+try:
+    import mock
+except ImportError:
+    from unittest import mock
+
+from settings import enable_test_mode
+enable_test_mode()
+
+from constants import TREE_SITE, TREE_CLIENT, TREE_ALERT, PROCESS_SITE_HOURLY, PROCESS_CLIENT_DAILY
+from synergy.db.model import job
+from synergy.db.model.job import Job
+from synergy.db.dao.job_dao import JOB_PROJECTION, decode_job
+from synergy.scheduler.timetable import Timetable
+
+
+def _acquired_elsewhere(lock):
+    """ :return: True if the lock can be acquired by another thread at the moment """
+    result = []
+
+    def _try_acquire():
+        is_acquired = lock.acquire(False)
+        if is_acquired:
+            lock.release()
+        result.append(is_acquired)
+
+    thread = threading.Thread(target=_try_acquire)
+    thread.start()
+    thread.join()
+    return result[0]
+
+
+class TestTimetable(unittest.TestCase):
+    def setUp(self):
+        self.patchers = [mock.patch('synergy.scheduler.timetable.JobDao'),
+                         mock.patch.object(Timetable, '_construct_state_machines', return_value=dict()),
+                         mock.patch.object(Timetable, 'load_tree'),
+                         mock.patch.object(Timetable, 'build_trees'),
+                         mock.patch.object(Timetable, 'validate')]
+        for patcher in self.patchers:
+            patcher.start()
+        self.timetable = Timetable(mock.Mock())
+
+    def tearDown(self):
+        for patcher in self.patchers:
+            patcher.stop()
+
+    def test_get_tree(self):
+        self.assertEqual(self.timetable.get_tree(PROCESS_SITE_HOURLY), self.timetable.trees[TREE_SITE])
+        self.assertEqual(self.timetable.get_tree(PROCESS_CLIENT_DAILY), self.timetable.trees[TREE_CLIENT])
+        self.assertIsNone(self.timetable.get_tree('unknown_process'))
+
+        self.assertEqual(self.timetable._find_dependant_trees(self.timetable.trees[TREE_SITE]),
+                         [self.timetable.trees[TREE_CLIENT]])
+        self.assertEqual(self.timetable._find_dependant_trees(self.timetable.trees[TREE_CLIENT]), [])
+
+    def test_tree_locks(self):
+        site_lock = self.timetable.tree_locks[self.timetable.trees[TREE_SITE]]
+        client_lock = self.timetable.tree_locks[self.timetable.trees[TREE_CLIENT]]
+        alert_lock = self.timetable.tree_locks[self.timetable.trees[TREE_ALERT]]
+
+        # dependent trees share the lock of their dependency group
+        self.assertIs(site_lock, client_lock)
+        self.assertIsNot(site_lock, alert_lock)
+
+        # unrelated dependency group remains available while the other one is locked
+        with self.timetable.tree_lock(PROCESS_SITE_HOURLY):
+            self.assertFalse(_acquired_elsewhere(site_lock[1]))
+            self.assertTrue(_acquired_elsewhere(alert_lock[1]))
+
+            with self.timetable.tree_lock(PROCESS_CLIENT_DAILY):
+                # lock of the dependency group is reentrant
+                self.assertFalse(_acquired_elsewhere(client_lock[1]))
+
+        # several dependency groups are locked and released together
+        with self.timetable.locked([self.timetable.trees[TREE_ALERT], self.timetable.trees[TREE_SITE]]):
+            self.assertFalse(_acquired_elsewhere(site_lock[1]))
+            self.assertFalse(_acquired_elsewhere(alert_lock[1]))
+        self.assertTrue(_acquired_elsewhere(site_lock[1]))
+        self.assertTrue(_acquired_elsewhere(alert_lock[1]))
+
+        # processes outside of any tree are guarded by the timetable-wide lock
+        with self.timetable.tree_lock('unknown_process'):
+            self.assertFalse(_acquired_elsewhere(self.timetable.lock))
+
+    def test_get_event_log(self):
+        # job records are loaded into the timetable without their event logs
+        job_record = decode_job({job.PROCESS_NAME: PROCESS_SITE_HOURLY,
+                                 job.TIMEPERIOD: '2015010100',
+                                 job.STATE: job.STATE_IN_PROGRESS}, JOB_PROJECTION)
+        job_record.add_log_entry(['2015-01-01 01:00:00', 'pending'])
+        self.timetable.job_dao.get_event_log.return_value = [['2015-01-01 00:00:00', 'stored']]
+
+        # entries not yet pushed into the DB are shown on top of the stored event log
+        self.assertEqual(self.timetable.get_event_log(job_record),
+                         [['2015-01-01 01:00:00', 'pending'], ['2015-01-01 00:00:00', 'stored']])
+        self.assertEqual(job_record.get_update()['$push'][job.EVENT_LOG]['$each'],
+                         [['2015-01-01 01:00:00', 'pending']])
+
+        # loaded event log is not read again
+        self.timetable.get_event_log(job_record)
+        self.assertEqual(self.timetable.job_dao.get_event_log.call_count, 1)
+
+    def test_event_log_of_updated_job(self):
+        job_record = decode_job({job.PROCESS_NAME: PROCESS_SITE_HOURLY,
+                                 job.TIMEPERIOD: '2015010100',
+                                 job.STATE: job.STATE_IN_PROGRESS}, JOB_PROJECTION)
+        tree = self.timetable.get_tree(PROCESS_SITE_HOURLY)
+        tree.update_node(job_record)
+
+        # JobDao.update serializes the job record, that sets the event_log field to its default []
+        job_record.state = job.STATE_PROCESSED
+        self.assertIn('$set', job_record.get_update())
+        job_record.mark_clean()
+        self.assertFalse(job_record.is_event_log_loaded)
+
+        stored_event_log = [['2015-01-01 00:00:00', 'stored']]
+        self.timetable.job_dao.get_event_log.return_value = stored_event_log
+        node = tree.get_node(PROCESS_SITE_HOURLY, '2015010100')
+        self.assertEqual(node.event_log, stored_event_log)
+        self.assertTrue(job_record.is_event_log_loaded)
+
+
+if __name__ == '__main__':
+    unittest.main()
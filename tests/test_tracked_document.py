@@ -0,0 +1,86 @@
+__author__ = 'Bohdan Mushkevych'
+
+import unittest
+from datetime import datetime
+
+from bson.objectid import ObjectId
+
+from synergy.db.model import job, unit_of_work
+from synergy.db.model.job import Job
+from synergy.db.model.unit_of_work import UnitOfWork
+from synergy.db.dao.job_dao import JOB_PROJECTION, decode_job
+
+
+class TestTrackedDocument(unittest.TestCase):
+    def setUp(self):
+        self.db_id = ObjectId()
+        self.uow = UnitOfWork.from_json({'_id': self.db_id,
+                                         unit_of_work.PROCESS_NAME: 'SomeProcess',
+                                         unit_of_work.STATE: unit_of_work.STATE_REQUESTED,
+                                         unit_of_work.NUMBER_OF_RETRIES: 2})
+
+    def tearDown(self):
+        del self.uow
+
+    def test_loaded_document(self):
+        self.assertEqual(self.uow.dirty_fields, set())
+        self.assertEqual(self.uow.get_update(), dict())
+
+    def test_modified_fields(self):
+        self.uow.state = unit_of_work.STATE_IN_PROGRESS
+        self.uow.started_at = datetime.utcnow()
+        self.uow.db_id = self.db_id
+
+        # _id is never updated
+        started_at = self.uow.document[unit_of_work.STARTED_AT]
+        self.assertEqual(self.uow.get_update(), {'$set': {unit_of_work.STATE: unit_of_work.STATE_IN_PROGRESS,
+                                                          unit_of_work.STARTED_AT: started_at}})
+
+        self.uow.mark_clean([unit_of_work.STATE])
+        self.assertEqual(self.uow.dirty_fields, set([unit_of_work.STARTED_AT, '_id']))
+        self.uow.mark_clean()
+        self.assertEqual(self.uow.get_update(), dict())
+
+    def test_constructor_values(self):
+        uow = UnitOfWork(process_name='SomeProcess', state=unit_of_work.STATE_REQUESTED)
+        self.assertEqual(uow.dirty_fields, set([unit_of_work.PROCESS_NAME, unit_of_work.STATE]))
+
+    def test_event_log_push(self):
+        job_record = decode_job({'_id': self.db_id,
+                                 job.PROCESS_NAME: 'SomeProcess',
+                                 job.TIMEPERIOD: '2015010100',
+                                 job.STATE: job.STATE_EMBRYO}, JOB_PROJECTION)
+        self.assertFalse(job_record.is_event_log_loaded)
+
+        job_record.state = job.STATE_IN_PROGRESS
+        job_record.add_log_entry(['2015-01-01 00:00:00', 'first'])
+        job_record.add_log_entry(['2015-01-01 01:00:00', 'second'])
+        self.assertEqual(job_record.get_update(),
+                         {'$set': {job.STATE: job.STATE_IN_PROGRESS},
+                          '$push': {job.EVENT_LOG: {'$each': [['2015-01-01 01:00:00', 'second'],
+                                                              ['2015-01-01 00:00:00', 'first']],
+                                                    '$position': 0,
+                                                    '$slice': job.MAX_NUMBER_OF_EVENTS}}})
+
+        job_record.mark_clean()
+        self.assertEqual(job_record.get_update(), dict())
+        # serialization sets the default event log, that is not the one stored in the DB
+        self.assertFalse(job_record.is_event_log_loaded)
+
+    def test_loaded_event_log(self):
+        event_log = [['2015-01-01 00:00:00', str(i)] for i in range(job.MAX_NUMBER_OF_EVENTS)]
+        job_record = Job.from_json({'_id': self.db_id, job.EVENT_LOG: list(event_log)})
+
+        job_record.add_log_entry(['2015-01-01 01:00:00', 'latest'])
+        self.assertEqual(len(job_record.event_log), job.MAX_NUMBER_OF_EVENTS)
+        self.assertEqual(job_record.event_log[0], ['2015-01-01 01:00:00', 'latest'])
+        self.assertEqual(job_record.event_log[1:], event_log[:-1])
+        self.assertIn('$push', job_record.get_update())
+
+        # replaced event log is written as a whole
+        job_record.event_log = []
+        self.assertEqual(job_record.get_update(), {'$set': {job.EVENT_LOG: []}})
+
+
+if __name__ == '__main__':
+    unittest.main()
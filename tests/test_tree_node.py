@@ -168,8 +168,10 @@ class TestTreeNode(unittest.TestCase):
 
         composite_state = NodesCompositeState()
         composite_state.all_finished = True
-        self.the_node.dependent_on_composite_state = mock.Mock(return_value=composite_state)
-        self.the_node.request_embryo_job_record = mock.Mock()
+        # TreeNode has __slots__, hence its methods are patched on the class
+        patcher = mock.patch.object(TreeNode, 'dependent_on_composite_state', return_value=composite_state)
+        patcher.start()
+        self.addCleanup(patcher.stop)
         for _index in range(10):
             mock_job = mock.create_autospec(Job)
             mock_job.is_finished = True
@@ -195,6 +197,23 @@ class TestTreeNode(unittest.TestCase):
         self.the_node.children[0].job_record.is_finished = False
         self.assertFalse(self.the_node.is_finalizable())
 
+    def test_event_log(self):
+        # event log is read thru the timetable, that loads it from the DB on the first access
+        event_log = [['2015-01-01 00:00:00', 'message']]
+        self.time_table_mocked.get_event_log = mock.Mock(return_value=event_log)
+        self.assertEqual(self.the_node.event_log, event_log)
+        self.time_table_mocked.get_event_log.assert_called_once_with(self.job_mock)
+
+        # new entry is recorded by the job record, that pushes it into the DB on the next update;
+        # the event log is not read from the DB for that
+        self.the_node.add_log_entry(['2015-01-01 01:00:00', 'next message'])
+        self.job_mock.add_log_entry.assert_called_once_with(['2015-01-01 01:00:00', 'next message'])
+        self.assertEqual(self.time_table_mocked.get_event_log.call_count, 1)
+
+        # node with no job record has an empty event log
+        self.the_node.job_record = None
+        self.assertEqual(self.the_node.event_log, [])
+
 
 if __name__ == '__main__':
     unittest.main()
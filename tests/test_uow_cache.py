@@ -0,0 +1,91 @@
+__author__ = 'Bohdan Mushkevych'
+
+import unittest
+try:
+    import mock
+except ImportError:
+    from unittest import mock
+
+from bson.objectid import ObjectId
+
+from settings import enable_test_mode
+enable_test_mode()
+
+from synergy.db.model import unit_of_work
+from synergy.db.dao.cached_unit_of_work_dao import CachedUnitOfWorkDao, UowCache
+from synergy.system.system_logger import get_logger
+from tests.ut_context import PROCESS_UNIT_TEST
+
+
+class UowCacheUnitTest(unittest.TestCase):
+    def setUp(self):
+        self.uow_id = ObjectId()
+        self.document = {'_id': self.uow_id,
+                         unit_of_work.PROCESS_NAME: PROCESS_UNIT_TEST,
+                         unit_of_work.STATE: unit_of_work.STATE_REQUESTED}
+
+        self.collection = mock.Mock()
+        self.collection.find_one.side_effect = lambda query: dict(self.document)
+        with mock.patch('synergy.db.manager.ds_manager.ds_factory') as ds_factory:
+            ds_factory.return_value.connection.return_value = self.collection
+            self.uow_dao = CachedUnitOfWorkDao(get_logger(PROCESS_UNIT_TEST))
+
+        self.cache = UowCache()
+        self.cache.clear()
+        self.initial_stats = self.cache.stats
+
+    def tearDown(self):
+        self.cache.clear()
+        del self.uow_dao
+
+    def _assert_stats(self, hits, misses):
+        stats = self.cache.stats
+        self.assertEqual(stats['hits'] - self.initial_stats['hits'], hits)
+        self.assertEqual(stats['misses'] - self.initial_stats['misses'], misses)
+
+    def test_read_through(self):
+        uow = self.uow_dao.get_one(self.uow_id)
+        self.assertTrue(uow.is_requested)
+
+        # cached record is returned as an independent instance
+        uow.state = unit_of_work.STATE_CANCELED
+        self.assertTrue(self.uow_dao.get_one(self.uow_id).is_requested)
+        self.assertEqual(self.collection.find_one.call_count, 1)
+        self._assert_stats(hits=1, misses=1)
+
+    def test_invalidation(self):
+        uow = self.uow_dao.get_one(self.uow_id)
+
+        # own writes and status messages invalidate the cached record
+        uow.state = unit_of_work.STATE_IN_PROGRESS
+        self.uow_dao.update(uow)
+        self.uow_dao.get_one(self.uow_id)
+        self.uow_dao.invalidate(self.uow_id)
+        self.uow_dao.get_one(self.uow_id)
+        self.assertEqual(self.collection.find_one.call_count, 3)
+        self._assert_stats(hits=0, misses=3)
+
+    def test_outdated_read(self):
+        # document read before the invalidation of its UOW is not cached
+        version = self.cache.version
+        self.cache.invalidate(self.uow_id)
+        self.cache.put(self.uow_id, self.document, version)
+        self.assertIsNone(self.cache.get(self.uow_id))
+
+        self.cache.put(self.uow_id, self.document, self.cache.version)
+        self.assertIsNotNone(self.cache.get(self.uow_id))
+
+    def test_bounds(self):
+        with mock.patch.object(self.cache, 'max_size', 2):
+            uow_ids = [ObjectId() for _ in range(3)]
+            for uow_id in uow_ids:
+                self.cache.put(uow_id, self.document, self.cache.version)
+            self.assertIsNone(self.cache.get(uow_ids[0]))
+            self.assertEqual(self.cache.stats['size'], 2)
+
+        with mock.patch.object(self.cache, 'ttl', -1):
+            self.assertIsNone(self.cache.get(uow_ids[2]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -90,17 +90,16 @@ class AbstractMongoWorker(AbstractUowAwareWorker):
                                          start_timeperiod,
                                          end_timeperiod)
 
-            if iteration == 0 and cursor.count(with_limit_and_skip=True) == 0:
-                msg = 'No entries in {0} at range [{1} : {2}]'.format(collection_name, start_id_obj, end_id_obj)
-                self.logger.warning(msg)
-                break
-
-            start_id_obj = None
+            # emptiness is detected by the first read of the cursor, rather than by a separate count command
+            first_id_obj, start_id_obj = start_id_obj, None
             for document in cursor:
                 start_id_obj = document['_id']
                 self._process_single_document(document)
                 self.performance_tracker.increment_success()
             if start_id_obj is None:
+                if iteration == 0:
+                    msg = 'No entries in {0} at range [{1} : {2}]'.format(collection_name, first_id_obj, end_id_obj)
+                    self.logger.warning(msg)
                 break
             iteration += 1
 